@@ -0,0 +1,59 @@
+# -*- coding: ISO-8859-1 -*-
+#-----------------------------------------------------------------------------
+# Copyright (c) 2014, HFTools Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+u"""Micro-benchmarks for small hfarray arithmetic, where the cost of
+creating the result objects dominates.
+
+usage::
+
+    python benchmarks/bench_arrayobj.py [N]
+"""
+from __future__ import print_function
+import sys
+import timeit
+
+import numpy as np
+
+from hftools.dataset import hfarray, DimSweep, DimRep, DimMatrix_i,\
+    DimMatrix_j
+from hftools.math import matrix_multiply, inv, det
+
+
+def bench(label, func, number):
+    t = min(timeit.repeat(func, number=number, repeat=3)) / number
+    print("%-40s %10.1f us" % (label, t * 1e6))
+
+
+def main(N=10):
+    fi = DimSweep("freq", np.linspace(0, 50e9, N))
+    ri = DimRep("rep", 3)
+    mi = DimMatrix_i("i", 2)
+    mj = DimMatrix_j("j", 2)
+    a = hfarray(np.ones((N, 3)), dims=(fi, ri))
+    b = hfarray(np.ones((N,)), dims=(fi,))
+    m = hfarray(np.random.randn(N, 2, 2), dims=(fi, mi, mj))
+    s11, s12, s21 = [hfarray(np.random.randn(N, 3), dims=(fi, ri))
+                     for i in range(3)]
+    s22 = hfarray(np.random.randn(3, N), dims=(ri, fi))
+
+    print("N = %d" % N)
+    bench("hfarray(data, dims)", lambda: hfarray(a, dims=a.dims), 10000)
+    bench("a + 1", lambda: a + 1, 10000)
+    bench("a + a", lambda: a + a, 10000)
+    bench("a * b", lambda: a * b, 10000)
+    bench("s11 * s22 - s12 * s21", lambda: s11 * s22 - s12 * s21, 1000)
+    bench("a.T", lambda: a.T, 10000)
+    bench("a[1:]", lambda: a[1:], 10000)
+    bench("a[..., 0]", lambda: a[..., 0], 10000)
+    bench("matrix_multiply(m, m)", lambda: matrix_multiply(m, m), 10000)
+    bench("inv(m)", lambda: inv(m), 10000)
+    bench("det(m)", lambda: det(m), 10000)
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
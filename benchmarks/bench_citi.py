@@ -0,0 +1,60 @@
+# -*- coding: ISO-8859-1 -*-
+#-----------------------------------------------------------------------------
+# Copyright (c) 2014, HFTools Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+u"""Benchmarks for reading CITI files.
+
+usage::
+
+    python benchmarks/bench_citi.py [N]
+"""
+from __future__ import print_function
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+import numpy as np
+
+from hftools.file_formats import read_citi
+
+
+def bench(label, func, number, size):
+    t = min(timeit.repeat(func, number=number, repeat=3)) / number
+    print("%-40s %10.1f ms %8.1f MB/s" % (label, t * 1e3, size / t / 1e6))
+
+
+def write_citi(fname, N, typ):
+    names = ["S11", "S21", "S12", "S22"]
+    with open(fname, "w") as fil:
+        fil.write("CITIFILE A.01.01\nNAME DATA\nVAR freq MAG %d\n" % N)
+        for name in names:
+            fil.write("DATA %s %s\n" % (name, typ))
+        fil.write("VAR_LIST_BEGIN\n")
+        fil.write("\n".join("%.12e" % f for f in np.linspace(1e9, 50e9, N)))
+        fil.write("\nVAR_LIST_END\n")
+        for name in names:
+            fil.write("BEGIN\n")
+            fil.write("\n".join("%.9e,%.9e" % tuple(x)
+                                for x in np.random.randn(N, 2)))
+            fil.write("\nEND\n")
+
+
+def main(N=500000):
+    dirname = tempfile.mkdtemp()
+    fname = os.path.join(dirname, "bench.citi")
+    for typ in ["RI", "MAGANGLE"]:
+        write_citi(fname, N, typ)
+        size = os.path.getsize(fname)
+        bench("read_citi %s, %.1f MB" % (typ, size / 1e6),
+              lambda: read_citi(fname), 1, size)
+    shutil.rmtree(dirname)
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
@@ -0,0 +1,107 @@
+# -*- coding: ISO-8859-1 -*-
+#-----------------------------------------------------------------------------
+# Copyright (c) 2014, HFTools Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+u"""Benchmarks for DataBlock operations on large blocks.
+
+usage::
+
+    python benchmarks/bench_datablock.py [N]
+"""
+from __future__ import print_function
+import sys
+import timeit
+
+import numpy as np
+
+from hftools.dataset import hfarray, DataBlock, DimSweep, DimRep,\
+    copy_counter
+
+
+def bench(label, func, number):
+    t = min(timeit.repeat(func, number=number, repeat=3)) / number
+    print("%-40s %10.1f ms" % (label, t * 1e3))
+
+
+def make_datablock(N, nvars=10):
+    fi = DimSweep("freq", np.linspace(0, 50e9, N))
+    ri = DimRep("rep", 4)
+    db = DataBlock()
+    for i in range(nvars):
+        db["v%d" % i] = hfarray(np.random.randn(4, N), dims=(ri, fi))
+    return db
+
+
+def make_flat_sweep(N, nvars=4):
+    n = int(np.sqrt(N))
+    idx = DimSweep("Index", n * n)
+    db = DataBlock()
+    db.Index = idx
+    db["vg"] = hfarray(np.repeat(np.linspace(-2, 0, n), n), dims=(idx,))
+    db["vd"] = hfarray(np.tile(np.linspace(0, 5, n), n), dims=(idx,))
+    for i in range(nvars):
+        db["v%d" % i] = hfarray(np.random.randn(n * n), dims=(idx,))
+    return db
+
+
+def make_rep_block(N, nvars=4):
+    n = max(int(round((N / 100.) ** 0.25)), 1)
+    dims = (DimSweep("freq", 100),) + tuple(DimRep("rep%d" % i, n)
+                                            for i in range(4))
+    db = DataBlock()
+    for i in range(nvars):
+        db["v%d" % i] = hfarray(np.random.randn(100, n, n, n, n), dims=dims)
+    return db
+
+
+def main(N=1000000):
+    db = make_datablock(N)
+    band = (db.freq >= 10e9) & (db.freq < 20e9)
+    comb = db.freq % 2e9 < 1e9
+    values = hfarray(DimSweep("freq", db.freq[::10]))
+
+    print("N = %d, %d variables" % (N, len(db.vardata)))
+    bench("db.filter(band)", lambda: db.filter(band), 5)
+    bench("db.filter(comb)", lambda: db.filter(comb), 5)
+    bench("db.v0[band]", lambda: db.v0[band], 5)
+    bench("db.filter(values)", lambda: db.filter(values), 5)
+    bench("db.interpolate(values)", lambda: db.interpolate(values), 5)
+    newgrid = DimSweep("freq", np.linspace(1e9, 49e9, N // 3))
+    bench("db.interpolate(newgrid, linear)",
+          lambda: db.interpolate(newgrid, "linear"), 3)
+    freq = hfarray(db.ivardata["freq"])
+    bench("db.sort(freq)", lambda: db.sort(freq), 5)
+    bench("db.sort(-freq)", lambda: db.sort(-freq), 5)
+    bench("db.copy()", lambda: db.copy(), 5)
+    bench("db.cow_copy()", lambda: db.cow_copy(), 5)
+
+    def copy_write():
+        db.cow_copy().v0[0, 0] = 1
+    bench("db.cow_copy().v0[0, 0] = 1", copy_write, 5)
+
+    flat = make_flat_sweep(N)
+    bench("flat.hyper([vg, vd])",
+          lambda: flat.hyper(["vg", "vd"], "Index"), 1)
+
+    reps = make_rep_block(N)
+    bench("reps.remove_rep()", lambda: reps.remove_rep(), 5)
+
+    print("\nBytes copied per operation")
+    with copy_counter:
+        db.cow_copy().v0[0, 0] = 1
+        db.filter(band)
+        db.filter(comb)
+        db.filter(values)
+        db.interpolate(values)
+        db.sort(freq)
+        reps.remove_rep()
+        db.sort(hfarray(db.ivardata["freq"])[::-1])
+    print(copy_counter.report())
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
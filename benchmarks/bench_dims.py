@@ -0,0 +1,47 @@
+# -*- coding: ISO-8859-1 -*-
+#-----------------------------------------------------------------------------
+# Copyright (c) 2014, HFTools Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+u"""Micro-benchmarks for dimension hashing and comparison.
+
+usage::
+
+    python benchmarks/bench_dims.py [N]
+"""
+from __future__ import print_function
+import sys
+import timeit
+
+import numpy as np
+
+from hftools.dataset import hfarray, DimSweep, DimRep
+
+
+def bench(label, func, number):
+    t = min(timeit.repeat(func, number=number, repeat=3)) / number
+    print("%-40s %10.1f us" % (label, t * 1e6))
+
+
+def main(N=50000):
+    fi = DimSweep("freq", np.linspace(0, 50e9, N))
+    fi2 = DimSweep("freq", np.linspace(0, 50e9, N))
+    ri = DimRep("rep", 4)
+    a = hfarray(np.zeros((N, 4)), dims=(fi, ri))
+    b = hfarray(np.ones((N,)), dims=(fi,))
+    c = hfarray(np.ones((N,)), dims=(fi2,))
+
+    print("N = %d" % N)
+    bench("hash(dim)", lambda: hash(fi), 10000)
+    bench("dim == dim (same object)", lambda: fi == fi, 10000)
+    bench("dim == dim (equal copy)", lambda: fi == fi2, 10000)
+    bench("set(a.dims)", lambda: set(a.dims), 10000)
+    bench("a + b (shared dims)", lambda: a + b, 100)
+    bench("a + c (equal dims)", lambda: a + c, 100)
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
@@ -0,0 +1,101 @@
+# -*- coding: ISO-8859-1 -*-
+#-----------------------------------------------------------------------------
+# Copyright (c) 2014, HFTools Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+u"""Benchmarks for reading and writing hdf5 files and npy directories.
+
+usage::
+
+    python benchmarks/bench_hdf5.py [N]
+"""
+from __future__ import print_function
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+import numpy as np
+
+from hftools.dataset import hfarray, DataBlock, DimSweep, DimRep
+from hftools.file_formats.hdf5 import read_hdf5, save_hdf5, append_hdf5,\
+    HDF5Appender
+from hftools.file_formats.hdf5.helper import hdf5context
+from hftools.file_formats.npydir import read_npydir, save_npydir
+
+
+def bench(label, func, number):
+    t = min(timeit.repeat(func, number=number, repeat=3)) / number
+    print("%-40s %10.1f ms" % (label, t * 1e3))
+
+
+def make_datablock(N, nvars=200):
+    fi = DimSweep("freq", np.linspace(0, 50e9, N))
+    ri = DimRep("rep", 4)
+    db = DataBlock()
+    for i in range(nvars):
+        db["v%d" % i] = hfarray(np.random.randn(N, 4), dims=(fi, ri))
+    return db
+
+
+def main(N=10000):
+    db = make_datablock(N)
+    fname = os.path.join(tempfile.mkdtemp(), "bench.hdf5")
+    print("N = %d, %d variables, %.0f MB" % (N, len(db.vardata),
+                                             4 * 8 * N * 200 / 1e6))
+    bench("save_hdf5", lambda: save_hdf5(db, fname), 1)
+    bench("read_hdf5", lambda: read_hdf5(fname), 3)
+    bench("read_hdf5(lazy=True)", lambda: read_hdf5(fname, lazy=True), 3)
+
+    def lazy_use():
+        d = read_hdf5(fname, lazy=True)
+        return d.v0[:100] + d.v1[:100] * d.v2[:100]
+    bench("read_hdf5(lazy=True), use 3 vars", lazy_use, 3)
+    bench("read_hdf5(mmap=True)", lambda: read_hdf5(fname, mmap=True), 3)
+
+    def mmap_use():
+        d = read_hdf5(fname, mmap=True)
+        return d.v0[:100] + d.v1[:100] * d.v2[:100]
+    bench("read_hdf5(mmap=True), use 3 vars", mmap_use, 3)
+    bench("read_hdf5(variables=[v0], where=freq band)",
+          lambda: read_hdf5(fname, variables=["v0"],
+                            where={"freq": (1e9, 5e9)}), 3)
+    os.unlink(fname)
+
+    dirname = os.path.join(os.path.dirname(fname), "bench.npydir")
+    bench("save_npydir", lambda: save_npydir(db, dirname), 1)
+    bench("read_npydir", lambda: read_npydir(dirname), 3)
+    bench("read_npydir(mmap_mode=None)",
+          lambda: read_npydir(dirname, mmap_mode=None), 3)
+
+    fi = DimSweep("freq", np.linspace(0, 50e9, 201))
+    block = DataBlock()
+    block.a = hfarray(np.random.randn(201), dims=(fi,))
+    block.b = hfarray(1.0)
+    for growth in [1.0, 1.5]:
+        def appends():
+            with hdf5context(fname, mode="w") as fil:
+                save_hdf5(block, fil, expandable=True)
+                for i in range(1000):
+                    append_hdf5(block, fil, growth=growth)
+        bench("1000 x append_hdf5(growth=%.1f)" % growth, appends, 1)
+
+    def appender():
+        with hdf5context(fname, mode="w") as fil:
+            save_hdf5(block, fil, expandable=True)
+            with HDF5Appender(fil, buffersize=100) as log:
+                for i in range(1000):
+                    log.append(block)
+    bench("1000 x HDF5Appender(buffersize=100)", appender, 1)
+    bench("read_hdf5, 1000 appends", lambda: read_hdf5(fname), 3)
+    bench("read_hdf5, 1000 appends, one freq",
+          lambda: read_hdf5(fname, lazy=True).a[100], 3)
+    shutil.rmtree(os.path.dirname(fname))
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
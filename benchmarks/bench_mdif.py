@@ -0,0 +1,64 @@
+# -*- coding: ISO-8859-1 -*-
+#-----------------------------------------------------------------------------
+# Copyright (c) 2014, HFTools Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+u"""Benchmarks for reading MDIF files with many blocks, like load-pull data.
+
+usage::
+
+    python benchmarks/bench_mdif.py [blocks] [N]
+"""
+from __future__ import print_function
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+import numpy as np
+
+from hftools.file_formats import read_mdif
+
+
+def bench(label, func, number, size):
+    t = min(timeit.repeat(func, number=number, repeat=3)) / number
+    print("%-40s %10.1f ms %8.1f MB/s" % (label, t * 1e3, size / t / 1e6))
+
+
+def write_mdif(fname, blocks, N):
+    names = ["S[%d,%d](complex)" % (i, j) for i in (1, 2) for j in (1, 2)]
+    names += ["Pin(real)", "Pout(real)", "Gain(real)", "PAE(real)",
+              "Idc(real)", "Vdc(real)", "Gamma[1](complex)",
+              "Gamma[2](complex)"]
+    with open(fname, "w") as fil:
+        for idx in range(blocks):
+            fil.write("VAR vg(real) = %d\nVAR vd(real) = %d\n" %
+                      (idx % 10, idx // 10))
+            fil.write("BEGIN LP\n# Tamb(real) = 25\n")
+            fil.write("%% freq(real) %s\n" % " ".join(names))
+            data = np.random.randn(N, 2 * 4 + 6 + 2 * 2)
+            for f, row in zip(np.linspace(1e9, 2e9, N), data):
+                fil.write("%.9e %s\n" % (f, " ".join("%.6e" % x
+                                                     for x in row)))
+            fil.write("END\n")
+
+
+def main(blocks=2000, N=20):
+    dirname = tempfile.mkdtemp()
+    fname = os.path.join(dirname, "bench.mdif")
+    write_mdif(fname, blocks, N)
+    size = os.path.getsize(fname)
+    print("%d blocks, N = %d, %.1f MB" % (blocks, N, size / 1e6))
+    bench("read_mdif", lambda: read_mdif(fname, verbose=False), 1, size)
+    bench("read_mdif, multiple_files=False",
+          lambda: read_mdif(fname, verbose=False, multiple_files=False), 1,
+          size)
+    shutil.rmtree(dirname)
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
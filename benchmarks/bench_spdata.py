@@ -0,0 +1,70 @@
+# -*- coding: ISO-8859-1 -*-
+#-----------------------------------------------------------------------------
+# Copyright (c) 2014, HFTools Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+u"""Benchmarks for reading SP-data files, time and throughput.
+
+usage::
+
+    python benchmarks/bench_spdata.py [N] [columns]
+"""
+from __future__ import print_function
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+import numpy as np
+
+from hftools.file_formats import read_spdata
+from hftools.file_formats.spdata import parse_columns
+from hftools.utils import to_numeric
+
+
+def bench(label, func, number, size):
+    t = min(timeit.repeat(func, number=number, repeat=3)) / number
+    print("%-40s %10.1f ms %8.1f MB/s" % (label, t * 1e3, size / t / 1e6))
+
+
+def write_spdata(fname, N, columns, date=False):
+    data = np.random.randn(N, columns)
+    with open(fname, "w") as fil:
+        fil.write("!Vg=1\n")
+        header = ["freq"] + ["v%d" % idx for idx in range(columns)]
+        if date:
+            header.append("Date")
+        fil.write("\t".join(header) + "\n")
+        for f, row in zip(np.linspace(1e9, 50e9, N), data):
+            fil.write("%.12e\t" % f)
+            fil.write("\t".join("%.9e" % x for x in row))
+            if date:
+                fil.write("\t2014-01-01 12:00")
+            fil.write("\n")
+
+
+def main(N=100000, columns=8):
+    dirname = tempfile.mkdtemp()
+    fname = os.path.join(dirname, "bench.txt")
+    write_spdata(fname, N, columns)
+    size = os.path.getsize(fname)
+    print("N = %d, %d columns, %.1f MB" % (N, columns, size / 1e6))
+    with open(fname) as fil:
+        lines = fil.read().splitlines()[2:]
+    bench("to_numeric per field", lambda: [[to_numeric(x, False)
+                                            for x in rad.split("\t")]
+                                           for rad in lines], 1, size)
+    bench("parse_columns", lambda: parse_columns(lines, columns + 1), 1, size)
+    bench("read_spdata", lambda: read_spdata(fname), 1, size)
+    write_spdata(fname, N, columns, date=True)
+    size = os.path.getsize(fname)
+    bench("read_spdata, date column", lambda: read_spdata(fname), 1, size)
+    shutil.rmtree(dirname)
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
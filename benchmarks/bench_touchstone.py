@@ -0,0 +1,76 @@
+# -*- coding: ISO-8859-1 -*-
+#-----------------------------------------------------------------------------
+# Copyright (c) 2014, HFTools Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+u"""Benchmarks for reading Touchstone files.
+
+usage::
+
+    python benchmarks/bench_touchstone.py [N] [ports]
+"""
+from __future__ import print_function
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+import numpy as np
+
+from hftools.dataset import DataBlock, DimSweep, DimMatrix_i,\
+    DimMatrix_j, hfarray
+from hftools.file_formats import read_touchstone, save_touchstone
+
+
+def bench(label, func, number):
+    t = min(timeit.repeat(func, number=number, repeat=3)) / number
+    print("%-40s %10.1f ms" % (label, t * 1e3))
+
+
+def write_touchstone(fname, N, ports):
+    data = np.random.randn(N, 2 * ports ** 2)
+    with open(fname, "w") as fil:
+        fil.write("! benchmark data\n# HZ S RI R 50\n")
+        for f, row in zip(np.linspace(1e9, 50e9, N), data):
+            for idx in range(0, len(row), 8):
+                if idx == 0:
+                    fil.write("%.12e " % f)
+                fil.write(" ".join("%.9e" % x for x in row[idx:idx + 8]))
+                fil.write("\n")
+
+
+def write_touchstone2(fname, N, ports, matrix_format):
+    data = np.random.randn(N, ports, ports)
+    db = DataBlock()
+    db.S = hfarray(data + data.transpose(0, 2, 1),
+                   dims=(DimSweep("freq", np.linspace(1e9, 50e9, N)),
+                         DimMatrix_i("i", ports), DimMatrix_j("j", ports)))
+    save_touchstone(db, fname, version=2, matrix_format=matrix_format)
+
+
+def main(N=2000, ports=16):
+    dirname = tempfile.mkdtemp()
+    fname = os.path.join(dirname, "bench.s%dp" % ports)
+    write_touchstone(fname, N, ports)
+    searchname = os.path.join(dirname, "bench.txt")
+    shutil.copy(fname, searchname)
+    print("N = %d, %d ports, %.1f MB" % (N, ports,
+                                         os.path.getsize(fname) / 1e6))
+    bench("read_touchstone .s%dp" % ports,
+          lambda: read_touchstone(fname), 1)
+    bench("read_touchstone .txt, port search",
+          lambda: read_touchstone(searchname), 1)
+    for matrix_format in ["full", "upper"]:
+        write_touchstone2(fname, N, ports, matrix_format)
+        bench("read_touchstone 2.0 %s, %.1f MB" %
+              (matrix_format, os.path.getsize(fname) / 1e6),
+              lambda: read_touchstone(fname), 1)
+    shutil.rmtree(dirname)
+
+
+if __name__ == '__main__':
+    main(*[int(x) for x in sys.argv[1:]])
@@ -9,11 +9,12 @@
 from hftools.dataset.dim import DimSweep, DimRep,\
     DimMatrix_i, DimMatrix_j, _DimMatrix, DerivAxis, IndepAxis, DiagAxis, \
     ComplexDerivAxis, ComplexIndepAxis, ComplexDiagAxis, dims_has_complex,\
-    DimPartial, DimBase, CPLX
+    DimPartial, DimBase, CPLX, LinearDim
 
 from hftools.dataset.arrayobj import make_matrix, hfarray, ismatrix,\
     make_same_dims, make_same_dims_list, change_shape, remove_tail,\
     remove_rep, isfullcomplex, make_fullcomplex_array, DimsList, make_vector,\
+    DimSelection, select_values, match_values, match_mask,\
     ValueArray    #Deprecated
 
 
@@ -21,4 +22,13 @@ from hftools.dataset.dataset import DataDict, DataBlock, \
     change_dim, DataBlockError, yield_dim_consistent_datablocks,\
     convert_matrices_to_elements
 
+from hftools.dataset.reductions import chunked_sum, chunked_mean,\
+    chunked_var, chunked_std, chunked_min, chunked_max
+
+from hftools.dataset.cow import copy_counter
+
+from hftools.dataset.interpolation import Interpolator, get_interpolator
+
+from hftools.dataset.lazy import LazyArray
+
 from hftools.dataset.comments import Comments
@@ -27,6 +27,9 @@ from hftools.core import HFArrayShapeDimsMismatchError, HFArrayError,\
     DimensionMismatchError
 from hftools.py3compat import string_types, integer_types
 
+#: True when numpy dispatches ufuncs to __array_ufunc__ (NEP 13)
+HAS_ARRAY_UFUNC = hasattr(ndarray, "__array_ufunc__")
+
 
 def get_new_anonymous_dim(dims, *k, **kw):
     if isinstance(dims, hfarray):
@@ -39,55 +42,281 @@ def get_new_anonymous_dim(dims, *k, **kw):
     return DimAnonymous(aname, *k, **kw)
 
 
+def build_name_index(dims):
+    u"""Return dict mapping dimension name to the tuple of indices in
+       *dims* with that name.
+    """
+    index = {}
+    for idx, dim in enumerate(dims):
+        if isinstance(dim, DimBase):
+            index[dim.name] = index.get(dim.name, ()) + (idx,)
+    return index
+
+
 class Dims(tuple):
+    u"""Tuple of dimensions with a name index used for matching. A dim
+       matches another if the names are equal and it is an instance of
+       the other's *_dimclass*.
+    """
+    def __new__(cls, dims=()):
+        self = tuple.__new__(cls, dims)
+        self._name_index = build_name_index(self)
+        return self
+
+    def _find(self, name, cls):
+        for idx in self._name_index.get(name, ()):
+            if isinstance(self[idx], cls):
+                return idx
+        return None
+
     def __contains__(self, value):
         if isinstance(value, string_types):
-            value = DimBase(value, 1)  # Dummy dim
+            return value in self._name_index
         if not isinstance(value, DimBase):
             return False
-        for x in self:
-            if x.name == value.name and isinstance(x, value.__class__):
-                return True
-        return False
+        return self._find(value.name, value._dimclass) is not None
 
     def get_matching_dim(self, dim):
-        if isinstance(dim, DimBase):
-            for x in self:
-                if x.name == dim.name and isinstance(x, dim.__class__):
-                    return x
-        raise KeyError("No dim matching %r" % dim)
+        return self[self.matching_index(dim)]
 
     def matching_index(self, value):
         if isinstance(value, DimBase):
-            for idx, x in enumerate(self):
-                if x.name == value.name and isinstance(x, value.__class__):
-                    return idx
+            idx = self._find(value.name, value._dimclass)
+            if idx is not None:
+                return idx
         raise KeyError("No dim matching %r" % value)
 
+    def name_index(self, name, cls=None):
+        u"""Return index of first dim called *name* that is an instance of
+           *cls*. Return None if there is none.
+        """
+        return self._find(name, DimBase if cls is None else cls)
+
 
 class DimsList(list):
+    u"""List of dimensions with the same matching methods as *Dims*. The
+       name index is rebuilt on first lookup after a modification.
+    """
+    _name_index = None
+
+    @property
+    def _index(self):
+        if self._name_index is None:
+            self._name_index = build_name_index(self)
+        return self._name_index
+
+    def _changed(self):
+        self._name_index = None
+
+    def _find(self, name, cls):
+        for idx in self._index.get(name, ()):
+            if isinstance(self[idx], cls):
+                return idx
+        return None
+
     def __contains__(self, value):
         if not isinstance(value, DimBase):
             return False
-        for x in self:
-            if x.name == value.name and isinstance(x, value.__class__):
-                return True
-        return False
+        return self._find(value.name, value._dimclass) is not None
 
     def get_matching_dim(self, value):
-        if isinstance(value, DimBase):
-            for x in self:
-                if x.name == value.name and isinstance(x, value.__class__):
-                    return x
-        raise KeyError("No dim matching %r" % value)
+        return self[self.matching_index(value)]
 
     def matching_index(self, value):
         if isinstance(value, DimBase):
-            for idx, x in enumerate(self):
-                if x.name == value.name and isinstance(x, value.__class__):
-                    return idx
+            idx = self._find(value.name, value._dimclass)
+            if idx is not None:
+                return idx
         raise KeyError("No dim matching %r" % value)
 
+    def append(self, value):
+        if self._name_index is not None and isinstance(value, DimBase):
+            index = self._name_index
+            index[value.name] = index.get(value.name, ()) + (len(self),)
+        list.append(self, value)
+
+    def extend(self, values):
+        self._changed()
+        list.extend(self, values)
+
+    def __iadd__(self, values):
+        self._changed()
+        return list.__iadd__(self, values)
+
+    def insert(self, idx, value):
+        self._changed()
+        list.insert(self, idx, value)
+
+    def pop(self, *idx):
+        self._changed()
+        return list.pop(self, *idx)
+
+    def remove(self, value):
+        self._changed()
+        list.remove(self, value)
+
+    def reverse(self):
+        self._changed()
+        list.reverse(self)
+
+    def sort(self, *k, **kw):
+        self._changed()
+        list.sort(self, *k, **kw)
+
+    def __setitem__(self, idx, value):
+        self._changed()
+        list.__setitem__(self, idx, value)
+
+    def __delitem__(self, idx):
+        self._changed()
+        list.__delitem__(self, idx)
+
+    def __setslice__(self, i, j, values):
+        self._changed()
+        list.__setslice__(self, i, j, values)
+
+    def __delslice__(self, i, j):
+        self._changed()
+        list.__delslice__(self, i, j)
+
+
+def selection_index(index):
+    u"""Convert boolean mask or integer array *index* to a slice when the
+       selected positions are equally spaced, otherwise return them as an
+       integer array.
+
+        >>> selection_index([False, True, True, True, False])
+        slice(1, 4, 1)
+        >>> selection_index([4, 2, 0])
+        slice(4, None, -2)
+        >>> selection_index([0, 1, 3])
+        array([0, 1, 3])
+    """
+    if isinstance(index, slice):
+        return index
+    index = np.asarray(index)
+    if index.dtype == bool:
+        index = np.flatnonzero(index)
+    if len(index) == 0:
+        return slice(0, 0)
+    start = int(index[0])
+    if len(index) == 1:
+        return slice(start, start + 1)
+    step = int(index[1] - index[0])
+    if step == 0 or index.min() < 0 or (np.diff(index) != step).any():
+        return index
+    stop = int(index[-1]) + step
+    return slice(start, stop if stop >= 0 else None, step)
+
+
+class DimSelection(object):
+    u"""Selection of elements along dimension *dim*, given by a boolean
+       mask or an integer array *index*. The index and the new dimension
+       are computed once and can then be applied to any number of arrays
+       that have a dimension matching *dim*. Equally spaced selections
+       are applied as slices, other selections with fancy indexing.
+    """
+    def __init__(self, dim, index):
+        self.dim = dim
+        self.index = selection_index(index)
+        self.newdim = dim[self.index]
+
+    def apply(self, x, copy=False):
+        u"""Return *x* with selection applied. *x* is returned unchanged
+           if it does not have a dimension matching *dim*, same name and
+           *_dimclass*. A slice selection gives a view of *x* unless *copy*
+           is True.
+        """
+        i = x.dims.name_index(self.dim.name, self.dim._dimclass)
+        if i is None:
+            return x
+        idx = (slice(None),) * i + (self.index,)
+        dims = x.dims[:i] + (self.newdim,) + x.dims[i + 1:]
+        if hasattr(x, "materialize"):  # LazyArray, read slices directly
+            if isinstance(self.index, slice) and not x.materialized:
+                return hfarray(x[idx], dims=dims, unit=x.unit,
+                               outputformat=x.outputformat, copy=False)
+            x = x.materialize()
+        data = ndarray.__getitem__(x, idx)
+        if copy and isinstance(self.index, slice):
+            data = data.copy()
+        return x._wrap(data, dims)
+
+
+def match_values(data, values, rtol=0, atol=0):
+    u"""For each element in *values* return the index of the matching
+       element in the 1-D array *data*, or -1 if there is none. Numeric
+       values match if they differ at most *atol* + *rtol* * abs(value),
+       otherwise they must be equal. Uses a sorted search, O((N+M)log N).
+
+        >>> match_values([30, 10, 20], [10, 20, 25])
+        array([ 1,  2, -1])
+        >>> match_values([1., 2., 3.], [2.001, 3.1], atol=0.01)
+        array([ 1, -1])
+    """
+    data = np.asarray(data)
+    values = np.asarray(values)
+    if len(data) == 0:
+        return -np.ones(values.shape, dtype=np.intp)
+    order = np.argsort(data, kind="mergesort")
+    sdata = data[order]
+    pos = np.searchsorted(sdata, values).clip(0, len(sdata) - 1)
+    if (rtol or atol) and sdata.dtype.kind in "biufc":
+        left = (pos - 1).clip(0, len(sdata) - 1)
+        pick_left = abs(sdata[left] - values) < abs(sdata[pos] - values)
+        pos = np.where(pick_left, left, pos)
+        match = abs(sdata[pos] - values) <= atol + rtol * abs(values)
+    else:
+        match = sdata[pos] == values
+    return np.where(match, order[pos], -1)
+
+
+def match_mask(data, values, rtol=0, atol=0):
+    u"""Return boolean mask of the elements in the 1-D array *data* that
+       match any of *values*. Unlike *match_values* every matching element
+       is marked, also repeated ones. Real values match all elements within
+       *atol* + *rtol* * abs(value), complex values the elements equal to
+       the closest match.
+
+        >>> match_mask([1, 1, 2, 3], [1, 3]).tolist()
+        [True, True, False, True]
+    """
+    data = np.asarray(data)
+    values = np.asarray(values)
+    mask = np.zeros(len(data), dtype=bool)
+    if len(data) == 0:
+        return mask
+    order = np.argsort(data, kind="mergesort")
+    sdata = data[order]
+    if (rtol or atol) and sdata.dtype.kind in "biuf":
+        tol = atol + rtol * abs(values)
+        lo = np.searchsorted(sdata, values - tol, side="left")
+        hi = np.searchsorted(sdata, values + tol, side="right")
+    else:
+        if (rtol or atol) and sdata.dtype.kind == "c":
+            idx = match_values(data, values, rtol, atol)
+            values = data[idx[idx >= 0]]
+        lo = np.searchsorted(sdata, values, side="left")
+        hi = np.searchsorted(sdata, values, side="right")
+    lo = np.asarray(lo, dtype=np.intp).ravel()
+    hi = np.asarray(hi, dtype=np.intp).ravel()
+    size = len(sdata) + 1
+    count = np.cumsum(np.bincount(lo, minlength=size) -
+                      np.bincount(hi, minlength=size))
+    mask[order[count[:-1] > 0]] = True
+    return mask
+
+
+def select_values(dim, values, rtol=0, atol=0):
+    u"""Return *DimSelection* of the elements of *dim* that match any of
+       *values*, see *match_mask*. The selection keeps the order of
+       *dim*.
+    """
+    if isinstance(values, DimBase):
+        values = values.data
+    mask = match_mask(dim.data, np.asarray(values).ravel(), rtol, atol)
+    return DimSelection(dim, mask)
+
 
 def as_strided(x, shape=None, strides=None, offset=0):
     u"""Low-level routine to reshape an array by specifying shape, strides,
@@ -214,20 +443,46 @@ def change_shape(x, newdims):
     if dims_has_complex(newdims):
         x = make_fullcomplex_array(x)
 
-    newself = x.view()
     newselfshape = []
     neworder = []
     selfdims = x.dims
     for dim in newdims:
-        if dim in x.dims:
-            newselfshape.append(x.shape[selfdims.matching_index(dim)])
-            neworder.append(selfdims.matching_index(dim))
+        if dim in selfdims:
+            idx = selfdims.matching_index(dim)
+            newselfshape.append(x.shape[idx])
+            neworder.append(idx)
         else:
             newselfshape.append(1)
-    newself = newself.transpose(*neworder)
+    newself = ndarray.transpose(x, neworder)
     newself.shape = tuple(newselfshape)
-    newself.dims = Dims(newdims)
-    return newself
+    return x._wrap(newself, newdims)
+
+
+def aligned_data(x, newdims):
+    u"""Return the data of *x* as a plain ndarray view with its axes ordered
+       as *newdims*. Dimensions missing in *x* get length 1.
+    """
+    if dims_has_complex(newdims):
+        return change_shape(x, newdims).view(type=ndarray)
+    shape = []
+    order = []
+    xdims = x.dims
+    for dim in newdims:
+        if dim in xdims:
+            idx = xdims.matching_index(dim)
+            shape.append(x.shape[idx])
+            order.append(idx)
+        else:
+            shape.append(1)
+    if len(order) != x.ndim:
+        msg = "Dimensions of array not in %r" % (tuple(newdims),)
+        raise DimensionMismatchError(msg)
+    data = ndarray.view(x, ndarray)
+    if order != list(range(x.ndim)):
+        data = data.transpose(order)
+    if data.ndim != len(shape):
+        data = data.reshape(shape)
+    return data
 
 
 def make_same_dims_list(a):
@@ -267,30 +522,29 @@ def remove_tail(x):
 
 
 def remove_rep(data, newdimname="AllReps"):
-    u"""Collapse all DimRep dimensions to single dimension
+    u"""Collapse all DimRep dimensions to single dimension placed where the
+       first DimRep dimension is. The result is a view of *data* when the
+       DimRep dimensions are adjacent and can be reshaped without copying.
     """
-    order = [(i, dim) for i, dim in enumerate(data.dims)
-             if isinstance(dim, DimRep)]
-#    pdb.set_trace()
-
-    if order:
-        dims = list(zip(*order))[1]
-
-        newdata = data.reorder_dimensions(*(data.dims[:order[0][0]] + dims))
-        newdata = hfarray(np.ascontiguousarray(data, dtype=data.dtype),
-                          dims=newdata.dims, dtype=newdata.dtype,
-                          unit=newdata.unit)
-        shapes = [data.shape[i] for i, _ in order]
-        repsize = int(np.multiply.reduce(shapes))
-        a = np.array(data)
-        a.shape = (data.shape[:order[0][0]] + (repsize,) +
-                   data.shape[order[-1][0] + 1:])
-        dims = (data.dims[:order[0][0]] + (DimRep(newdimname, repsize),) +
-                data.dims[order[-1][0] + 1:])
-    else:
-        dims = data.dims
-        a = data
-    return data.__class__(a, dims=dims, copy=False)
+    if hasattr(data, "materialize"):  # LazyArray
+        data = data.materialize()
+    reps = [i for i, dim in enumerate(data.dims) if isinstance(dim, DimRep)]
+    if not reps:
+        return data.__class__(data, dims=data.dims, copy=False)
+    first = reps[0]
+    rest = [i for i in range(data.ndim) if i not in reps]
+    order = rest[:first] + reps + rest[first:]
+    a = data
+    if order != list(range(data.ndim)):
+        a = ndarray.transpose(a, order)
+    repsize = int(np.multiply.reduce([data.shape[i] for i in reps]))
+    a = ndarray.reshape(a, (a.shape[:first] + (repsize,) +
+                            a.shape[first + len(reps):]))
+    dims = tuple(data.dims[i] for i in order)
+    dims = (dims[:first] + (DimRep(newdimname, repsize),) +
+            dims[first + len(reps):])
+    return data._wrap(a, dims, unit=data.unit,
+                      outputformat=data.outputformat)
 
 
 def make_fullcomplex_array(a):
@@ -347,6 +601,11 @@ def check_instance(func):
             pass
         if isnumber(other):
             a, b = self, other
+        elif HAS_ARRAY_UFUNC:
+            # __array_ufunc__ aligns the operands
+            if not isinstance(other, _hfarray):
+                other = self.__class__(other)
+            a, b = self, other
         else:
             a, b = make_same_dims(self, self.__class__(other))
         return func(a, b)
@@ -406,17 +665,12 @@ class _hfarray(ndarray):
         subarr.verify_dimension()
         if outputformat is not None:
             subarr.outputformat = outputformat
+        elif isinstance(data, _hfarray):
+            subarr.outputformat = data.__dict__.get("_outputformat")
         elif hasattr(data, "outputformat"):
             subarr.outputformat = data.outputformat
         else:
-            if is_integer(subarr):
-                subarr.outputformat = "%d"
-            elif is_numlike(subarr):
-                subarr.outputformat = "%.16e"
-            elif np.issubdtype(subarr.dtype, np.datetime64):
-                subarr.outputformat = "%s"
-            else:
-                subarr.outputformat = "%s"
+            subarr.outputformat = None
 
         # Finally, we must return the newly created object:
         if unit is None and hasattr(data, "unit"):
@@ -425,13 +679,54 @@ class _hfarray(ndarray):
             subarr.__dict__["unit"] = unit
         return subarr
 
+    @classmethod
+    def _wrap(cls, data, dims, unit=None, outputformat=None):
+        u"""Internal fast constructor. Wraps the ndarray *data* without
+           copying it. *dims* must already match the shape of *data*, no
+           validation is done. Unit and outputformat are inherited from
+           *data* unless given. If *data* already is of this class it is
+           updated in place, so only pass freshly created arrays.
+        """
+        if type(data) is cls:
+            out = data
+        else:
+            out = ndarray.view(data, cls)
+            if not isinstance(data, _hfarray):
+                out.__dict__["_outputformat"] = None
+        out.__dict__["_dims"] = dims if isinstance(dims, Dims) else Dims(dims)
+        if unit is not None:
+            out.__dict__["unit"] = unit
+        if outputformat is not None:
+            out.__dict__["_outputformat"] = outputformat
+        return out
+
     @property
     def dims(self):
         return self._dims
 
     @dims.setter
     def dims(self, value):
-        self._dims = Dims(value)
+        self._dims = value if isinstance(value, Dims) else Dims(value)
+
+    @property
+    def outputformat(self):
+        u"""Format string used when writing the data to file. Unless set
+           explicitly it is chosen from the dtype on first access.
+        """
+        fmt = self.__dict__.get("_outputformat")
+        if fmt is None:
+            if is_integer(self):
+                fmt = "%d"
+            elif is_numlike(self):
+                fmt = "%.16e"
+            else:
+                fmt = "%s"
+            self.__dict__["_outputformat"] = fmt
+        return fmt
+
+    @outputformat.setter
+    def outputformat(self, value):
+        self.__dict__["_outputformat"] = value
 
     @property
     def info(self):
@@ -454,10 +749,64 @@ class _hfarray(ndarray):
         return "\n".join(out)
 
     def __array_finalize__(self, obj):
-        self.__dict__["_dims"] = Dims(getattr(obj, "_dims", Dims()))
-        self.__dict__["outputformat"] = getattr(obj, "outputformat", "%.16e")
+        dims = getattr(obj, "_dims", ())
+        self.__dict__["_dims"] = (dims if isinstance(dims, Dims)
+                                  else Dims(dims))
+        if isinstance(obj, _hfarray):
+            self.__dict__["_outputformat"] = obj.__dict__.get("_outputformat")
+        else:
+            self.__dict__["_outputformat"] = getattr(obj, "outputformat",
+                                                     "%.16e")
         self.__dict__["unit"] = getattr(obj, "unit", None)
 
+    def __array_ufunc__(self, ufunc, method, *inputs, **kw):
+        u"""Ufunc override (NEP 13), used by numpy >= 1.13. Array
+           arguments are aligned by dimension name and the ufunc is applied
+           to the raw data. With *out* the dimensions of *out* are used.
+        """
+        out = kw.get("out", ())
+        arrays = [x for x in inputs + out if isinstance(x, _hfarray)]
+        template = max(arrays, key=lambda x: x.__array_priority__)
+        if method != "__call__":
+            args = [ndarray.view(x, ndarray) if isinstance(x, _hfarray)
+                    else x for x in inputs]
+            if out:
+                kw["out"] = tuple(ndarray.view(x, ndarray)
+                                  if isinstance(x, _hfarray) else x
+                                  for x in out)
+            result = getattr(ufunc, method)(*args, **kw)
+            if out:
+                return out[0] if len(out) == 1 else out
+            dims = _ufunc_method_dims(method, inputs, kw)
+            if dims is None:
+                return result
+            return _wrap_result(template, result, dims)
+
+        outarrays = [x for x in out if isinstance(x, _hfarray)]
+        if outarrays:
+            newdims = outarrays[0].dims
+        else:
+            newdims = dims_union(*[x for x in inputs
+                                   if isinstance(x, _hfarray)])
+        args = [aligned_data(x, newdims) if isinstance(x, _hfarray) else x
+                for x in inputs]
+        if out:
+            kw["out"] = tuple(aligned_data(x, newdims)
+                              if isinstance(x, _hfarray) else x
+                              for x in out)
+        where = kw.get("where")
+        if isinstance(where, _hfarray):
+            kw["where"] = aligned_data(where, newdims)
+        result = ufunc(*args, **kw)
+        if ufunc.nout == 1:
+            result = (result,)
+        if not out:
+            out = (None,) * ufunc.nout
+        result = tuple(_wrap_result(template, r, newdims)
+                       if o is None else o
+                       for r, o in zip(result, out))
+        return result[0] if len(result) == 1 else result
+
     def verify_dimension(self):
         u"""Internal function that checks to see if the arrays dimensions match
            those of the *dims* specification.
@@ -468,12 +817,11 @@ class _hfarray(ndarray):
     def dims_index(self, name, cls=None):
         u"""Leta upp index for axisobjekt med *name*
         """
-        for idx, ax in enumerate(self.dims):
-            if ax.name == name:
-                if cls is None:
-                    return idx
-                elif isinstance(ax, cls):
-                    return idx
+        if isinstance(name, DimBase):
+            name = name.name
+        idx = self.dims.name_index(name, cls)
+        if idx is not None:
+            return idx
         msg = "Can not find AxisObject with name:%r and cls:%s" % (name, cls)
         raise IndexError(msg)
 
@@ -495,8 +843,7 @@ class _hfarray(ndarray):
            same data.
         """
         if type is None:
-            return self.__class__(ndarray.view(self, dtype=self.dtype),
-                                  dims=self.dims, copy=False)
+            return ndarray.view(self)
         else:
             return ndarray.view(self, dtype=self.dtype, type=type)
 
@@ -522,8 +869,8 @@ class _hfarray(ndarray):
         """
         if not order:
             order = range(self.ndim)[::-1]
-        return self.__class__(ndarray.transpose(self, *order),
-                              dims=[self.dims[i] for i in order], copy=False)
+        return self._wrap(ndarray.transpose(self, *order),
+                          [self.dims[i] for i in order])
 
     @property
     def T(self):
@@ -585,16 +932,14 @@ class _hfarray(ndarray):
         else:
             newinfo = [ax for idx, ax in enumerate(self.dims)
                        if idx not in dimidxs]
-        return self.__class__(ndarray.squeeze(self, axis=dimidxs),
-                              dims=newinfo, copy=False)
+        return self._wrap(ndarray.squeeze(self, axis=dimidxs), newinfo)
 
     def apply_outputformat(fun):
         def __getitem__(self, *x, **kw):
             out = fun(self, *x, **kw)
-            if hasattr(self, "outputformat") and hasattr(out, "outputformat"):
-                out.outputformat = self.outputformat
-            if hasattr(self, "unit") and hasattr(out, "unit"):
-                out.unit = self.unit
+            if isinstance(out, _hfarray):
+                out.__dict__["_outputformat"] = self._outputformat
+                out.__dict__["unit"] = self.unit
             return out
         return __getitem__
 
@@ -633,7 +978,12 @@ class _hfarray(ndarray):
         testbool = (len(indices) == 1 and
                     isinstance(indices[0], hfarray) and
                     indices[0].dtype == bool)
-        if testbool:
+        if testbool and len(indices[0].dims) == 1:
+            dim = indices[0].dims[0]
+            if dim not in self.dims:
+                raise ValueError("%r not in dims" % (dim,))
+            return DimSelection(dim, indices[0]).apply(self, copy=True)
+        elif testbool:
             reorder = []
             for dim in self.dims:
                 if dim not in indices[0].dims:
@@ -642,13 +992,7 @@ class _hfarray(ndarray):
                     break
             reorder2 = reorder + list(indices[0].dims)
             reordered = self.reorder_dimensions(*reorder2)
-            if len(indices[0].dims) == 1:
-                dim = indices[0].dims[0]
-                newdim = dim.__class__(dim.name,
-                                       np.array(dim.data)[indices[0]],
-                                       unit=dim.unit)
-            else:
-                newdim = get_new_anonymous_dim(self, int(np.sum(indices[0])))
+            newdim = get_new_anonymous_dim(self, int(np.sum(indices[0])))
 
             dims = (reordered.dims[:len(reorder)] +
                     (newdim,) +
@@ -671,7 +1015,7 @@ class _hfarray(ndarray):
             indices = orig_indices
         out = ndarray.__getitem__(self, indices)
         if isinstance(out, ndarray):
-            return self.__class__(out, dims=dims, copy=False)
+            return self._wrap(out, dims)
         else:
             return out
 
@@ -768,6 +1112,39 @@ class _hfarray(ndarray):
         """
         return self.__class__(self)
 
+    def _writable(self):
+        u"""Return the array to write to, resolving copy-on-write sharing
+           (see hftools.dataset.cow).
+        """
+        cow = self.__dict__.get("_cow")
+        if cow is None:
+            return self
+        return cow[0].release(self)
+
+    def __setitem__(self, index, value):
+        ndarray.__setitem__(self._writable(), index, value)
+
+    def __setslice__(self, i, j, value):
+        ndarray.__setslice__(self._writable(), i, j, value)
+
+    def __iadd__(self, other):
+        return ndarray.__iadd__(self._writable(), other)
+
+    def __isub__(self, other):
+        return ndarray.__isub__(self._writable(), other)
+
+    def __imul__(self, other):
+        return ndarray.__imul__(self._writable(), other)
+
+    def __idiv__(self, other):
+        return ndarray.__idiv__(self._writable(), other)
+
+    def __itruediv__(self, other):
+        return ndarray.__itruediv__(self._writable(), other)
+
+    def __ipow__(self, other):
+        return ndarray.__ipow__(self._writable(), other)
+
     def rss(self, axis=None):
         u"""Berakna kvadratsumma over *axis*. Dar *axis* specas av index till
            *dims*.
@@ -961,35 +1338,83 @@ def axis_handler(a, axis):
 
 
 def multiple_axis_handler(a, axis):
+    u"""Return tuple of dims and tuple of their indices for *axis* in the
+       hfarray *a*. *a* can also be a *Dims* object.
+    """
     if axis is None:
         return None, None
     if not isinstance(axis, (tuple, list)):
         axis = [axis]
+    dims = a if isinstance(a, Dims) else a.dims
     outaxis = []
     outidx = []
     for ax in axis:
         if isinstance(ax, integer_types):
-            outaxis.append(a.dims[ax])
+            outaxis.append(dims[ax])
             outidx.append(ax)
             continue
         if isinstance(ax, string_types):
-            i = a.dims_index(ax)
-            ax = a.dims[i]
+            i = dims.name_index(ax)
+            if i is None:
+                msg = "Can not find AxisObject with name:%r" % (ax,)
+                raise IndexError(msg)
+            ax = dims[i]
         if isinstance(ax, type) and issubclass(ax, DimBase):
-            for dimidx, dim in enumerate(a.dims):
+            for dimidx, dim in enumerate(dims):
                 if isinstance(dim, ax):
                     outaxis.append(dim)
                     outidx.append(dimidx)
-        elif isinstance(ax, DimBase) and ax in a.dims:
+        elif isinstance(ax, DimBase) and ax in dims:
             outaxis.append(ax)
-            outidx.append(a.dims.index(ax))
+            outidx.append(dims.index(ax))
         else:
             msg = "%r dimension not present in dims %r"
-            msg = msg % (ax, a.dims)
+            msg = msg % (ax, dims)
             raise IndexError(msg)
     return tuple(outaxis), tuple(outidx)
 
 
+def _ufunc_method_dims(method, inputs, kw):
+    u"""Return dims of the result of ufunc method *method* applied to
+       *inputs* with keyword arguments *kw*. Return None when the result
+       is given as a plain ndarray, for reductions with keepdims, reduceat
+       and outer products of arrays without dims or with a common dim.
+    """
+    if method == "outer":
+        if not all(isinstance(x, _hfarray) for x in inputs):
+            return None
+        dims = inputs[0].dims + inputs[1].dims
+        if len(set(dim.name for dim in dims)) < len(dims):
+            return None
+        return dims
+    if method not in ("reduce", "accumulate"):
+        return None
+    dims = inputs[0].dims
+    if method == "accumulate":
+        return dims
+    if kw.get("keepdims"):
+        return None
+    axis = kw.get("axis", 0)
+    if axis is None:
+        return ()
+    if isinstance(axis, integer_types):
+        axis = (axis,)
+    axis = [ax % len(dims) for ax in axis]
+    return tuple(dim for idx, dim in enumerate(dims) if idx not in axis)
+
+
+def _wrap_result(template, data, dims):
+    u"""Wrap ufunc output *data* as the class of *template*, copying its
+       metadata like numpy does for __array_wrap__.
+    """
+    if not isinstance(data, ndarray):
+        return data
+    out = ndarray.view(data, type(template))
+    out.__array_finalize__(template)
+    out.__dict__["_dims"] = dims if isinstance(dims, Dims) else Dims(dims)
+    return out
+
+
 class hfarray(_hfarray):
     def __new__(subtype, data, dims=None, dtype=None, copy=True, order=None,
                 subok=False, ndmin=0, unit=None, outputformat=None, info=None):
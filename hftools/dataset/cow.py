@@ -0,0 +1,146 @@
+# -*- coding: ISO-8859-1 -*-
+#-----------------------------------------------------------------------------
+# Copyright (c) 2014, HFTools Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+u"""
+cow
+===
+
+Copy-on-write support for DataBlock variables and a counter for the
+number of bytes copied by DataBlock operations.
+
+Variables shared copy-on-write, see *DataBlock.cow_copy*, are read-only
+views of the same buffer. Writing with item assignment or an augmented
+operator first releases the array, see *CowGroup.release*.
+"""
+import functools
+import weakref
+
+import numpy as np
+
+
+class CopyCounter(object):
+    u"""Counts bytes copied per operation while used as a context manager.
+
+        >>> import numpy as np
+        >>> from hftools.dataset import DataBlock, hfarray
+        >>> db = DataBlock()
+        >>> db.a = hfarray(np.zeros(1000))
+        >>> with copy_counter:
+        ...     db2 = db.cow_copy()
+        ...     db2.a[0] = 1
+        >>> sorted(copy_counter.counts.items())
+        [('copy-on-write', 8000), ('cow_copy', 0)]
+    """
+    def __init__(self):
+        self.enabled = False
+        self.counts = {}
+        self.operations = []
+
+    def __enter__(self):
+        self.reset()
+        self.enabled = True
+        return self
+
+    def __exit__(self, *exc):
+        self.enabled = False
+
+    def reset(self):
+        self.counts = {}
+        self.operations = []
+
+    def add(self, nbytes, operation=None):
+        u"""Add *nbytes* to *operation*, by default the outermost operation
+           running or "copy-on-write".
+        """
+        if not self.enabled:
+            return
+        if operation is None:
+            operation = (self.operations[0] if self.operations
+                         else "copy-on-write")
+        self.counts[operation] = self.counts.get(operation, 0) + nbytes
+
+    def report(self):
+        u"""Return table of bytes copied per operation, largest first."""
+        rows = sorted(self.counts.items(), key=lambda x: -x[1])
+        return "\n".join("%-30s %14d" % row for row in rows)
+
+
+copy_counter = CopyCounter()
+
+
+class CowGroup(object):
+    u"""Arrays sharing a buffer copy-on-write. Each member belongs to an
+       owner, a dict-like object holding it, that gets the private copy
+       when the member is written.
+    """
+    def __init__(self):
+        self.members = []
+
+    def add(self, x, owner):
+        x.flags.writeable = False
+        x.__dict__["_cow"] = (self, weakref.ref(owner))
+        self.members.append(weakref.ref(x))
+
+    def shared(self, x):
+        u"""True if a member other than *x* still uses the buffer."""
+        for ref in self.members:
+            y = ref()
+            if y is None or y is x or "_cow" not in y.__dict__:
+                continue
+            owner = y.__dict__["_cow"][1]()
+            if owner is not None and any(v is y for v in owner.values()):
+                return True
+        return False
+
+    def release(self, x):
+        u"""Make *x* private before a write and return the array to write
+           to. If no other member uses the buffer *x* itself is made
+           writable, otherwise *x* is copied and the copy replaces *x* in
+           its owner.
+        """
+        _, ownerref = x.__dict__.pop("_cow")
+        if not self.shared(x):
+            try:
+                x.flags.writeable = True
+                return x
+            except ValueError:  # Buffer is read-only
+                pass
+        new = x.copy()
+        copy_counter.add(new.nbytes)
+        owner = ownerref()
+        if owner is not None:
+            owner.replace_value(x, new)
+        return new
+
+
+def count_copies(func):
+    u"""Decorator for DataBlock methods returning a new DataBlock. Variables
+       of the result not sharing memory with a variable of the input are
+       counted as copied by the operation. Only the outermost operation is
+       counted.
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(self, *k, **kw):
+        if not copy_counter.enabled:
+            return func(self, *k, **kw)
+        outer = not copy_counter.operations
+        copy_counter.operations.append(name)
+        try:
+            out = func(self, *k, **kw)
+        finally:
+            copy_counter.operations.pop()
+        if outer:
+            copy_counter.add(0, name)
+            inputs = self.vardata.values()
+            for v in getattr(out, "vardata", {}).values():
+                if not any(np.may_share_memory(v, x) for x in inputs):
+                    copy_counter.add(v.nbytes, name)
+        return out
+    return wrapper
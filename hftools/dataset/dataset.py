@@ -22,17 +22,22 @@ import re
 
 import numpy as np
 import numpy.random as rnd
-from numpy import zeros, array, linspace
+from numpy import linspace
 
 from hftools.dataset.arrayobj import hfarray, ismatrix,\
-    remove_rep, _hfarray
+    remove_rep, _hfarray, DimSelection, select_values
 from hftools.dataset.dim import DimBase, DimSweep, DimRep,\
     DimMatrix_i, DimMatrix_j, DiagAxis
-from hftools.utils import warn, stable_uniq
+from hftools.utils import warn
 from hftools.dataset.helper import guess_unit_from_varname
+from hftools.dataset.cow import CowGroup, count_copies
+from hftools.dataset.interpolation import get_interpolator
 from hftools.py3compat import cast_unicode, cast_str, string_types
 
 
+REPORT_SAMPLES = 10000
+
+
 class DataBlockError(Exception):
     pass
 
@@ -150,6 +155,36 @@ class DataDict(dict):
         out.order = self.order[:]
         return out
 
+    def cow_copy(self):
+        u"""Return copy where arrays are shared copy-on-write with *self*.
+           The buffer is copied on the first write through either dict.
+           The arrays of *self* are made read-only, so write them through
+           the dict (d[k][0] = 1, d[k] += 1), not with *fill*, *out=* or
+           views.
+        """
+        out = self.__class__()
+        for k, v in self.items():
+            if isinstance(v, _hfarray):
+                cow = v.__dict__.get("_cow")
+                if cow is None:
+                    group = CowGroup()
+                    group.add(v, self)
+                else:
+                    group = cow[0]
+                w = v.view()
+                group.add(w, out)
+                dict.__setitem__(out, k, w)
+            else:
+                dict.__setitem__(out, k, v.copy())
+        out.order = self.order[:]
+        return out
+
+    def replace_value(self, old, new):
+        u"""Replace value that is identical to *old* with *new*."""
+        for k, v in dict.items(self):
+            if v is old:
+                dict.__setitem__(self, k, new)
+
     def keys(self):
         return [v for v in self]
 
@@ -208,6 +243,7 @@ class DataBlock(object):
         self.__dict__["_outputformat"] = "%.16e"
         self.__dict__["_xname"] = None
 
+    @count_copies
     def keep_variables(self, vars):
         db = DataBlock()
         db.blockname = self.blockname
@@ -384,6 +420,7 @@ class DataBlock(object):
                 out.append(x)
         return out
 
+    @count_copies
     def copy(self):
         out = DataBlock()
         out.blockname = self.blockname
@@ -394,6 +431,22 @@ class DataBlock(object):
         out.xname = self.xname
         return out
 
+    @count_copies
+    def cow_copy(self):
+        u"""Return copy sharing the variables copy-on-write with *self*,
+           see *DataDict.cow_copy*. Use *copy* if the variables of *self*
+           must stay writable.
+        """
+        out = DataBlock()
+        out.blockname = self.blockname
+        if self.comments:
+            out.comments = self.comments.copy()
+        out.vardata = self.vardata.cow_copy()
+        out.ivardata = self.ivardata.copy()
+        out.xname = self.xname
+        return out
+
+    @count_copies
     def view(self):
         out = DataBlock()
         out.blockname = self.blockname
@@ -403,7 +456,14 @@ class DataBlock(object):
         out.xname = self.xname
         return out
 
-    def filter(self, boolarray):
+    @count_copies
+    def filter(self, boolarray, rtol=0, atol=0, copy=True):
+        u"""Return new DataBlock where *boolarray* selects elements of its
+           dimension. If *boolarray* is not boolean it is instead a list of
+           values to keep, matched within tolerance (*rtol*, *atol*).
+           With *copy* False equally spaced selections, e.g. a contiguous
+           band, give views of the data, see *select*.
+        """
         if boolarray.squeeze().ndim > 1:
             raise ValueError("filter can only use array with one dimension")
         if boolarray.dtype != np.dtype(bool):
@@ -414,45 +474,40 @@ class DataBlock(object):
                 warn(msg)
                 return out
             localdim = self.ivardata[boolarray.dims[0].name]
-            intersection = set(localdim.data).intersection(boolarray)
-            barray = boolarray.astype(bool)
-            barray[...] = False
-            for f in intersection:
-                barray[boolarray == f] = True
-            boolarray = barray
-
+            selection = select_values(localdim, boolarray, rtol, atol)
+            return self.select(selection, copy=copy)
+        return self.select(DimSelection(boolarray.dims[0], boolarray),
+                           copy=copy)
+
+    @count_copies
+    def select(self, selection, copy=True):
+        u"""Return new DataBlock with the *DimSelection* *selection* applied
+           to all variables. The index is computed once, and equally spaced
+           selections are copied as slices, or give views of the data if
+           *copy* is False. Variables without the dimension are views.
+        """
         out = DataBlock()
         out.blockname = self.blockname
         out.comments = self.comments
         out.xname = self.xname
 
-        olddim = boolarray.dims[0]
-        newdim = olddim.__class__(olddim, data=olddim.data[boolarray])
-
         for v in self.vardata.keys():
             data = self.vardata[v].view()
-            try:
-                i = data.dims_index(boolarray.dims[0])
-            except IndexError:  # This variable does not sweep in boolarray dim
-                out[v] = data
-                continue
-            newinfo = list(data.dims)
-            reorder = list(range(data.ndim))
-            del newinfo[i]
-            del reorder[i]
-            reorder = tuple([i] + reorder)
-            newinfo = tuple([newdim] + newinfo)
-            data = data.transpose(*reorder)
-            utdata = hfarray(array(data)[boolarray], dims=newinfo,
-                             unit=data.unit,
-                             outputformat=data.outputformat)
-            dimorder = [x.name for x in self.vardata[v].dims]
-            utdata = utdata.reorder_dimensions(*dimorder)
-            out[v] = utdata
+            out[v] = selection.apply(data, copy=copy)
         out.xname = self.xname
         return out
 
-    def sort(self, dim):
+    @count_copies
+    def sort(self, dim, return_selection=False, copy=False):
+        u"""Return new DataBlock sorted by the values of the one dimensional
+           array *dim*. Already sorted and strictly decreasing dimensions
+           give views of the data, without sorting, unless *copy* is True.
+           Other orders are copied.
+
+           If *return_selection* is True the *DimSelection* used is also
+           returned, it can be applied to other DataBlocks on the same grid
+           using *select*.
+        """
         dim = hfarray(dim, copy=False).squeeze()
         if dim.ndim > 1:
             msg = "sort can only get sort direction from array with"\
@@ -466,60 +521,48 @@ class DataBlock(object):
             msg = msg % dimname
             warn(msg)
             out = self.copy()
-            return out
-
-        sortorder = dim.argsort()
-
-        out = DataBlock()
-        out.blockname = self.blockname
-        out.comments = self.comments
-        out.xname = self.xname
-
-        for v in self.vardata.keys()[:]:
-            data = self.vardata[v].view()
-            try:
-                i = data.dims_index(dimname)
-                out[v] = data.take(sortorder, i)
-            except IndexError:  # This variable does not contain sort direction
-                out[v] = data
-                continue
-
-        olddim = self.ivardata[dimname]
-        out.xname = self.xname
-        data = self[dimname][sortorder]
-        out.replace_dim(olddim, olddim.__class__(olddim, data=data))
+            selection = None
+        else:
+            selection = DimSelection(self.ivardata[dimname], sort_order(dim))
+            out = self.select(selection, copy=copy)
+        if return_selection:
+            return out, selection
         return out
 
-    def ivar_report(self, name):
+    def ivar_report(self, name, mode="full"):
         #local import to avoid circular import
         from hftools.constants import SIFormat
+        dim = self.ivardata[name]
         try:
-            self.ivardata[name].data + 0
+            np.asarray(dim._data[:1]) + 0
             isnumber = True
         except TypeError:
             isnumber = False
         tofmt = dict(name=name)
-        tofmt["N"] = "<%s>" % (len(self.ivardata[name].data.flat))
+        tofmt["N"] = "<%s>" % dim.fullsize()
 
         if isnumber:
-            if np.issubdtype(self.ivardata[name].data.dtype, np.int):
+            if np.issubdtype(dim._data.dtype, np.int):
                 fmt = "%d "  # space ensures split will give two fields
             else:
-                fmt = SIFormat(unit=self.ivardata[name].unit, digs=None)
-            tofmt["shape"] = "<%s>" % self.ivardata[name].data.shape[0]
-            if self.report_minmax:
-                value, unit = (fmt % self.ivardata[name].data.max()).split(" ")
-                tofmt["maxvalue"] = value
+                fmt = SIFormat(unit=dim.unit, digs=None)
+            tofmt["shape"] = "<%s>" % dim.fullsize()
+            if self.report_minmax and mode != "metadata":
+                samples = REPORT_SAMPLES if mode == "sample" else None
+                minvalue, maxvalue, exact = dim._minmax(samples)
+                prefix = "" if exact else "~"
+                value, unit = (fmt % maxvalue).split(" ")
+                tofmt["maxvalue"] = prefix + value
                 tofmt["maxunit"] = unit
-                value, unit = (fmt % self.ivardata[name].data.min()).split(" ")
-                tofmt["minvalue"] = value
+                value, unit = (fmt % minvalue).split(" ")
+                tofmt["minvalue"] = prefix + value
                 tofmt["minunit"] = unit
             else:
                 if self.report_units:
-                    unit = self.ivardata[name].unit
+                    unit = dim.unit
                     tofmt["unit"] = "[%s]" % (unit if unit is not None else "")
         else:
-            tofmt["dtype"] = "{%-5s}" % self.ivardata[name].data.dtype
+            tofmt["dtype"] = "{%-5s}" % dim._data.dtype
         return tofmt
 
     def format_table(self, tofmts, headers, outheaders=[], alignment=None):
@@ -551,7 +594,14 @@ class DataBlock(object):
             tofmt["unit"] = unit
         return tofmt
 
-    def report(self, report_maxwidth=None):
+    def report(self, report_maxwidth=None, mode="full"):
+        u"""Return report of dimensions and variables.
+
+           *mode* is "full" for exact min and max of dimensions, computed
+           once and cached, "sample" for approximate min and max using at
+           most REPORT_SAMPLES elements (marked by ~) or "metadata" to not
+           look at the data at all, this is used by __repr__.
+        """
         if report_maxwidth is None:
             report_maxwidth = self.report_maxwidth
         report_strings = [u"Blockname: %s" % self.blockname]
@@ -563,7 +613,7 @@ class DataBlock(object):
 
         if self.ivardata.keys():
             ivarrows = [u"Dimensions:"]
-            for row in self.format_table([self.ivar_report(name)
+            for row in self.format_table([self.ivar_report(name, mode)
                                           for name in self.ivardata.keys()],
                                          ["name", "unit",
                                           "shape", "minvalue", "minunit",
@@ -599,7 +649,7 @@ class DataBlock(object):
         return cast_str(self.report())
 
     def __repr__(self):
-        return cast_str(self.report())
+        return cast_str(self.report(mode="metadata"))
 
     def __dir__(self):  # pragma: no cover
         elemnames = []
@@ -638,48 +688,60 @@ class DataBlock(object):
                         if getattr(v, "unit", "") is None:
                             v.unit = unit
 
+    @count_copies
     def remove_rep(self, newdimname="AllReps"):
         out = DataBlock()
         out.comments = self.comments
         dims = [x for x in self.ivardata.values() if isinstance(x, DimRep)]
-        fullshape = tuple(x.data.shape[0] for x in dims)
-        newdim = DimRep(newdimname, np.arange(np.multiply.reduce(fullshape)))
-        for idx, dim in enumerate(dims):
-            data = zeros(fullshape, dtype=dims[idx].data.dtype)
-            a = hfarray(data, dims=dims)
-            sliceidx = ((None,) * idx + (slice(None),) +
-                        (None,) * (len(fullshape) - 1 - idx))
-            a[...] = dim.data[sliceidx]
-            a = np.array(a, copy=False)
-            a.shape = (newdim.data.shape[0],)
-            out[dim.name] = hfarray(a, dims=(newdim,))
+        if dims:
+            fullshape = tuple(x.data.shape[0] for x in dims)
+            newdim = DimRep(newdimname, int(np.multiply.reduce(fullshape)))
+            index = np.unravel_index(np.arange(len(newdim.data)), fullshape)
+            for dim, idx in zip(dims, index):
+                out[dim.name] = hfarray(dim.data[idx], dims=(newdim,),
+                                        copy=False)
         for x in self.vardata:
             out[x] = remove_rep(self[x], newdimname)
         return out
 
-    def hyper(self, dimnames, replacedim, indexed=False, all=True):
+    @count_copies
+    def hyper(self, dimnames, replacedim, indexed=False, all=True,
+              fill=None):
+        u"""Return new DataBlock where dimension *replacedim* is replaced by
+           a hypercube with one DimSweep per variable in *dimnames*.
+           Sweep values are kept in order of first appearance.
+
+           Grid points missing from the data are set to *fill*, if *fill*
+           is None an incomplete grid raises ValueError. The same grid point
+           occurring more than once always raises ValueError.
+        """
         if isinstance(replacedim, string_types):
             replacedim = self.ivardata[replacedim]
         out = DataBlock()
         out.blockname = self.blockname
+        values, index = hypercube_index([self[x] for x in dimnames])
         dims = []
-        sortdata = []
-        for x in dimnames:
+        for x, data in zip(dimnames, values):
             if indexed:
                 newname = "%s_index" % x
             else:
                 newname = x
-            dims.append(DimSweep(newname, stable_uniq(self[x]),
+            dims.append(DimSweep(newname, data,
                                  unit=self[x].unit,
                                  outputformat=self[x].outputformat))
-            sortdata.append(self[x])
         dims = tuple(dims)
         dims_shape = tuple(len(x.data) for x in dims)
-
-        sortdata.append(range(len(sortdata[0])))
-
-        sortorder = sorted(zip(*sortdata))
-        sortorderidx = [x[-1] for x in sortorder]
+        cubesize = int(np.multiply.reduce(dims_shape))
+
+        sortorder = np.argsort(index, kind="mergesort")
+        sortedindex = index[sortorder]
+        if (sortedindex[1:] == sortedindex[:-1]).any():
+            msg = "hyper: several rows have the same values of %r"
+            raise ValueError(msg % (list(dimnames),))
+        complete = len(index) == cubesize
+        if not complete and fill is None:
+            msg = "hyper: incomplete grid, %d of %d points present"
+            raise ValueError(msg % (len(index), cubesize))
 
         for dim in dims:
             out.ivardata[dim.name] = dim
@@ -694,17 +756,27 @@ class DataBlock(object):
             if k in out.ivardata:
                 continue
             i = v.dims_index(replacedim)
-            v = hfarray(v.take(sortorderidx, axis=i), copy=False, order="C")
-            new_shape = v.shape[:i] + dims_shape + v.shape[i + 1:]
-            v.shape = new_shape
-            v.dims = v.dims[:i] + dims + v.dims[i + 1:]
-            out[k] = v
+            if complete:
+                data = np.take(np.asarray(v), sortorder, axis=i)
+                outputformat = v.outputformat
+            else:
+                dtype = np.result_type(v.dtype, np.asarray(fill))
+                data = np.empty(v.shape[:i] + (cubesize,) + v.shape[i + 1:],
+                                dtype=dtype)
+                data.fill(fill)
+                data[(slice(None),) * i + (index,)] = v
+                outputformat = v.outputformat if dtype == v.dtype else None
+            data.shape = v.shape[:i] + dims_shape + v.shape[i + 1:]
+            out[k] = hfarray(data, dims=v.dims[:i] + dims + v.dims[i + 1:],
+                             unit=v.unit, outputformat=outputformat,
+                             copy=False)
 
         for k, v in self.ivardata.items():
             if k not in out and k != replacedim.name:
                 out[k] = v
         return out
 
+    @count_copies
     def squeeze(self):
         db = DataBlock()
         db.blockname = self.blockname
@@ -715,6 +787,7 @@ class DataBlock(object):
             db[k] = v
         return db
 
+    @count_copies
     def interpolate(self, variable, defaultmode=None):
         out = DataBlock()
         for k, v in self.vardata.items():
@@ -722,6 +795,52 @@ class DataBlock(object):
         return out
 
 
+def sort_order(data):
+    u"""Return index that sorts the 1-d array *data*. Sorted and strictly
+       decreasing data is detected in O(N) and gives a slice, otherwise a
+       stable argsort is used.
+
+        >>> sort_order([1, 2, 2, 3])
+        slice(None, None, None)
+        >>> sort_order([3, 2, 1])
+        slice(None, None, -1)
+        >>> sort_order([2, 3, 1])
+        array([2, 0, 1])
+    """
+    data = np.asarray(data)
+    if (data[1:] >= data[:-1]).all():
+        return slice(None)
+    if (data[1:] < data[:-1]).all():
+        return slice(None, None, -1)
+    return np.argsort(data, kind="mergesort")
+
+
+def hypercube_index(columns):
+    u"""Return sweep values and flat hypercube index of each row for the
+       grid points given by *columns*, a sequence of 1-d arrays of equal
+       length. The sweep values are kept in order of first appearance.
+
+        >>> values, index = hypercube_index([[2, 2, 1, 1], [5, 6, 6, 5]])
+        >>> values
+        [array([2, 1]), array([5, 6])]
+        >>> index
+        array([0, 1, 3, 2])
+    """
+    values = []
+    inverses = []
+    for column in columns:
+        uniq, first, inverse = np.unique(np.asarray(column),
+                                         return_index=True,
+                                         return_inverse=True)
+        order = np.argsort(first, kind="mergesort")
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        values.append(uniq[order])
+        inverses.append(rank[inverse])
+    shape = tuple(len(x) for x in values)
+    return values, np.ravel_multi_index(inverses, shape)
+
+
 def interpolate(newx, y, defaultmode=None):
     mode = getattr(y, "interpolationmode", defaultmode)
     if isinstance(newx, (_hfarray,)):
@@ -732,31 +851,7 @@ def interpolate(newx, y, defaultmode=None):
     if newx not in y.dims:
         return y
     oldx = y.dims.get_matching_dim(newx)
-    olddims = y.dims
-    dimidx = olddims.matching_index(newx)
-    newdims = olddims[:dimidx] + (newx,) + olddims[dimidx + 1:]
-    if mode in [None, "none"]:
-        bools = np.array(newx.data)[:, None] == np.array(oldx.data)[None, :]
-        boolarray = hfarray(bools.any(axis=0),
-                            dims=(oldx,),
-                            unit=y.unit,
-                            outputformat=y.outputformat)
-        if boolarray.sum() != len(newx.data):
-            raise ValueError("Missing x-values")
-        data = np.array(y, copy=False)[boolarray]
-    elif mode in ["linear"]:
-        data = interp1d(y.dims[dimidx].data, y, axis=dimidx)(newx.data)
-    else:
-        raise ValueError("Interpolation mode %r unknown" % mode)
-    return hfarray(data, dims=newdims, unit=y.unit,
-                   outputformat=y.outputformat)
-
-
-try:
-    from scipy.interpolate import interp1d
-except ImportError:  # pragma: no cover
-    def interp1d(*k, **kw):
-        raise ImportError("Need scipy to do linear interpolation")
+    return get_interpolator(oldx, newx, mode)(y)
 
 
 if __name__ == '__main__':
@@ -15,13 +15,18 @@ dim
 
 """
 import datetime
+import hashlib
+
 import numpy as np
 import six
 
-from hftools.utils import is_numlike, is_integer, deprecate
+from hftools.utils import deprecate
 from hftools.py3compat import integer_types
 
 
+_datetime_dtype = np.dtype("datetime64[us]")
+
+
 def dims_has_complex(dims):
     for dim in reversed(dims):
         dims = (ComplexDerivAxis, ComplexIndepAxis, ComplexDiagAxis)
@@ -44,13 +49,130 @@ def flatten(sequence):
             yield item
 
 
+class LinearGrid(object):
+    u"""Lazily evaluated values of a regular grid.
+
+    The values are ``linspace(start, stop, num)``, or
+    ``logspace(start, stop, num)`` if *log* is True, at the indices
+    ``offset + stride * arange(count)``. They are computed the same way as
+    in numpy so they are identical to the values of an explicit sweep.
+    Slicing gives a new LinearGrid without evaluating any values::
+
+        >>> grid = LinearGrid(0, 10, 11)[2:8:2]
+        >>> grid.tolist()
+        [2.0, 4.0, 6.0]
+    """
+    dtype = np.dtype(np.float64)
+    ndim = 1
+
+    def __init__(self, start, stop, num, log=False, offset=0, stride=1,
+                 count=None):
+        self.start = float(start)
+        self.stop = float(stop)
+        self.num = int(num)
+        self.log = bool(log)
+        self.offset = int(offset)
+        self.stride = int(stride)
+        self.count = self.num if count is None else int(count)
+
+    @property
+    def shape(self):
+        return (self.count,)
+
+    def __len__(self):
+        return self.count
+
+    def __repr__(self):
+        return "%s(%r, %r, %r, log=%r, offset=%r, stride=%r, count=%r)" % (
+            self.__class__.__name__, self.start, self.stop, self.num,
+            self.log, self.offset, self.stride, self.count)
+
+    def __array__(self, dtype=None):
+        idx = self.offset + self.stride * np.arange(self.count)
+        if self.num > 1:
+            step = (self.stop - self.start) / float(self.num - 1)
+            values = idx * step + self.start
+            values[idx == self.num - 1] = self.stop
+        else:
+            values = np.zeros(self.count) + self.start
+        if self.log:
+            values = np.power(10.0, values)
+        if dtype is not None:
+            values = values.astype(dtype)
+        return values
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.count)
+            count = max(0, -((start - stop) // step))
+            return self.__class__(self.start, self.stop, self.num, self.log,
+                                  offset=self.offset + self.stride * start,
+                                  stride=self.stride * step, count=count)
+        return np.asarray(self)[index]
+
+    def tolist(self):
+        return np.asarray(self).tolist()
+
+    @classmethod
+    def from_data(cls, data):
+        u"""Return LinearGrid with the same values as the float array *data*
+        or None if *data* is not a linear grid.
+        """
+        if data.dtype != cls.dtype or len(data) < 2:
+            return None
+        grid = cls(data[0], data[-1], len(data))
+        if np.array_equal(np.asarray(grid), data):
+            return grid
+        return None
+
+
+def _is_dim_array(data):
+    return (type(data) is np.ndarray and data.ndim == 1 and
+            data.flags.c_contiguous and not data.flags.writeable and
+            (data.dtype.kind != "M" or data.dtype == _datetime_dtype))
+
+
+def as_dim_array(dim_data):
+    u"""Convert *dim_data* to the storage used by dimensions, a flat
+    read-only ndarray or a LinearGrid.
+
+    An integer *n* gives ``arange(n)``. Read-only arrays, e.g. the data of
+    another dimension, and LinearGrids are shared without copying.
+    Writeable arrays are copied so later changes to them do not leak into
+    the dimension.
+    """
+    if _is_dim_array(dim_data) or isinstance(dim_data, LinearGrid):
+        return dim_data
+    elif isinstance(dim_data, integer_types):
+        data = np.arange(dim_data)
+    elif isinstance(dim_data, np.ndarray):
+        data = np.array(dim_data, copy=dim_data.flags.writeable).ravel()
+        if data.dtype.kind == "M":
+            data = data.astype(_datetime_dtype)
+        elif (data.dtype == np.object_ and len(data) and
+              isinstance(data[0], datetime.datetime)):
+            data = data.astype(_datetime_dtype)
+    else:
+        if not isinstance(dim_data, (list, tuple)):
+            dim_data = list(dim_data)
+        values = list(flatten(dim_data))
+        if len(values) == 0:
+            data = np.array([])
+        elif isinstance(values[0], (np.datetime64, datetime.datetime)):
+            data = np.asarray(values, _datetime_dtype)
+        else:
+            data = np.asarray(values)
+    data.flags.writeable = False
+    return data
+
+
 class DimBase(object):
     sortprio = 0
 
     def __init__(self, Name, data=None, unit=None, name=None,
                  outputformat=None):
         if isinstance(Name, DimBase):
-            dim_data = Name.data
+            dim_data = Name._data
             dim_name = Name.name
             dim_unit = Name.unit
             dim_outputformat = Name.outputformat
@@ -69,28 +191,23 @@ class DimBase(object):
         if outputformat is not None:
             dim_outputformat = outputformat
 
-        if isinstance(dim_data, integer_types):
-            dim_data = list(range(dim_data))
-
-        if hasattr(dim_data, "tolist"):
-            dim_data = [dim_data.tolist()]
-        if not isinstance(dim_data, (list, tuple)):
-            dim_data = list(dim_data)
-
-        self._data = tuple(flatten(dim_data))
+        self._data = as_dim_array(dim_data)
         self._name = dim_name
         self._unit = dim_unit
         self._outputformat = dim_outputformat
 
     @property
     def data(self):
-        if len(self._data) == 0:
-            d = np.array([])
-        elif isinstance(self._data[0], (np.datetime64, datetime.datetime)):
-            d = np.asarray(self._data, np.dtype("datetime64[us]"))
-        else:
-            d = np.asarray(self._data)
-        return d
+        if isinstance(self._data, LinearGrid):
+            try:
+                return self.__dict__["_grid_data_cache"]
+            except KeyError:
+                pass
+            data = np.asarray(self._data)
+            data.flags.writeable = False
+            self.__dict__["_grid_data_cache"] = data
+            return data
+        return self._data
 
     @property
     def name(self):
@@ -103,25 +220,97 @@ class DimBase(object):
     @property
     def outputformat(self):
         if self._outputformat is None:
-            if is_integer(self._data[0]):
+            kind = self._data.dtype.kind
+            if kind in "biu":
                 return "%d"
-            elif is_numlike(self._data[0]):
+            elif kind in "fc":
                 return "%.16e"
             else:
                 return "%s"
         return self._outputformat
 
     def fullsize(self):
-        return self.data.shape[0]
+        return self._data.shape[0]
+
+    @property
+    def _dimclass(self):
+        u"""Class used when comparing and matching dimensions."""
+        return self.__class__
+
+    @property
+    def _values(self):
+        return tuple(self._data.tolist())
+
+    @property
+    def _fingerprint(self):
+        u"""Tuple identifying the dimension, computed on first use.
+
+        Numeric data is represented by a sha1 digest of the data as float64
+        so dimensions with equal values but different dtypes get the same
+        fingerprint. Other data is represented by the hash of its values.
+        Integers beyond +-2**53 lose precision as float64, so equal
+        digests are only trusted if *_exact_digest* is True.
+        """
+        try:
+            return self.__dict__["_fingerprint_cache"]
+        except KeyError:
+            pass
+        if self._data.dtype.kind in "biuf":
+            # + 0.0 maps -0.0 to 0.0 as they compare equal
+            buf = np.ascontiguousarray(self._data, dtype=np.float64) + 0.0
+            digest = hashlib.sha1(buf.view(np.uint8)).hexdigest()
+        else:
+            digest = hash(self._values)
+        fingerprint = (self.sortprio, self.name, self._dimclass, self._unit,
+                       len(self._data), digest)
+        self.__dict__["_fingerprint_cache"] = fingerprint
+        return fingerprint
+
+    def _minmax(self, samples=None):
+        u"""Return (min, max, exact) of the data. Exact values are computed
+           once and cached, the data is read-only. If *samples* is given
+           and there is no cached value at most *samples* evenly spaced
+           elements are used and *exact* is False.
+        """
+        try:
+            return self.__dict__["_minmax_cache"]
+        except KeyError:
+            pass
+        data = self._data
+        if isinstance(data, LinearGrid):
+            data = np.concatenate([np.asarray(data[:1]),
+                                   np.asarray(data[-1:])])
+        elif samples is not None and len(data) > samples:
+            data = data[::-(-len(data) // samples)]
+            return data.min(), data.max(), False
+        result = (data.min(), data.max(), True)
+        self.__dict__["_minmax_cache"] = result
+        return result
+
+    def _exact_digest(self):
+        u"""True if the float64 digest of the fingerprint is exact, i.e.
+           integer data has no values beyond +-2**53.
+        """
+        if self._data.dtype.kind not in "iu" or not len(self._data):
+            return True
+        low, high, _ = self._minmax()
+        return -2 ** 53 <= low and high <= 2 ** 53
+
+    def _equal_data(self, other):
+        a = self._data
+        b = other._data
+        if a.dtype.kind in "biufc" and b.dtype.kind in "biufc":
+            return bool(np.array_equal(a, b))
+        return self._values == other._values
 
     def __hfarray__(self):
         return (self.data, (self,))
 
     def __lt__(self, other):
-        a = (self.sortprio, self.name, self.__class__, self._data,
+        a = (self.sortprio, self.name, self._dimclass, self._values,
              self._unit, self._outputformat)
         try:
-            b = (other.sortprio, other.name, other.__class__, other._data,
+            b = (other.sortprio, other.name, other._dimclass, other._values,
                  other._unit, self._outputformat)
         except AttributeError:
             a = self.name
@@ -129,15 +318,19 @@ class DimBase(object):
         return a < b
 
     def __eq__(self, other):
-        a = (self.sortprio, self.name, self.__class__, self._data,
-             self._unit, self._outputformat)
+        if self is other:
+            return True
         try:
-            b = (other.sortprio, other.name, other.__class__, other._data,
-                 other._unit, self._outputformat)
+            b = other._fingerprint
         except AttributeError:
-            a = self.name
-            b = other
-        return a == b
+            return self.name == other
+        a = self._fingerprint
+        if a[:-1] != b[:-1]:
+            return False
+        elif (a[-1] == b[-1] and self._data.dtype.kind in "biuf" and
+              self._exact_digest() and other._exact_digest()):
+            return True
+        return self._equal_data(other)
 
     def __repr__(self):
         return "%s(%r, shape=%r)" % (self.__class__.__name__,
@@ -145,14 +338,13 @@ class DimBase(object):
                                      self.data.shape)
 
     def __hash__(self):
-        return hash((self.sortprio, self.name, self.__class__, self._data,
-                     self._unit, self._outputformat))
+        return hash(self._fingerprint)
 
     def __getitem__(self, index):
         if isinstance(index, slice) and (index == slice(None, None, None)):
             return self
         elif isinstance(index, slice):
-            a = self.__class__(self.name, self.data[index], unit=self.unit,
+            a = self.__class__(self.name, self._data[index], unit=self.unit,
                                outputformat=self.outputformat)
             return a
         elif isinstance(index, np.ndarray):
@@ -231,6 +423,53 @@ class DimSweep(DiagAxis):
     pass
 
 
+class LinearDim(DimSweep):
+    u"""DimSweep on a regular linear, or logarithmic, grid.
+
+    Only *start*, *stop* and *count* of the grid are stored, the values are
+    generated when needed. With *log* True the points are logarithmically
+    spaced between *start* and *stop*::
+
+        >>> fi = LinearDim("freq", start=0, stop=10e9, count=11, unit="Hz")
+        >>> fi.fullsize()
+        11
+        >>> fi == DimSweep("freq", np.linspace(0, 10e9, 11), unit="Hz")
+        True
+
+    *data* that is a linear grid is stored as a grid, other *data* is
+    stored explicitly.
+    """
+    _dimclass = DimSweep
+
+    def __init__(self, Name, data=None, unit=None, name=None,
+                 outputformat=None, start=None, stop=None, count=None,
+                 log=False):
+        if count is not None:
+            if data is not None:
+                raise ValueError("Can not specify both data and count")
+            if log:
+                data = LinearGrid(np.log10(start), np.log10(stop), count,
+                                  log=True)
+            else:
+                data = LinearGrid(start, stop, count)
+        elif data is None and isinstance(Name, DimBase):
+            data = Name._data
+        if data is not None and not isinstance(data, LinearGrid):
+            data = as_dim_array(data)
+            grid = LinearGrid.from_data(data)
+            if grid is not None:
+                data = grid
+        DimSweep.__init__(self, Name, data=data, unit=unit, name=name,
+                          outputformat=outputformat)
+
+    @property
+    def grid(self):
+        u"""The LinearGrid of the dimension, None if stored explicitly."""
+        if isinstance(self._data, LinearGrid):
+            return self._data
+        return None
+
+
 class DimRep(DiagAxis):
     sortprio = 1
 
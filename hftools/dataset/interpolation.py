@@ -0,0 +1,167 @@
+# -*- coding: ISO-8859-1 -*-
+#-----------------------------------------------------------------------------
+# Copyright (c) 2014, HFTools Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+u"""
+interpolation
+=============
+
+Interpolation of hfarrays along one dimension. An *Interpolator* is
+built once for an old and a new dimension and stores the indices and
+weights. It can then be applied to any number of arrays on the old
+dimension.
+
+    >>> from hftools.dataset import hfarray, DimSweep
+    >>> fi = DimSweep("freq", [1., 2., 3.])
+    >>> fx = DimSweep("freq", [1.5, 2.5])
+    >>> interp = Interpolator(fi, fx, "linear")
+    >>> interp(hfarray([10., 20., 40.], dims=(fi,)))
+    hfarray([ 15.,  30.])
+
+Modes:
+
+    None, "none"  exact match of x-values, no interpolation
+    "nearest"     value at nearest x-value
+    "linear"      linear interpolation
+    "cubic"       natural cubic spline, needs scipy
+    "magphase"    linear interpolation of magnitude and unwrapped phase
+                  for complex data, linear for real data
+"""
+import collections
+
+import numpy as np
+
+from hftools.dataset.arrayobj import hfarray, match_values, selection_index
+
+MODES = (None, "none", "nearest", "linear", "cubic", "magphase")
+CACHE_SIZE = 16
+
+
+class Interpolator(object):
+    u"""Interpolate arrays from dimension *olddim* to *newdim* using
+       *mode*. Raises ValueError if *newdim* is outside the range of
+       *olddim*, or for mode None if a value of *newdim* is missing in
+       *olddim*.
+    """
+    def __init__(self, olddim, newdim, mode="linear"):
+        if mode not in MODES:
+            raise ValueError("Interpolation mode %r unknown" % mode)
+        self.olddim = olddim
+        self.newdim = newdim
+        self.mode = mode
+        oldx = np.asarray(olddim.data)
+        newx = np.asarray(newdim.data)
+        if mode in [None, "none"]:
+            idx = match_values(oldx, newx)
+            if (idx < 0).any():
+                raise ValueError("Missing x-values")
+            self.index = selection_index(idx)
+            return
+
+        oldx = oldx.astype(float)
+        newx = newx.astype(float)
+        order = np.argsort(oldx, kind="mergesort")
+        x = oldx[order]
+        self.order = None if (order == np.arange(len(x))).all() else order
+        if len(x) < 2 or (newx < x[0]).any() or (newx > x[-1]).any():
+            msg = "Can not interpolate outside range of %r"
+            raise ValueError(msg % olddim.name)
+        lo = (np.searchsorted(x, newx, side="right") - 1).clip(0, len(x) - 2)
+        h = x[lo + 1] - x[lo]
+        b = (newx - x[lo]) / h
+        if mode == "nearest":
+            self.index = order[np.where(b <= 0.5, lo, lo + 1)]
+            return
+        self.index = lo
+        self.weight = b
+        if mode == "cubic":
+            a = 1 - b
+            self.cubic_weights = ((a ** 3 - a) * h ** 2 / 6,
+                                  (b ** 3 - b) * h ** 2 / 6)
+            self._prepare_spline(np.diff(x))
+
+    def _prepare_spline(self, h):
+        u"""Banded matrix of the tridiagonal system for the second
+           derivatives of a natural cubic spline, see *solve_banded*.
+        """
+        self.h = h
+        banded = np.zeros((3, len(h) - 1))
+        banded[0, 1:] = h[1:-1]
+        banded[1] = 2 * (h[:-1] + h[1:])
+        banded[2, :-1] = h[1:-1]
+        self.spline_matrix = banded
+
+    def _second_derivatives(self, y):
+        from scipy.linalg import solve_banded
+        h = self.h.reshape((-1,) + (1,) * (y.ndim - 1))
+        slope = (y[1:] - y[:-1]) / h
+        rhs = 6 * (slope[1:] - slope[:-1])
+        y2 = np.zeros(y.shape, dtype=rhs.dtype)
+        if len(rhs):
+            # All other axes are solved as right hand sides in one call
+            res = solve_banded((1, 1), self.spline_matrix,
+                               rhs.reshape(len(rhs), -1))
+            y2[1:-1] = res.reshape(rhs.shape)
+        return y2
+
+    def __call__(self, y):
+        u"""Return *y* interpolated to the new dimension. *y* is returned
+           unchanged if it does not have the dimension.
+        """
+        if self.newdim not in y.dims:
+            return y
+        i = y.dims.matching_index(self.newdim)
+        if not y.dims[i] == self.olddim:
+            msg = "Dimension %r of array differs from interpolator"
+            raise ValueError(msg % self.olddim.name)
+        data = np.rollaxis(np.asarray(y), i)
+        if self.mode in [None, "none", "nearest"]:
+            out = data[self.index]
+        else:
+            if self.order is not None:
+                data = data.take(self.order, axis=0)
+            if self.mode == "magphase" and np.iscomplexobj(data):
+                mag = self._blend(abs(data))
+                phase = self._blend(np.unwrap(np.angle(data), axis=0))
+                out = mag * np.exp(1j * phase)
+            else:
+                out = self._blend(data)
+        newdims = y.dims[:i] + (self.newdim,) + y.dims[i + 1:]
+        return hfarray(np.rollaxis(out, 0, i + 1), dims=newdims,
+                       unit=y.unit, outputformat=y.outputformat, copy=False)
+
+    def _blend(self, data):
+        shape = (-1,) + (1,) * (data.ndim - 1)
+        lo = self.index
+        y0 = data[lo]
+        y1 = data[lo + 1]
+        out = y0 + (y1 - y0) * self.weight.reshape(shape)
+        if self.mode == "cubic":
+            y2 = self._second_derivatives(data)
+            c, d = self.cubic_weights
+            out += c.reshape(shape) * y2[lo] + d.reshape(shape) * y2[lo + 1]
+        return out
+
+
+_cache = collections.OrderedDict()
+
+
+def get_interpolator(olddim, newdim, mode="linear"):
+    u"""Return *Interpolator* for (*olddim*, *newdim*, *mode*). The last
+       CACHE_SIZE interpolators are cached, so DataBlocks that share a
+       grid also share the interpolator.
+    """
+    key = (olddim, newdim, mode)
+    try:
+        return _cache[key]
+    except KeyError:
+        pass
+    interp = Interpolator(olddim, newdim, mode)
+    _cache[key] = interp
+    while len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return interp
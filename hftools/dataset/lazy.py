@@ -0,0 +1,253 @@
+# -*- coding: ISO-8859-1 -*-
+#-----------------------------------------------------------------------------
+# Copyright (c) 2014, HFTools Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+u"""
+lazy
+====
+
+Proxy for hfarray data stored in a file, e.g. an h5py Dataset. Only
+metadata is available until data is requested. Indexing with integers
+and slices reads only the selected part, other use reads the full array
+once and works on the resulting hfarray.
+
+    >>> from hftools.dataset import DimSweep
+    >>> fi = DimSweep("freq", 4)
+    >>> x = LazyArray(np.arange(8).reshape(4, 2), (fi, DimSweep("p", 2)))
+    >>> x
+    LazyArray(shape=(4, 2), dims=('freq', 'p'))
+    >>> x[1:3, 0]
+    hfarray([2, 4])
+    >>> x.materialized
+    False
+    >>> float((x + 1).sum())
+    36.0
+    >>> x.materialized
+    True
+
+A proxy reading from a file does not close it, see *close_files*.
+"""
+import numpy as np
+
+from hftools.dataset.arrayobj import hfarray, Dims, replace_dim
+from hftools.dataset.dim import DimBase
+from hftools.py3compat import integer_types, string_types
+
+
+def _is_basic_index(index):
+    u"""True if *index* is a tuple of integers, Ellipsis and slices with
+       positive step, which can be read directly from the source.
+    """
+    for idx in index:
+        if idx is Ellipsis or isinstance(idx, integer_types + (np.integer,)):
+            continue
+        if isinstance(idx, slice) and (idx.step is None or idx.step > 0):
+            continue
+        return False
+    return index.count(Ellipsis) <= 1
+
+
+class LazyArray(object):
+    u"""Proxy for the array *source* with dimensions *dims*.
+
+       *source* must support numpy style indexing with integers and
+       slices, and have *shape* and *dtype*. If *dtype* is given data is
+       converted to it when read. The source is never written, item
+       assignment reads the full array and writes to that copy.
+    """
+    __array_priority__ = 20
+
+    def __init__(self, source, dims, unit=None, outputformat=None,
+                 dtype=None):
+        self.source = source
+        self.dims = Dims(dims)
+        self.unit = unit
+        self._outputformat = outputformat
+        self.dtype = np.dtype(source.dtype if dtype is None else dtype)
+        self._data = None
+
+    def __repr__(self):
+        return "%s(shape=%r, dims=%r)" % (self.__class__.__name__,
+                                          self.shape,
+                                          tuple(x.name for x in self.dims))
+
+    @property
+    def shape(self):
+        return tuple(self.source.shape)
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    @property
+    def size(self):
+        return int(np.multiply.reduce(self.shape))
+
+    @property
+    def nbytes(self):
+        return self.size * self.dtype.itemsize
+
+    def __len__(self):
+        return self.shape[0]
+
+    @property
+    def outputformat(self):
+        if self._data is not None:
+            return self._data.outputformat
+        if self._outputformat is not None:
+            return self._outputformat
+        if self.dtype.kind in "biu":
+            return "%d"
+        elif self.dtype.kind in "fc":
+            return "%.16e"
+        return "%s"
+
+    @outputformat.setter
+    def outputformat(self, value):
+        self._outputformat = value
+        if self._data is not None:
+            self._data.outputformat = value
+
+    @property
+    def materialized(self):
+        u"""True if the full array has been read."""
+        return self._data is not None
+
+    def _read(self, index):
+        data = np.asarray(self.source[index])
+        if data.dtype != self.dtype:
+            data = data.astype(self.dtype)
+        return data
+
+    def materialize(self):
+        u"""Read the full array, once, and return it as an hfarray."""
+        if self._data is None:
+            self._data = hfarray(self._read(Ellipsis), dims=self.dims,
+                                 unit=self.unit,
+                                 outputformat=self._outputformat,
+                                 copy=False)
+        return self._data
+
+    def __getitem__(self, index):
+        if self._data is not None:
+            return self._data[index]
+        if not isinstance(index, tuple):
+            index = (index,)
+        if not _is_basic_index(index):
+            return self.materialize()[index]
+        template = np.lib.stride_tricks.as_strided(np.zeros(1, self.dtype),
+                                                   shape=self.shape,
+                                                   strides=(0,) * self.ndim)
+        template = hfarray(template, dims=self.dims, copy=False)[index]
+        data = self._read(index)
+        if not isinstance(template, hfarray):
+            return data[()]
+        return hfarray(data, dims=template.dims, unit=self.unit,
+                       outputformat=self._outputformat, copy=False)
+
+    def __setitem__(self, index, value):
+        self.materialize()[index] = value
+
+    def __array__(self, dtype=None):
+        data = np.asarray(self.materialize())
+        if dtype is not None:
+            data = data.astype(dtype)
+        return data
+
+    def __array_wrap__(self, obj, context=None):
+        return self.materialize().__array_wrap__(obj, context)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kw):
+        u"""Ufunc override (NEP 13), used by numpy >= 1.13. The ufunc is
+           applied to the materialized arrays.
+        """
+        inputs = _materialize_args(inputs)
+        if "out" in kw:
+            kw["out"] = tuple(_materialize_args(kw["out"]))
+        return getattr(ufunc, method)(*inputs, **kw)
+
+    def __iter__(self):
+        return iter(self.materialize())
+
+    def __getattr__(self, key):
+        if key.startswith("__") or key in ("source", "_data"):
+            raise AttributeError(key)
+        return getattr(self.materialize(), key)
+
+    def copy(self):
+        u"""Return copy. Before the data is read this is a new proxy for
+           the same source, afterwards a copy of the data.
+        """
+        if self._data is not None:
+            return self._data.copy()
+        return self.__class__(self.source, self.dims, unit=self.unit,
+                              outputformat=self._outputformat,
+                              dtype=self.dtype)
+
+    def view(self):
+        return self.copy() if self._data is None else self._data.view()
+
+    def close(self):
+        u"""Close the file *source* belongs to, like the h5py File of a
+           Dataset. Proxies of that file that are not materialized can not
+           be used afterwards.
+        """
+        try:
+            fil = self.source.file
+        except (AttributeError, RuntimeError, ValueError):  # None or closed
+            return
+        fil.close()
+
+    def dims_index(self, name, cls=None):
+        if isinstance(name, DimBase):
+            name = name.name
+        idx = self.dims.name_index(name, cls)
+        if idx is not None:
+            return idx
+        msg = "Can not find AxisObject with name:%r and cls:%s" % (name, cls)
+        raise IndexError(msg)
+
+    def replace_dim(self, olddim, newdim):
+        if isinstance(olddim, string_types):
+            olddim = self.dims[self.dims_index(olddim)]
+            if np.issubclass_(newdim, DimBase):
+                newdim = newdim(olddim)
+        self.dims = replace_dim(self.dims, olddim, newdim)
+        if self._data is not None:
+            self._data.replace_dim(olddim, newdim)
+        return self.dims
+
+
+def close_files(db):
+    u"""Close the files that the *LazyArray* variables of DataBlock *db*
+       read from, e.g. after read_hdf5(filename, lazy=True).
+    """
+    for v in db.vardata.values():
+        if isinstance(v, LazyArray):
+            v.close()
+
+
+def _materialize_args(args):
+    return [x.materialize() if isinstance(x, LazyArray) else x for x in args]
+
+
+def _materializing(name):
+    def method(self, *k):
+        return getattr(self.materialize(), name)(*_materialize_args(k))
+    method.__name__ = name
+    return method
+
+
+for _name in ["add", "sub", "mul", "div", "truediv", "floordiv", "mod",
+              "pow", "and", "or", "xor"]:
+    for _fmt in ["__%s__", "__r%s__"]:
+        setattr(LazyArray, _fmt % _name, _materializing(_fmt % _name))
+for _name in ["__lt__", "__le__", "__eq__", "__ne__", "__gt__", "__ge__",
+              "__neg__", "__pos__", "__abs__", "__invert__", "__float__",
+              "__int__", "__complex__", "__bool__", "__nonzero__"]:
+    setattr(LazyArray, _name, _materializing(_name))
+LazyArray.__hash__ = None
@@ -0,0 +1,156 @@
+# -*- coding: ISO-8859-1 -*-
+#-----------------------------------------------------------------------------
+# Copyright (c) 2014, HFTools Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+u"""
+reductions
+==========
+
+Reductions over dimensions that read the data in chunks along the first
+axis. Works on anything that can be sliced like an array, e.g. hfarrays
+backed by np.memmap or h5py datasets, so the data never has to fit in
+memory. Mean, var and std merge the chunks with the parallel form of
+Welford's algorithm.
+
+For sources without hftools dims, e.g. a raw h5py dataset, the dims must
+be given with the *dims* argument.
+"""
+import numpy as np
+
+from hftools.dataset.arrayobj import hfarray, Dims, multiple_axis_handler
+
+#: Default number of elements read per chunk
+CHUNK_ELEMENTS = 2 ** 20
+
+
+def iter_chunks(x, chunksize=None):
+    u"""Yield (*index*, *data*) for chunks of *x* along the first axis.
+       *chunksize* is the number of rows per chunk, by default about
+       *CHUNK_ELEMENTS* elements are read at a time.
+    """
+    nrows = x.shape[0]
+    if chunksize is None:
+        rowsize = int(np.prod(x.shape[1:]))
+        chunksize = max(1, CHUNK_ELEMENTS // max(rowsize, 1))
+    for start in range(0, nrows, chunksize):
+        index = (slice(start, min(start + chunksize, nrows)),)
+        yield index, np.asarray(x[index])
+
+
+def _sum(data, axes):
+    return data.sum(axis=axes, keepdims=True)
+
+
+def _min(data, axes):
+    return data.min(axis=axes, keepdims=True)
+
+
+def _max(data, axes):
+    return data.max(axis=axes, keepdims=True)
+
+
+def _moments(data, axes):
+    n = int(np.prod([data.shape[i] for i in axes]))
+    mean = data.mean(axis=axes, keepdims=True)
+    m2 = (abs(data - mean) ** 2).sum(axis=axes, keepdims=True)
+    return n, mean, m2
+
+
+def _merge_moments(a, b):
+    na, meana, m2a = a
+    nb, meanb, m2b = b
+    n = na + nb
+    delta = meanb - meana
+    mean = meana + delta * (float(nb) / n)
+    m2 = m2a + m2b + abs(delta) ** 2 * (float(na) * nb / n)
+    return n, mean, m2
+
+
+def _identity(state):
+    return state
+
+
+def _chunked_reduce(x, axis, chunksize, dims, partial, merge, finish):
+    dims = Dims(x.dims if dims is None else dims)
+    if len(dims) != len(x.shape):
+        raise ValueError("dims do not match shape of data")
+    _, axes = multiple_axis_handler(dims, axis)
+    if axes is None:
+        axes = tuple(range(len(dims)))
+    keepdims = tuple(dim for i, dim in enumerate(dims) if i not in axes)
+
+    def squeeze(data):
+        return data.reshape([n for i, n in enumerate(data.shape)
+                             if i not in axes])
+
+    state = None
+    out = None
+    for index, data in iter_chunks(x, chunksize):
+        part = partial(data, axes)
+        if 0 in axes:
+            state = part if state is None else merge(state, part)
+        else:
+            res = squeeze(np.asarray(finish(part)))
+            if out is None:
+                out = np.empty((x.shape[0],) + res.shape[1:], res.dtype)
+            out[index] = res
+    if state is not None:
+        out = squeeze(np.asarray(finish(state)))
+    elif out is None:  # No rows
+        out = squeeze(np.asarray(finish(partial(np.asarray(x[:]), axes))))
+    return hfarray(out, dims=keepdims, copy=False)
+
+
+def chunked_sum(x, axis=None, chunksize=None, dims=None):
+    u"""Sum of *x* over *axis*, reading *chunksize* rows at a time.
+       *axis* can be dimension names, dimensions, dimension classes or
+       indices as for *hfarray.sum*. None reduces over all dimensions.
+
+        >>> x = hfarray([[1, 2], [3, 4], [5, 6]])
+        >>> chunked_sum(x, "freq", chunksize=2)
+        hfarray([ 9, 12])
+    """
+    return _chunked_reduce(x, axis, chunksize, dims,
+                           _sum, np.add, _identity)
+
+
+def chunked_min(x, axis=None, chunksize=None, dims=None):
+    u"""Minimum of *x* over *axis*, see *chunked_sum*."""
+    return _chunked_reduce(x, axis, chunksize, dims,
+                           _min, np.minimum, _identity)
+
+
+def chunked_max(x, axis=None, chunksize=None, dims=None):
+    u"""Maximum of *x* over *axis*, see *chunked_sum*."""
+    return _chunked_reduce(x, axis, chunksize, dims,
+                           _max, np.maximum, _identity)
+
+
+def chunked_mean(x, axis=None, chunksize=None, dims=None):
+    u"""Mean of *x* over *axis*, see *chunked_sum*."""
+    return _chunked_reduce(x, axis, chunksize, dims,
+                           _moments, _merge_moments, lambda s: s[1])
+
+
+def chunked_var(x, axis=None, chunksize=None, dims=None, ddof=0):
+    u"""Variance of *x* over *axis*, see *chunked_sum*. The divisor is
+       N - *ddof*.
+
+        >>> x = hfarray([[1., 2], [3, 4], [5, 9]])
+        >>> chunked_var(x, "freq", chunksize=1)
+        hfarray([ 2.66666667,  8.66666667])
+    """
+    return _chunked_reduce(x, axis, chunksize, dims,
+                           _moments, _merge_moments,
+                           lambda s: s[2] / (s[0] - ddof))
+
+
+def chunked_std(x, axis=None, chunksize=None, dims=None, ddof=0):
+    u"""Standard deviation of *x* over *axis*, see *chunked_var*."""
+    return _chunked_reduce(x, axis, chunksize, dims,
+                           _moments, _merge_moments,
+                           lambda s: np.sqrt(s[2] / (s[0] - ddof)))
@@ -68,6 +68,20 @@ class TestDims(TestCase):
         self.assertTrue("c" in dims)
         self.assertFalse("d" in dims)
 
+    def test_same_name(self):
+        dims = aobj.Dims((dim.DimRep("a", 3), dim.DimSweep("a", 3)))
+        self.assertEqual(dims.matching_index(dim.DimSweep("a", 1)), 1)
+        self.assertEqual(dims.matching_index(dim.DimRep("a", 1)), 0)
+        self.assertEqual(dims.name_index("a"), 0)
+        self.assertEqual(dims.name_index("a", dim.DimSweep), 1)
+        self.assertIsNone(dims.name_index("b"))
+
+    def test_subclass(self):
+        dims = aobj.Dims((dim.DimSweep("a", 3), dim.DimRep("b", 3)))
+        self.assertTrue(ds.LinearDim("a", start=0, stop=1, count=3) in dims)
+        self.assertTrue(dim.DimBase("b", 1) in dims)
+        self.assertFalse(dim.DimSweep("b", 1) in dims)
+
 
 class TestDimsList(TestCase):
     def test_contains1(self):
@@ -107,6 +121,19 @@ class TestDimsList(TestCase):
         self.assertRaises(KeyError, dims.matching_index, dim.DimSweep("d", 4))
         self.assertRaises(KeyError, dims.matching_index, "a")
 
+    def test_modified(self):
+        dims = aobj.DimsList((dim.DimSweep("a", 3), dim.DimSweep("b", 3)))
+        self.assertEqual(dims.matching_index(dim.DimSweep("b", 4)), 1)
+        dims.append(dim.DimSweep("c", 3))
+        self.assertEqual(dims.matching_index(dim.DimSweep("c", 4)), 2)
+        dims.sort(key=lambda x: x.name, reverse=True)
+        self.assertEqual(dims.matching_index(dim.DimSweep("c", 4)), 0)
+        del dims[0]
+        self.assertFalse(dim.DimSweep("c", 4) in dims)
+        dims[0] = dim.DimRep("d", 3)
+        self.assertEqual(dims.matching_index(dim.DimRep("d", 4)), 0)
+        self.assertFalse(dim.DimSweep("b", 4) in dims)
+
 
 class Test_as_strided(TestCase):
     def test_1(self):
@@ -301,6 +328,23 @@ class Test_remove_rep(TestCase):
                 ds.DimMatrix_i("i", 5), ds.DimMatrix_j("j", 5),)
         self.assertEqual(d.dims, dims)
 
+    def test_view(self):
+        self.d[1, 2, 3] = 1
+        self.d.unit = "V"
+        d = aobj.remove_rep(self.d)
+        self.assertTrue(np.may_share_memory(d, self.d))
+        self.assertAllclose(d[1, 11], 1)
+        self.assertEqual(d.unit, "V")
+
+    def test_not_adjacent(self):
+        dims = (ds.DimRep("rep1", 2), ds.DimSweep("f", 3),
+                ds.DimRep("rep2", 4))
+        data = np.arange(24).reshape(2, 3, 4)
+        e = aobj.remove_rep(aobj.hfarray(data, dims=dims))
+        self.assertEqual(e.dims, (ds.DimRep("AllReps", 8),
+                                  ds.DimSweep("f", 3)))
+        self.assertAllclose(e, data.transpose(0, 2, 1).reshape(8, 3))
+
 
 class Test_make_complex_array(TestCase):
     def setUp(self):
@@ -673,6 +717,9 @@ class Test_hfarray_getitem(_Test_hfarray):
         Ar = aobj.hfarray([20, 30], dims=(ar, ))
         bools = A > 10
         self.assertAllclose(A[bools], Ar)
+        res = A[bools]
+        res[0] = 0
+        self.assertAllclose(A, [10, 20, 30])
 
     def test_get_bool_2(self):
         a = aobj.DimSweep("a", [1, 2])
@@ -688,6 +735,122 @@ class Test_hfarray_getitem(_Test_hfarray):
         self.assertRaises(ValueError, C.__getitem__, A == 1)
 
 
+class Test_hfarray_wrap(_Test_hfarray):
+    def test_wrap_no_copy(self):
+        x = np.zeros((10, 2, 2))
+        q = aobj.hfarray._wrap(x, self.bdims)
+        self.assertIsInstance(q, aobj.hfarray)
+        self.assertIsInstance(q.dims, aobj.Dims)
+        self.assertEqual(q.dims, self.bdims)
+        q[...] = 1
+        self.assertAllclose(x, 1)
+
+    def test_wrap_inherits(self):
+        self.b.unit = "V"
+        self.b.outputformat = "%.3f"
+        q = aobj.hfarray._wrap(self.b[::-1], self.bdims)
+        self.assertEqual(q.unit, "V")
+        self.assertEqual(q.outputformat, "%.3f")
+        q = aobj.hfarray._wrap(self.b[::-1], self.bdims, unit="A",
+                               outputformat="%.5f")
+        self.assertEqual(q.unit, "A")
+        self.assertEqual(q.outputformat, "%.5f")
+
+    def test_lazy_outputformat(self):
+        q = aobj.hfarray._wrap(np.arange(3), (aobj.DimSweep("f", 3),))
+        self.assertIsNone(q.__dict__["_outputformat"])
+        self.assertEqual(q.outputformat, "%d")
+        self.assertEqual(q.__dict__["_outputformat"], "%d")
+
+    def test_shared_dims(self):
+        self.assertIs(self.b.view().dims, self.b.dims)
+        self.assertIs(self.b[...].dims, self.b.dims)
+
+
+class Test_DimSelection(TestCase):
+    def setUp(self):
+        self.fi = aobj.DimSweep("f", 5)
+        self.ri = aobj.DimRep("r", 2)
+        self.a = aobj.hfarray(np.arange(10).reshape(2, 5),
+                              dims=(self.ri, self.fi))
+
+    def test_slice(self):
+        sel = aobj.DimSelection(self.fi, [False, True, False, True, False])
+        self.assertEqual(sel.index, slice(1, 5, 2))
+        self.assertEqual(sel.newdim, aobj.DimSweep("f", [1, 3]))
+        res = sel.apply(self.a)
+        self.assertEqual(res.dims, (self.ri, sel.newdim))
+        self.assertAllclose(res, [[1, 3], [6, 8]])
+        self.assertTrue(np.may_share_memory(res, self.a))
+        res = sel.apply(self.a, copy=True)
+        self.assertAllclose(res, [[1, 3], [6, 8]])
+        self.assertFalse(np.may_share_memory(res, self.a))
+
+    def test_index(self):
+        sel = aobj.DimSelection(self.fi, [0, 1, 4])
+        res = sel.apply(self.a)
+        self.assertEqual(res.dims, (self.ri, aobj.DimSweep("f", [0, 1, 4])))
+        self.assertAllclose(res, [[0, 1, 4], [5, 6, 9]])
+
+    def test_empty(self):
+        sel = aobj.DimSelection(self.fi, np.zeros(5, bool))
+        self.assertEqual(sel.apply(self.a).shape, (2, 0))
+
+    def test_missing_dim(self):
+        sel = aobj.DimSelection(aobj.DimSweep("g", 5), [0, 1])
+        self.assertIs(sel.apply(self.a), self.a)
+
+    def test_dimclass(self):
+        sel = aobj.DimSelection(aobj.DimRep(self.fi.name, 5), [0, 1])
+        self.assertIs(sel.apply(self.a), self.a)
+
+
+class Test_select_values(TestCase):
+    def test_match_values(self):
+        res = aobj.match_values([3., 1, 2], [1, 2, 4, 3])
+        self.assertEqual(res.tolist(), [1, 2, -1, 0])
+
+    def test_match_values_tolerance(self):
+        res = aobj.match_values([1., 2, 3], [0.9, 1.05, 2.94], atol=0.1)
+        self.assertEqual(res.tolist(), [0, 0, 2])
+        res = aobj.match_values([1., 2, 3], [2.1], rtol=0.01)
+        self.assertEqual(res.tolist(), [-1])
+
+    def test_match_values_empty(self):
+        res = aobj.match_values([], [1, 2])
+        self.assertEqual(res.tolist(), [-1, -1])
+
+    def test_match_values_strings(self):
+        res = aobj.match_values(["b", "a"], ["a", "c"], atol=1)
+        self.assertEqual(res.tolist(), [1, -1])
+
+    def test_select_values(self):
+        fi = aobj.DimSweep("f", [10., 20, 30, 40])
+        sel = aobj.select_values(fi, aobj.DimSweep("f", [40, 20, 50]))
+        self.assertEqual(sel.newdim, aobj.DimSweep("f", [20., 40]))
+        self.assertEqual(sel.index, slice(1, 5, 2))
+
+    def test_match_mask_repeated(self):
+        res = aobj.match_mask([3, 1, 2, 1], [1, 3])
+        self.assertEqual(res.tolist(), [True, True, False, True])
+        res = aobj.match_mask([1., 1.001, 2, 1], [1.], atol=0.01)
+        self.assertEqual(res.tolist(), [True, True, False, True])
+        res = aobj.match_mask([1j, 2, 1j], [1.001j], atol=0.01)
+        self.assertEqual(res.tolist(), [True, False, True])
+        res = aobj.match_mask(["b", "a", "b"], ["b"])
+        self.assertEqual(res.tolist(), [True, False, True])
+
+    def test_match_mask_empty(self):
+        self.assertEqual(aobj.match_mask([], [1]).tolist(), [])
+        self.assertEqual(aobj.match_mask([1, 2], []).tolist(),
+                         [False, False])
+
+    def test_select_values_repeated(self):
+        ri = aobj.DimSweep("r", [1, 1, 2, 3])
+        sel = aobj.select_values(ri, [1, 3])
+        self.assertEqual(sel.newdim, aobj.DimSweep("r", [1, 1, 3]))
+
+
 class Test_hfarray_take(_Test_hfarray):
     def test_take(self):
         a = aobj.DimSweep("a", [1, 2])
@@ -11,7 +11,7 @@ import os
 import numpy as np
 
 from numpy import newaxis
-from hftools.testing import TestCase
+from hftools.testing import TestCase, skip
 
 import hftools.dataset.arrayobj as aobj
 
@@ -24,6 +24,13 @@ class VArray(aobj.hfarray):
     __array_priority__ = 10
 
 
+if aobj.HAS_ARRAY_UFUNC:
+    def needs_array_ufunc(func):
+        return func
+else:
+    needs_array_ufunc = skip("numpy does not support __array_ufunc__")
+
+
 class Test_binary_ops(TestCase):
     op = operator.add
     randfunc = [random_value_array_from_dims]
@@ -137,6 +144,102 @@ class Test_binary_ops_xor(Test_binary_ops_and):
     op = operator.xor
 
 
+class Test_array_ufunc(TestCase):
+    def setUp(self):
+        self.fi = aobj.DimSweep("f", 3)
+        self.ri = aobj.DimRep("r", 2)
+        self.a = aobj.hfarray(np.arange(6.).reshape(3, 2),
+                              dims=(self.fi, self.ri), unit="V")
+        self.b = aobj.hfarray([1., 2, 3], dims=(self.fi,))
+        self.c = aobj.hfarray([10., 20], dims=(self.ri,))
+        self.res = (np.array([1., 2, 3])[:, newaxis] *
+                    np.array([10., 20])[newaxis])
+
+    @needs_array_ufunc
+    def test_call(self):
+        res = np.multiply(self.c, self.b)
+        self.assertEqual(res.dims, (self.fi, self.ri))
+        self.assertAllclose(np.asarray(res), self.res)
+
+    @needs_array_ufunc
+    def test_out(self):
+        out = aobj.hfarray(np.zeros((2, 3)), dims=(self.ri, self.fi))
+        res = np.multiply(self.b, self.c, out=out)
+        self.assertIs(res, out)
+        self.assertAllclose(np.asarray(out), self.res.T)
+
+    @needs_array_ufunc
+    def test_out_missing_dim(self):
+        self.assertRaises(aobj.DimensionMismatchError,
+                          np.multiply, self.a, self.c, out=self.b.copy())
+
+    @needs_array_ufunc
+    def test_inplace(self):
+        a = self.a.T.copy()
+        a += self.b
+        self.assertEqual(a.dims, (self.ri, self.fi))
+        self.assertAllclose(np.asarray(a),
+                            (np.asarray(self.a) + [[1], [2], [3]]).T)
+
+    @needs_array_ufunc
+    def test_reduce(self):
+        res = np.add.reduce(self.a, axis=0)
+        self.assertEqual(res.dims, (self.ri,))
+        self.assertEqual(res.unit, "V")
+        self.assertAllclose(np.asarray(res), [6, 9])
+        res = np.add.reduce(self.a, axis=-1)
+        self.assertEqual(res.dims, (self.fi,))
+        self.assertAllclose(np.asarray(res), [1, 5, 9])
+        res = np.add.reduce(self.a, axis=(0, 1))
+        self.assertAllclose(res, 15)
+        res = np.add.reduce(self.a, axis=None)
+        self.assertAllclose(res, 15)
+
+    @needs_array_ufunc
+    def test_reduce_keepdims(self):
+        res = np.add.reduce(self.a, axis=0, keepdims=True)
+        self.assertNotIsInstance(res, aobj.hfarray)
+        self.assertAllclose(res, [[6, 9]])
+
+    @needs_array_ufunc
+    def test_accumulate(self):
+        res = np.add.accumulate(self.a, axis=1)
+        self.assertEqual(res.dims, self.a.dims)
+        self.assertAllclose(np.asarray(res), [[0, 1], [2, 5], [4, 9]])
+
+    @needs_array_ufunc
+    def test_outer(self):
+        res = np.multiply.outer(self.b, self.c)
+        self.assertEqual(res.dims, (self.fi, self.ri))
+        self.assertAllclose(np.asarray(res), self.res)
+        res = np.multiply.outer(self.b, self.a)
+        self.assertNotIsInstance(res, aobj.hfarray)
+        self.assertEqual(res.shape, (3, 3, 2))
+        res = np.multiply.outer(self.b, np.array([1., 2]))
+        self.assertNotIsInstance(res, aobj.hfarray)
+
+    @needs_array_ufunc
+    def test_other_methods(self):
+        res = np.add.reduceat(self.a, [0, 2], axis=0)
+        self.assertNotIsInstance(res, aobj.hfarray)
+        self.assertAllclose(res, [[2, 4], [4, 5]])
+        a = self.a.copy()
+        self.assertIsNone(np.add.at(a, [0, 0], 1))
+        self.assertAllclose(np.asarray(a[0]), [2, 3])
+
+    @needs_array_ufunc
+    def test_metadata(self):
+        res = np.exp(self.a)
+        self.assertEqual(res.dims, self.a.dims)
+        self.assertEqual(res.unit, "V")
+        self.assertIsInstance(self.b + VArray(self.c), VArray)
+
+    def test_operator(self):
+        res = self.c * self.b
+        self.assertEqual(res.dims, (self.fi, self.ri))
+        self.assertAllclose(np.asarray(res), self.res)
+
+
 if __name__ == '__main__':
     fi = aobj.DimSweep("f", 3)
     gi = aobj.DimSweep("g", 4)
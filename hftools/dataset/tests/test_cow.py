@@ -0,0 +1,146 @@
+#-----------------------------------------------------------------------------
+# Copyright (c) 2014, HFTools Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+import numpy as np
+
+import hftools.dataset.cow as cow
+from hftools.dataset import hfarray, DimSweep, DataBlock, copy_counter
+from hftools.testing import TestCase, make_load_tests
+
+load_tests = make_load_tests(cow)
+
+
+class Test_copy(TestCase):
+    def setUp(self):
+        self.fi = DimSweep("freq", [1, 2, 3])
+        self.db = DataBlock()
+        self.db.freq = self.fi
+        self.db.a = hfarray([1., 2, 3], dims=(self.fi,))
+        self.db2 = self.db.copy()
+
+    def test_independent(self):
+        self.assertFalse(np.may_share_memory(self.db2.a, self.db.a))
+        self.assertTrue(self.db.a.flags.writeable)
+        self.assertTrue(self.db2.a.flags.writeable)
+
+    def test_fill(self):
+        self.db.a.fill(0)
+        self.db2.a.fill(5)
+        self.assertAllclose(self.db.a, [0, 0, 0])
+        self.assertAllclose(self.db2.a, [5, 5, 5])
+
+    def test_out(self):
+        np.multiply(self.db.a, 2, out=self.db.a)
+        self.assertAllclose(self.db.a, [2, 4, 6])
+        self.assertAllclose(self.db2.a, [1, 2, 3])
+
+    def test_transpose(self):
+        self.db.a.T[0] = 5
+        self.assertAllclose(self.db.a, [5, 2, 3])
+        self.assertAllclose(self.db2.a, [1, 2, 3])
+
+    def test_saved_reference(self):
+        x = self.db.a
+        x[0] = 100
+        self.assertIs(self.db.a, x)
+        self.assertAllclose(self.db.a, [100, 2, 3])
+        self.assertAllclose(self.db2.a, [1, 2, 3])
+
+
+class Test_copy_on_write(TestCase):
+    def setUp(self):
+        self.fi = DimSweep("freq", [1, 2, 3])
+        self.db = DataBlock()
+        self.db.freq = self.fi
+        self.db.a = hfarray([1., 2, 3], dims=(self.fi,))
+        self.db.b = hfarray([4., 5, 6], dims=(self.fi,))
+
+    def test_shares_buffer(self):
+        db2 = self.db.cow_copy()
+        self.assertTrue(np.may_share_memory(db2.a, self.db.a))
+        self.assertFalse(db2.a.flags.writeable)
+
+    def test_write_copy(self):
+        db2 = self.db.cow_copy()
+        db2.a[0] = 10
+        self.assertAllclose(db2.a, [10, 2, 3])
+        self.assertAllclose(self.db.a, [1, 2, 3])
+        self.assertFalse(np.may_share_memory(db2.a, self.db.a))
+        self.assertTrue(np.may_share_memory(db2.b, self.db.b))
+
+    def test_write_original(self):
+        db2 = self.db.cow_copy()
+        self.db.a[1] = 10
+        self.assertAllclose(self.db.a, [1, 10, 3])
+        self.assertAllclose(db2.a, [1, 2, 3])
+
+    def test_write_last_member(self):
+        db2 = self.db.cow_copy()
+        db2.a[0] = 10
+        buf = self.db.a
+        self.db.a[0] = 20
+        self.assertIs(self.db.a, buf)
+        self.assertTrue(buf.flags.writeable)
+        self.assertAllclose(self.db.a, [20, 2, 3])
+
+    def test_inplace_operator(self):
+        db2 = self.db.cow_copy()
+        db2.a += 1
+        self.assertAllclose(db2.a, [2, 3, 4])
+        self.assertAllclose(self.db.a, [1, 2, 3])
+        self.assertEqual(db2.a.dims, (self.fi,))
+
+    def test_copy_of_copy(self):
+        db2 = self.db.cow_copy()
+        db3 = db2.cow_copy()
+        db3.a[0] = 10
+        self.db.a[1] = 20
+        self.assertAllclose(self.db.a, [1, 20, 3])
+        self.assertAllclose(db2.a, [1, 2, 3])
+        self.assertAllclose(db3.a, [10, 2, 3])
+
+    def test_replaced_variable(self):
+        db2 = self.db.cow_copy()
+        db2.a = hfarray([7., 8, 9], dims=(self.fi,))
+        self.db.a[0] = 10
+        self.assertAllclose(self.db.a, [10, 2, 3])
+        self.assertAllclose(db2.a, [7, 8, 9])
+
+
+class Test_copy_counter(TestCase):
+    def setUp(self):
+        self.fi = DimSweep("freq", [1, 2, 3, 4])
+        self.db = DataBlock()
+        self.db.freq = self.fi
+        self.db.a = hfarray([1., 2, 3, 4], dims=(self.fi,))
+
+    def test_disabled(self):
+        copy_counter.reset()
+        self.db.cow_copy().a[0] = 1
+        self.assertEqual(copy_counter.counts, {})
+
+    def test_view(self):
+        with copy_counter:
+            self.db.view()
+            self.db.filter(hfarray(self.fi) <= 2, copy=False)
+            self.db.sort(hfarray(self.fi)[::-1])
+        self.assertEqual(copy_counter.counts, dict(view=0, filter=0, sort=0))
+
+    def test_copying_operations(self):
+        with copy_counter:
+            self.db.filter(hfarray(self.fi) <= 2)
+            self.db.filter(hfarray(self.fi) != 2)
+            self.db.sort(hfarray([2, 1, 4, 3], dims=(self.fi,)))
+        self.assertEqual(copy_counter.counts, dict(filter=40, sort=32))
+
+    def test_copy_on_write(self):
+        with copy_counter:
+            db2 = self.db.cow_copy()
+            db2.a[0] = 1
+        self.assertEqual(copy_counter.counts,
+                         {"cow_copy": 0, "copy-on-write": 32})
+        self.assertTrue(copy_counter.report().startswith("copy-on-write"))
@@ -44,6 +44,34 @@ class Test_DataBlock(TestCase):
         self.assertIsNone(self.a.guess_units(False))
 
 
+class Test_report(TestCase):
+    def setUp(self):
+        self.db = DataBlock()
+        self.db.blockname = "report"
+        self.fi = DimSweep("freq", np.arange(50000.), unit="Hz")
+        self.db.y = hfarray(np.zeros(50000), dims=(self.fi,))
+
+    def test_repr(self):
+        self.assertEqual(repr(self.db), self.db.report(mode="metadata"))
+        self.assertNotIn("_minmax_cache", self.fi.__dict__)
+        self.assertIn("[Hz]", repr(self.db))
+
+    def test_cache(self):
+        self.assertEqual(str(self.db), self.db.report())
+        self.assertEqual(self.fi.__dict__["_minmax_cache"],
+                         (0, 49999, True))
+        self.assertIn("49.999", self.db.report(mode="sample"))
+
+    def test_sample(self):
+        report = self.db.report(mode="sample")
+        self.assertIn("~0.", report)
+        self.assertNotIn("_minmax_cache", self.fi.__dict__)
+
+    def test_linear_dim(self):
+        fi = ds.LinearDim("freq", start=1e9, stop=10e9, count=10 ** 7)
+        self.assertEqual(fi._minmax(), (1e9, 10e9, True))
+
+
 class Test_DataBlock_replace_ivardata(TestCase):
     def test1(self):
         a = DataBlock()
@@ -319,6 +347,53 @@ class Test_filter(TestCase):
                             outputformat="%.5f", unit="V")
         self.assertRaises(ValueError, d.filter, d.a < 2)
 
+    def test_slice(self):
+        d = DataBlock()
+        ri = DimRep("r", 2)
+        fi = DimSweep("f", 6)
+        d["a"] = hfarray(np.arange(12.).reshape(2, 6), dims=(ri, fi),
+                         unit="V")
+        w = d.filter((d.f >= 1) & (d.f < 4))
+        self.assertEqual(w.a.dims, (ri, DimSweep("f", [1, 2, 3])))
+        self.assertAllclose(w.a, [[1, 2, 3], [7, 8, 9]])
+        self.assertEqual(w.a.unit, "V")
+        self.assertFalse(np.may_share_memory(w.a, d.a))
+
+    def test_view(self):
+        d = DataBlock()
+        ri = DimRep("r", 2)
+        fi = DimSweep("f", 6)
+        d["a"] = hfarray(np.arange(12.).reshape(2, 6), dims=(ri, fi))
+        w = d.filter((d.f >= 1) & (d.f < 4), copy=False)
+        self.assertAllclose(w.a, [[1, 2, 3], [7, 8, 9]])
+        self.assertTrue(np.may_share_memory(w.a, d.a))
+        w = d.filter(hfarray(DimSweep("f", [1, 3, 5])), copy=False)
+        self.assertAllclose(w.a, [[1, 3, 5], [7, 9, 11]])
+        self.assertTrue(np.may_share_memory(w.a, d.a))
+        w = d.filter((d.f == 1) | (d.f == 2) | (d.f == 5), copy=False)
+        self.assertAllclose(w.a, [[1, 2, 5], [7, 8, 11]])
+        self.assertFalse(np.may_share_memory(w.a, d.a))
+
+    def test_write_result(self):
+        d = DataBlock()
+        fi = DimSweep("f", 6)
+        d["a"] = hfarray(np.arange(6.), dims=(fi,))
+        for mask in [d.f < 3, (d.f % 2) == 0, d.f != 2]:
+            w = d.filter(mask)
+            w.a[0] = 55
+            self.assertAllclose(d.a, np.arange(6.))
+
+    def test_select(self):
+        d = DataBlock()
+        ri = DimRep("r", 2)
+        fi = DimSweep("f", 6)
+        d["a"] = hfarray(np.arange(12.).reshape(2, 6), dims=(ri, fi))
+        d["b"] = hfarray(np.arange(6.), dims=(fi,))
+        w = d.select(ds.DimSelection(fi, [0, 1, 5]))
+        self.assertEqual(w.ivardata["f"], DimSweep("f", [0, 1, 5]))
+        self.assertAllclose(w.a, [[0, 1, 5], [6, 7, 11]])
+        self.assertAllclose(w.b, [0, 1, 5])
+
     def test_intersection_1(self):
         d = DataBlock()
         fi = DimSweep("Freq[Hz]", [10, 20, 30, 40, 50])
@@ -345,6 +420,27 @@ class Test_filter(TestCase):
         x = DimSweep("Freq[Hz]", [20, 40])
         dres = d.filter(hfarray(x))
         self.assertAllclose(dres["Freq[Hz]"], [20, 40])
+        self.assertAllclose(dres.a, [[1, 2, 3, 4]] * 2)
+
+    def test_values_order(self):
+        d = DataBlock()
+        gi = DimSweep("g", 2)
+        fi = DimSweep("Freq[Hz]", [10., 20, 30, 40, 50])
+        d["a"] = hfarray([[1, 2, 3, 4, 5], [6, 7, 8, 9, 10]], dims=(gi, fi))
+        x = DimSweep("Freq[Hz]", [40.0000001, 30])
+        dres = d.filter(hfarray(x))
+        self.assertAllclose(dres["Freq[Hz]"], [30])
+        dres = d.filter(hfarray(x), rtol=1e-6)
+        self.assertAllclose(dres["Freq[Hz]"], [30, 40])
+        self.assertAllclose(dres.a, [[3, 4], [8, 9]])
+
+    def test_values_repeated(self):
+        d = DataBlock()
+        ri = DimSweep("r", [1, 1, 2, 3])
+        d["a"] = hfarray([10, 11, 20, 30], dims=(ri,))
+        dres = d.filter(hfarray(DimSweep("r", [1, 3])))
+        self.assertAllclose(dres.r, [1, 1, 3])
+        self.assertAllclose(dres.a, [10, 11, 30])
 
 
 class Test_sort(TestCase):
@@ -387,6 +483,63 @@ class Test_sort(TestCase):
             d.sort(DimSweep("NONE", [1, 2, 3]))
         reset_hftools_warnings()
 
+    def test_sorted_view(self):
+        d = self.d
+        result, selection = d.sort(d.ivardata["g"], return_selection=True)
+        self.assertEqual(selection.index, slice(None))
+        self.assertTrue(np.may_share_memory(result.ac, d.ac))
+        self.assertAllclose(result.a, d.a)
+
+    def test_reversed_view(self):
+        d = self.d
+        result = d.sort(-hfarray(d.ivardata["g"]))
+        self.assertTrue(np.may_share_memory(result.ac, d.ac))
+        self.assertTrue(np.may_share_memory(result.c, d.c))
+        self.assertAllclose(result.c, [40, 10, 20, 30])
+        self.assertAllclose(result.g, [3, 2, 1, 0])
+
+    def test_permutation_copy(self):
+        d = self.d
+        result = d.sort(d.c)
+        self.assertFalse(np.may_share_memory(result.ac, d.ac))
+        self.assertFalse(np.may_share_memory(result.c, d.c))
+        self.assertAllclose(result.c, [10, 20, 30, 40])
+
+    def test_copy(self):
+        d = self.d
+        result = d.sort(-hfarray(d.ivardata["g"]), copy=True)
+        self.assertFalse(np.may_share_memory(result.ac, d.ac))
+        self.assertAllclose(result.c, [40, 10, 20, 30])
+
+    def test_write_result(self):
+        d = self.d
+        for dim in [d.ivardata["g"], -hfarray(d.ivardata["g"]), d.c]:
+            result = d.sort(dim, copy=True)
+            result.c[...] = 99
+            result.ac[...] = 99
+            self.assertAllclose(d.c, [30, 20, 10, 40])
+            self.assertAllclose(d.ac, [[90, 60, 30, 120],
+                                       [60, 40, 20, 80],
+                                       [30, 20, 10, 40]])
+
+    def test_selection(self):
+        d = self.d
+        result, selection = d.sort(d.b, return_selection=True)
+        sibling = DataBlock()
+        sibling["x"] = hfarray([4, 5, 6], dims=d.a.dims)
+        result2 = sibling.select(selection)
+        self.assertAllclose(result2.x, [5, 6, 4])
+        self.assertEqual(result2.x.dims, result.b.dims)
+
+    def test_missing_selection(self):
+        reset_hftools_warnings()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", HFToolsWarning)
+            res, selection = self.d.sort(DimSweep("NONE", [1, 2, 3]),
+                                         return_selection=True)
+        reset_hftools_warnings()
+        self.assertIsNone(selection)
+
 
 class Test_remove_rep(TestCase):
     def setUp(self):
@@ -409,6 +562,14 @@ class Test_remove_rep(TestCase):
         result = d.remove_rep()
         self.assertTrue("AllReps" in result.ivardata)
 
+    def test_index_variables(self):
+        result = self.d.remove_rep()
+        self.assertAllclose(result.g, [0, 0, 0, 1, 1, 1])
+        self.assertAllclose(result.h, [0, 1, 2, 0, 1, 2])
+        self.assertAllclose(np.asarray(result.c),
+                            np.asarray(self.d.c).ravel())
+        self.assertTrue(np.may_share_memory(result.c, self.d.c))
+
 
 class Test_hyper(TestCase):
     def setUp(self):
@@ -470,6 +631,35 @@ class Test_hyper(TestCase):
         result = self.d.hyper(["a", "b"], "Index", all=True)
         self.assertTrue("y" in result)
 
+    def test_appearance_order(self):
+        gi = DimSweep("Index", 4)
+        d = DataBlock()
+        d["a"] = hfarray([3, 3, 1, 1], dims=(gi,))
+        d["b"] = hfarray([20, 10, 10, 20], dims=(gi,))
+        d["c"] = hfarray([1, 2, 3, 4], dims=(gi,))
+        result = d.hyper(["a", "b"], "Index")
+        self.assertAllclose(result.a, [3, 1])
+        self.assertAllclose(result.b, [20, 10])
+        self.assertAllclose(result.c, [[1, 2], [4, 3]])
+
+    def test_incomplete(self):
+        del self.d["c"]
+        d = self.d.filter(hfarray(self.d.ivardata["Index"]) != 3)
+        d["c"] = hfarray([1, 2, 3, 5, 6], dims=(d.ivardata["Index"],))
+        self.assertRaises(ValueError, d.hyper, ["a", "b"], "Index")
+        result = d.hyper(["a", "b"], "Index", fill=np.nan)
+        self.assertAllclose(result.c[[0, 2]], [[1, 2], [5, 6]])
+        self.assertAllclose(result.c[1, 0], 3)
+        self.assertTrue(np.isnan(result.c[1, 1]))
+        self.assertEqual(result.c.dtype, np.dtype(float))
+
+    def test_duplicate(self):
+        self.d["b"] = hfarray([10, 20, 10, 10, 10, 20],
+                              dims=(self.d.ivardata["Index"],))
+        self.assertRaises(ValueError, self.d.hyper, ["a", "b"], "Index")
+        self.assertRaises(ValueError, self.d.hyper, ["a", "b"], "Index",
+                          fill=0)
+
 class Test_guess_units(TestCase):
     def test_1(self):
         d = DataBlock()
@@ -60,6 +60,16 @@ class Test_interpolate(TestCase):
         D = self.d.interpolate(hfarray(fx))
         self.assertAllclose(D.y, hfarray([1., 1.4], dims=(fx,)))
 
+    def test_none_order(self):
+        gi = DimSweep("g", 2)
+        f1 = self.d.y.dims[0]
+        self.d.z = hfarray([[1., 2, 3, 4, 5], [6, 7, 8, 9, 10]],
+                           dims=(gi, f1))
+        fx = DimSweep("freq", [4e9, 2e9])
+        D = self.d.interpolate(fx)
+        self.assertEqual(D.z.dims, (gi, fx))
+        self.assertAllclose(D.z, [[4, 2], [9, 7]])
+
     def test_none_raise(self):
         fx = DimSweep("freq", [1.5e9, 5e9])
         self.assertRaises(ValueError, self.d.interpolate, fx)
@@ -140,8 +140,38 @@ class Test_Dim(TestCase):
 
     def test_hash(self):
         a = self.cls("a", 2)
-        hashres = hash((self.cls.sortprio, "a", self.cls, (0, 1), None, None))
-        self.assertEqual(hash(a), hashres)
+        self.assertEqual(hash(a), hash(self.cls("a", [0, 1])))
+        self.assertEqual(hash(a), hash(self.cls("a", [0., 1.])))
+        self.assertNotEqual(hash(a), hash(self.cls("a", [0, 2])))
+        self.assertNotEqual(hash(a), hash(self.cls("b", 2)))
+
+    def test_hash_cached(self):
+        a = self.cls("a", 2)
+        hash(a)
+        self.assertIs(a._fingerprint, a._fingerprint)
+
+    def test_eq_1(self):
+        a = self.cls("a", 3, unit="Hz")
+        self.assertEqual(a, self.cls("a", [0., 1., 2.], unit="Hz"))
+        self.assertEqual(a, a)
+
+    def test_eq_2(self):
+        a = self.cls("a", 3, unit="Hz")
+        self.assertFalse(a == self.cls("a", [0, 1, 3], unit="Hz"))
+        self.assertFalse(a == self.cls("a", 4, unit="Hz"))
+        self.assertFalse(a == self.cls("a", 3, unit="s"))
+        self.assertFalse(a == self.cls("b", 3, unit="Hz"))
+
+    def test_eq_3(self):
+        a = self.cls("a", ["x", "y"])
+        self.assertEqual(a, self.cls("a", ["x", "y"]))
+        self.assertFalse(a == self.cls("a", ["x", "z"]))
+
+    def test_eq_large_int(self):
+        a = self.cls("a", np.array([2 ** 53], np.int64))
+        self.assertEqual(a, self.cls("a", np.array([2 ** 53], np.int64)))
+        self.assertFalse(a == self.cls("a", np.array([2 ** 53 + 1],
+                                                     np.int64)))
 
     def test_get_1(self):
         a = self.cls("a", 10)
@@ -165,6 +195,23 @@ class Test_Dim(TestCase):
         a = self.cls("a", 10, unit="Hz")
         self.assertRaises(IndexError, lambda x: x[0], a)
 
+    def test_data_readonly(self):
+        a = self.cls("a", 10)
+        self.assertFalse(a.data.flags.writeable)
+        self.assertTrue(a.data.flags.c_contiguous)
+        self.assertIs(a.data, a.data)
+
+    def test_data_copied_from_writeable(self):
+        x = np.arange(5.)
+        a = self.cls("a", x)
+        x[0] = 10
+        self.assertAllclose(a.data, range(5))
+
+    def test_data_shared_between_dims(self):
+        a = self.cls("a", np.arange(5.))
+        b = self.cls(a, name="b")
+        self.assertIs(b.data, a.data)
+
 
 class Test_DimSweep(Test_Dim):
     cls = ddim.DimSweep
@@ -228,6 +275,67 @@ class TestDiag_Matrix_j(Test_Dim):
     deriv = ddim.DimMatrix_Deriv_j
 
 
+class TestLinearDim(TestCase):
+    def setUp(self):
+        self.data = np.linspace(1e9, 21e9, 101)
+        self.explicit = DimSweep("freq", self.data, unit="Hz")
+        self.dim = ddim.LinearDim("freq", start=1e9, stop=21e9, count=101,
+                                  unit="Hz")
+
+    def test_init(self):
+        self.assertIsInstance(self.dim.grid, ddim.LinearGrid)
+        self.assertEqual(self.dim.fullsize(), 101)
+        self.assertEqual(self.dim.data.tolist(), self.data.tolist())
+        self.assertFalse(self.dim.data.flags.writeable)
+        self.assertIs(self.dim.data, self.dim.data)
+
+    def test_init_from_data(self):
+        a = ddim.LinearDim("freq", self.data)
+        self.assertIsNotNone(a.grid)
+        b = ddim.LinearDim(self.explicit)
+        self.assertIsNotNone(b.grid)
+        self.assertEqual(b.unit, "Hz")
+
+    def test_init_irregular(self):
+        a = ddim.LinearDim("freq", [1, 2, 4])
+        self.assertIsNone(a.grid)
+        self.assertEqual(a.data.tolist(), [1, 2, 4])
+
+    def test_init_error(self):
+        self.assertRaises(ValueError, ddim.LinearDim, "freq", [1, 2],
+                          count=2)
+
+    def test_eq(self):
+        self.assertEqual(self.dim, self.explicit)
+        self.assertEqual(self.explicit, self.dim)
+        self.assertEqual(hash(self.dim), hash(self.explicit))
+        self.assertFalse(self.dim == DimSweep("freq", self.data + 1,
+                                              unit="Hz"))
+
+    def test_lt(self):
+        self.assertFalse(self.dim < self.explicit)
+        self.assertFalse(self.explicit < self.dim)
+
+    def test_slice(self):
+        for index in [slice(3, 50, 7), slice(None, None, -1),
+                      slice(90, 2, -3), slice(5, 5), slice(-10, None)]:
+            a = self.dim[index]
+            self.assertIsInstance(a, ddim.LinearDim)
+            self.assertIsNotNone(a.grid)
+            self.assertEqual(a, self.explicit[index])
+
+    def test_log(self):
+        a = ddim.LinearDim("freq", start=1e6, stop=1e9, count=31, log=True)
+        explicit = DimSweep("freq", np.logspace(6, 9, 31))
+        self.assertEqual(a, explicit)
+        self.assertEqual(a[2::3], explicit[2::3])
+
+    def test_matching(self):
+        a = hfarray(np.zeros(101), dims=(self.explicit,))
+        self.assertTrue(self.dim in a.dims)
+        self.assertEqual(a.dims.matching_index(self.dim), 0)
+
+
 class Test_dims_has_complex(TestCase):
     def _helper(self, dims):
         self.assertTrue(dims_has_complex(dims))
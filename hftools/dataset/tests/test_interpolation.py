@@ -0,0 +1,110 @@
+#-----------------------------------------------------------------------------
+# Copyright (c) 2014, HFTools Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+import numpy as np
+
+import hftools.dataset.interpolation as interpolation
+from hftools.dataset import hfarray, DimSweep, DataBlock
+from hftools.dataset.interpolation import Interpolator, get_interpolator
+from hftools.testing import TestCase, make_load_tests
+
+try:
+    from scipy.interpolate import CubicSpline
+except ImportError:  # pragma: no cover
+    CubicSpline = None
+
+load_tests = make_load_tests(interpolation)
+
+
+class Test_Interpolator(TestCase):
+    def setUp(self):
+        self.x = np.array([1., 2., 4., 5., 7.])
+        self.fi = DimSweep("freq", self.x)
+        self.gi = DimSweep("g", 2)
+        self.fx = DimSweep("freq", [1., 1.5, 3., 6.5, 7.])
+        self.y = hfarray([[1., 3, 2, 5, 4], [0, 1, 4, 9, 16]],
+                         dims=(self.gi, self.fi), unit="V")
+
+    def test_linear(self):
+        res = Interpolator(self.fi, self.fx, "linear")(self.y)
+        self.assertEqual(res.dims, (self.gi, self.fx))
+        self.assertEqual(res.unit, "V")
+        for row, facit in zip(res, self.y):
+            self.assertAllclose(row, np.interp(self.fx.data, self.x, facit))
+
+    def test_nearest(self):
+        res = Interpolator(self.fi, self.fx, "nearest")(self.y)
+        self.assertAllclose(res, [[1, 1, 3, 4, 4], [0, 0, 1, 16, 16]])
+
+    def test_cubic(self):
+        if CubicSpline is None:  # pragma: no cover
+            self.skipTest("Needs scipy.interpolate.CubicSpline")
+        res = Interpolator(self.fi, self.fx, "cubic")(self.y)
+        facit = CubicSpline(self.x, np.asarray(self.y), axis=1,
+                            bc_type="natural")(np.array(self.fx.data))
+        self.assertAllclose(res, facit)
+
+    def test_cubic_line(self):
+        y = hfarray(2 * self.x + 1, dims=(self.fi,))
+        res = Interpolator(self.fi, self.fx, "cubic")(y)
+        self.assertAllclose(res, 2 * self.fx.data + 1)
+
+    def test_magphase(self):
+        fi = DimSweep("freq", [0., 1.])
+        fx = DimSweep("freq", [0.5])
+        y = hfarray(np.exp(1j * np.array([3., -3.])), dims=(fi,))
+        res = Interpolator(fi, fx, "magphase")(y)
+        self.assertAllclose(res, [np.exp(1j * np.pi)])
+        res = Interpolator(fi, fx, "linear")(y)
+        self.assertAllclose(abs(res), abs(np.cos(3)))
+
+    def test_unsorted(self):
+        fi = DimSweep("freq", self.x[::-1])
+        y = hfarray(self.x[::-1] ** 2, dims=(fi,))
+        res = Interpolator(fi, self.fx, "linear")(y)
+        self.assertAllclose(res, np.interp(self.fx.data, self.x, self.x ** 2))
+        res = Interpolator(fi, self.fx, "nearest")(y)
+        self.assertAllclose(res, [1, 1, 4, 49, 49])
+
+    def test_none(self):
+        fx = DimSweep("freq", [2., 5.])
+        res = Interpolator(self.fi, fx, None)(self.y)
+        self.assertAllclose(res, [[3, 5], [1, 9]])
+        self.assertTrue(np.may_share_memory(res, self.y))
+
+    def test_errors(self):
+        fx = DimSweep("freq", [0., 2.])
+        self.assertRaises(ValueError, Interpolator, self.fi, fx, "linear")
+        self.assertRaises(ValueError, Interpolator, self.fi, fx, None)
+        self.assertRaises(ValueError, Interpolator, self.fi, fx, "unknown")
+        interp = Interpolator(self.fi, self.fx)
+        y = hfarray([1., 2], dims=(DimSweep("freq", 2),))
+        self.assertRaises(ValueError, interp, y)
+
+    def test_missing_dim(self):
+        y = hfarray([1., 2], dims=(self.gi,))
+        self.assertIs(Interpolator(self.fi, self.fx)(y), y)
+
+
+class Test_get_interpolator(TestCase):
+    def test_cache(self):
+        fi = DimSweep("freq", [1., 2., 3.])
+        fx = DimSweep("freq", [1.5, 2.5])
+        a = get_interpolator(fi, fx, "linear")
+        b = get_interpolator(DimSweep("freq", [1., 2., 3.]), fx, "linear")
+        self.assertIs(a, b)
+        self.assertIsNot(a, get_interpolator(fi, fx, "nearest"))
+
+    def test_datablock(self):
+        fi = DimSweep("freq", [1., 2., 3.])
+        fx = DimSweep("freq", [1.5, 2.5])
+        db = DataBlock()
+        db.a = hfarray([1., 2, 3], dims=(fi,))
+        db.b = hfarray([2., 4, 6], dims=(fi,))
+        res = db.interpolate(fx, "cubic")
+        self.assertAllclose(res.a, [1.5, 2.5])
+        self.assertAllclose(res.b, [3, 5])
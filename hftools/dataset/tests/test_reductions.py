@@ -0,0 +1,89 @@
+#-----------------------------------------------------------------------------
+# Copyright (c) 2014, HFTools Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+import os
+import tempfile
+
+import numpy as np
+
+import hftools.dataset.reductions as red
+from hftools.dataset import hfarray, DimSweep, DimRep
+from hftools.testing import TestCase, make_load_tests
+
+load_tests = make_load_tests(red)
+
+
+class Test_chunked(TestCase):
+    funcs = [(red.chunked_sum, np.sum),
+             (red.chunked_mean, np.mean),
+             (red.chunked_var, np.var),
+             (red.chunked_std, np.std),
+             (red.chunked_min, np.min),
+             (red.chunked_max, np.max)]
+
+    def setUp(self):
+        self.ri = DimRep("rep", 7)
+        self.fi = DimSweep("freq", 5)
+        self.gi = DimSweep("g", 3)
+        data = np.random.randn(7, 5, 3) * 10 + 3
+        self.a = hfarray(data, dims=(self.ri, self.fi, self.gi))
+
+    def _check(self, x, axis, axes, dims, chunksize=2):
+        for func, npfunc in self.funcs:
+            res = func(x, axis, chunksize=chunksize)
+            self.assertEqual(res.dims, dims)
+            self.assertAllclose(res, npfunc(np.asarray(x), axis=axes))
+
+    def test_first_axis(self):
+        self._check(self.a, "rep", 0, (self.fi, self.gi))
+
+    def test_other_axis(self):
+        self._check(self.a, "g", 2, (self.ri, self.fi))
+
+    def test_several(self):
+        self._check(self.a, ("rep", "g"), (0, 2), (self.fi,), chunksize=3)
+        self._check(self.a, DimSweep, (1, 2), (self.ri,), chunksize=3)
+
+    def test_all(self):
+        self._check(self.a, None, None, (), chunksize=1)
+
+    def test_default_chunksize(self):
+        self._check(self.a, "rep", 0, (self.fi, self.gi), chunksize=None)
+
+    def test_complex(self):
+        data = np.asarray(self.a)
+        a = hfarray(data + 1j * data[::-1], dims=self.a.dims)
+        for func, npfunc in self.funcs[:4]:
+            res = func(a, "rep", chunksize=3)
+            self.assertAllclose(res, npfunc(np.asarray(a), axis=0))
+
+    def test_ddof(self):
+        res = red.chunked_std(self.a, "rep", chunksize=2, ddof=1)
+        self.assertAllclose(res, np.asarray(self.a).std(axis=0, ddof=1))
+
+    def test_dims_argument(self):
+        res = red.chunked_mean(np.asarray(self.a), "rep", chunksize=2,
+                               dims=self.a.dims)
+        self.assertEqual(res.dims, (self.fi, self.gi))
+        self.assertAllclose(res, np.asarray(self.a).mean(axis=0))
+
+    def test_dims_mismatch(self):
+        self.assertRaises(ValueError, red.chunked_mean, np.zeros((2, 3)),
+                          "rep", dims=(self.ri,))
+
+    def test_memmap(self):
+        fd, fname = tempfile.mkstemp(suffix=".dat")
+        os.close(fd)
+        try:
+            mm = np.memmap(fname, dtype=np.float64, mode="w+",
+                           shape=self.a.shape)
+            mm[...] = self.a
+            x = hfarray(mm, dims=self.a.dims, copy=False)
+            self._check(x, "rep", 0, (self.fi, self.gi))
+            del mm, x
+        finally:
+            os.remove(fname)
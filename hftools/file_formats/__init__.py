@@ -22,6 +22,7 @@ This package contains routines to read and write data.
 .. automodule:: hftools.file_formats.touchstone
 .. automodule:: hftools.file_formats.spdata
 .. automodule:: hftools.file_formats.citi
+.. automodule:: hftools.file_formats.npydir
 
 """
 import glob
@@ -37,9 +38,10 @@ from hftools.file_formats.citi import read_citi, save_citi, is_citi,\
     CITIFileError
 from hftools.file_formats.spdata import read_spdata, save_spdata
 from hftools.file_formats.hdf5 import read_hdf5, save_hdf5, is_hdf5,\
-    append_hdf5
+    append_hdf5, HDF5Appender
 from hftools.file_formats.muwave_mat import read_muwave_matlabdata,\
     is_muwave_matlabdata
+from hftools.file_formats.npydir import read_npydir, save_npydir, is_npydir
 from hftools._external import path
 
 isfile = [(is_mdif, read_mdif),
@@ -58,6 +60,7 @@ def read_data(filename, merge=True, guess_unit=True,
 
     The file format is guessed by looking for distinguishing marks for
     citi, touchstone, and mdif. If non of those are present spdata is assumed.
+    A directory saved with save_npydir is read with read_npydir.
     """
     if isinstance(filename, (list, tuple)):
         filenames = filename
@@ -70,6 +73,8 @@ def read_data(filename, merge=True, guess_unit=True,
             break
     else:
         raise IOError("No files match pattern %r" % filename)
+    if is_npydir(fname):
+        return read_npydir(fname, **kw)
     fil = open(fname)
     for rad in fil:
         for fun, readfun in isfile:
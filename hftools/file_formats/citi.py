@@ -19,11 +19,12 @@ from __future__ import print_function
 import re
 
 import numpy as np
-from numpy import array, iscomplexobj, pi
+from numpy import iscomplexobj, pi
 import hftools.dataset
-from hftools.dataset import DataBlock, DimSweep, hfarray, _DimMatrix
+from hftools.dataset import DataBlock, DimSweep, hfarray, _DimMatrix,\
+    LinearDim
 from hftools.core.exceptions import HFToolsIOError
-from hftools.file_formats.common import Comments
+from hftools.file_formats.common import Comments, parse_numbers, find_end
 
 from hftools.file_formats.readbase import ManyOptional, One, Token,\
     ReadFileFormat, Optional, OneOf
@@ -57,9 +58,20 @@ class ReadCITIFileFormat(ReadFileFormat):
                     stream of tagged lines
                     (tag, line) where tag is one of
                     "Comment", "Header", and "Data"
+
+        All lines between BEGIN and END, or VAR_LIST_BEGIN and
+        VAR_LIST_END, are yielded as the text of one DATA token.
         """
-        for idx, rad in enumerate(stream):
-            lineno = idx + 1
+        text = stream.read()
+        pos = 0
+        lineno = 0
+        while pos < len(text):
+            end = text.find("\n", pos)
+            if end < 0:
+                end = len(text)
+            rad = text[pos:end]
+            pos = end + 1
+            lineno += 1
             if self.verbose:
                 print("\r               \r", lineno, end="")
             rad = rad.lstrip()
@@ -73,6 +85,11 @@ class ReadCITIFileFormat(ReadFileFormat):
                 yield Token("DATADEF", lineno, rad[4:].strip().split())
             elif rad.startswith("VAR_LIST_BEGIN"):
                 yield Token("VAR_LIST_BEGIN", lineno, rad)
+                stop = find_end(text, pos, "VAR_LIST_END")
+                if text[pos:stop].strip():
+                    yield Token("DATA", lineno + 1, text[pos:stop])
+                lineno += text.count("\n", pos, stop)
+                pos = stop
             elif rad.startswith("VAR_LIST_END"):
                 yield Token("VAR_LIST_END", lineno, rad)
             elif rad.startswith("SEG "):
@@ -83,6 +100,11 @@ class ReadCITIFileFormat(ReadFileFormat):
                 yield Token("SEG_LIST_END", lineno, rad)
             elif rad.startswith("BEGIN"):
                 yield Token("DATA_LIST_BEGIN", lineno, rad)
+                stop = find_end(text, pos, "END")
+                if text[pos:stop].strip():
+                    yield Token("DATA", lineno + 1, text[pos:stop])
+                lineno += text.count("\n", pos, stop)
+                pos = stop
             elif rad.startswith("END"):
                 yield Token("DATA_LIST_END", lineno, rad)
             elif reg_data.match(rad):
@@ -99,8 +121,6 @@ class ReadCITIFileFormat(ReadFileFormat):
                 yield Token("CITIFILE", lineno, rad[8:].strip())
             else:
                 raise CITIFileError("Unknown linetype %r" % rad)
-        else:  # pragma: no cover
-            pass
 
     def parse_blocks(self, stream):
     # raise Exception("HANTERAR INTE KOMMENTARER INNE I MANYOPTIONAL")
@@ -122,16 +142,14 @@ class ReadCITIFileFormat(ReadFileFormat):
             tagname, = OneOf(["VAR_LIST_BEGIN", "SEG_LIST_BEGIN"],
                              errmsg)(stream)
             if tagname.startswith("VAR_LIST"):
-                datalist = handle_data(ManyOptional("DATA")(stream), typ)
+                datalist = handle_data(Optional("DATA")(stream), typ)
                 block[name] = DimSweep(name, datalist)
                 One("VAR_LIST_END", "Missing VAR_LIST_END")(stream)
             elif tagname.startswith("SEG"):  # pragma: no branch
                 datalist, = One("SEG", "Missing SEG")(stream)
                 _, start, stop, step = datalist.strip().split()
-                block[name] = DimSweep(name,
-                                       np.linspace(float(start),
-                                                   float(stop),
-                                                   int(step)))
+                block[name] = LinearDim(name, start=float(start),
+                                        stop=float(stop), count=int(step))
                 One("SEG_LIST_END", "Missing SEG_LIST_END")(stream)
             else:  # pragma: no cover
                 pass
@@ -146,7 +164,7 @@ class ReadCITIFileFormat(ReadFileFormat):
         dims = tuple(block.ivardata[i[0]] for i in varnames)
         for name, typ in datanames:
             One("DATA_LIST_BEGIN", "Missing BEGIN")(stream)
-            datalist = array(handle_data(ManyOptional("DATA")(stream), typ))
+            datalist = handle_data(Optional("DATA")(stream), typ)
             datalist.shape = shape
             block[name] = hfarray(datalist, dims=dims)
             One("DATA_LIST_END", "Missing END")(stream)
@@ -157,22 +175,29 @@ class ReadCITIFileFormat(ReadFileFormat):
 
 
 def handle_data(data, typ):
+    u"""Return array of the values in *data*, the text of the DATA lines of
+       a BEGIN END block, parsed in one step. RI and MAGANGLE lines have
+       two comma separated values.
+    """
+    if typ not in ("MAG", "RI", "MAGANGLE"):
+        raise CITIFileError("Unknown Vartype %r" % (typ,))
+    data = data or ""
+    ncommas = data.count(",")
+    try:
+        values = parse_numbers(data.replace(",", " "))
+    except ValueError as exc:
+        raise CITIFileError("Invalid %s data: %s" % (typ, exc))
     if typ == "MAG":
-        return [float(elem) for elem in data]
-    elif typ == "RI":
-        out = []
-        for rad in data:
-            r, i = rad.strip().split(",")
-            out.append(float(r) + float(i) * 1j)
-        return out
-    elif typ == "MAGANGLE":
-        out = []
-        for rad in data:
-            r, i = rad.strip().split(",")
-            out.append(float(r) * np.exp(float(i) / 180 * pi * 1j))
-        return out
+        if ncommas:
+            raise CITIFileError("Invalid MAG data, must be one value per line")
+        return values
+    if len(values) != 2 * ncommas:
+        msg = "Invalid %s data, must be two values per line" % typ
+        raise CITIFileError(msg)
+    if typ == "RI":
+        return values.view(np.complex128)
     else:
-        raise CITIFileError("Unknown Vartype %r" % (typ,))
+        return values[::2] * np.exp(values[1::2] / 180 * pi * 1j)
 
 
 def format_citi_block(inblock):
@@ -211,6 +236,16 @@ def format_citi_block(inblock):
 
     for name, value in block.ivardata.items():
         if is_numlike(value.data) and not isinstance(value, _DimMatrix):
+            grid = getattr(value, "grid", None)
+            if grid is not None and not grid.log and len(grid):
+                yield "SEG_LIST_BEGIN"
+                fmt = "SEG %s %s %%d" % (value.outputformat,
+                                         value.outputformat)
+                start, = grid[:1].tolist()
+                stop, = grid[-1:].tolist()
+                yield fmt % (start, stop, len(grid))
+                yield "SEG_LIST_END"
+                continue
             yield "VAR_LIST_BEGIN"
             fmt = value.outputformat
             for rad in value.data:
@@ -17,6 +17,7 @@ import re
 import itertools
 import time
 import datetime
+import warnings
 import numpy as np
 from hftools.dataset import hfarray, ismatrix, DataBlock
 from hftools.constants import convert_with_unit,\
@@ -148,6 +149,45 @@ else:  # pragma: no coverage:
         return datetime.datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
 
 
+_number_chars = b"0123456789+-.eEnNaAiIfF \t\n\r\f\v"
+
+
+def parse_numbers(text):
+    u"""Return float array of the whitespace separated numbers in *text*,
+       parsed in bulk by numpy. Raises ValueError if a token is not a
+       number.
+
+        >>> parse_numbers(u"1 2.5\n -3e3").tolist()
+        [1.0, 2.5, -3000.0]
+    """
+    raw = text.encode("utf-8")
+    if raw.translate(None, _number_chars):
+        raise ValueError("Invalid character in numeric data")
+    space = np.frombuffer(raw, dtype=np.uint8) <= 32
+    ntokens = (np.count_nonzero(space[:-1] > space[1:]) +
+               int(not space[:1].all()))
+    if ntokens == 0:
+        return np.zeros((0,), dtype=np.float64)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        values = np.fromstring(raw, dtype=np.float64, sep=" ")
+    if len(values) != ntokens:
+        raise ValueError("Invalid number in numeric data")
+    return values
+
+
+def find_end(text, pos, marker):
+    u"""Return start of first line after *pos* in *text* that starts with
+       *marker*, or length of *text* if there is none.
+    """
+    idx = text.find(marker, pos)
+    while idx >= 0 and text[text.rfind("\n", 0, idx) + 1:idx].strip():
+        idx = text.find(marker, idx + 1)
+    if idx < 0:
+        return len(text)
+    return text.rfind("\n", 0, idx) + 1
+
+
 def process_comment(comment):
     reg = reg_comment_all.match(comment)
     out = {}
@@ -41,6 +41,20 @@ else:
         return h5py.is_hdf5(filename)
 
     def read_hdf5(h5file, name="datablock", **kw):
+        """Read DataBlock from hdf5 file *h5file*, a file name or an open
+        h5py File.
+
+        *variables* is a list of the variables to read, default all, and
+        *where* maps dimension names to conditions, e.g.
+        where={"freq": (1e9, 5e9)}, so only the matching part of the
+        variables is read. See v_02.read_hdf5_handle for *lazy* and
+        *mmap*.
+        """
+        if kw.get("lazy") and not isinstance(h5file, h5py.File):
+            fil = h5py.File(h5file, mode="r")
+            if fil.attrs.get("hftools file version", "") == "0.2":
+                return v_02.read_hdf5(fil, name=name, **kw)
+            fil.close()
         with hdf5context(h5file) as fil:
             version = fil.attrs.get("hftools file version", "")
             if version == "0.2":
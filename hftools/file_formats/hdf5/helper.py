@@ -7,6 +7,8 @@
 # The full license is in the file COPYING.txt, distributed with this software.
 #-----------------------------------------------------------------------------
 from contextlib import contextmanager
+
+import numpy as np
 try:
     import h5py
     import_failed = False
@@ -17,9 +19,65 @@ except ImportError:  # pragma: no cover
 
 @contextmanager
 def hdf5context(filehandle, mode="r"):
+    u"""Use open h5py File *filehandle* as is, or open the file named
+       *filehandle* with *mode*. A file opened for writing is trimmed
+       with *trim_hdf5* before it is closed.
+    """
     if isinstance(filehandle, h5py.File):
         yield filehandle
     else:
         with h5py.File(filehandle, mode=mode) as fil:
             yield fil
+            if mode != "r":
+                from .v_02 import trim_hdf5
+                trim_hdf5(fil)
+
+
+def where_selection(dim, condition):
+    u"""Index of the values of *dim* that match *condition*, a slice if
+       they are consecutive else an index array.
+
+       *condition* is a (low, high) tuple, inclusive with None for no
+       limit, a callable returning a boolean mask for the values, or a
+       value or list of values to select.
+    """
+    data = np.asarray(dim.data)
+    if callable(condition):
+        mask = np.asarray(condition(data), dtype=bool)
+    elif isinstance(condition, tuple):
+        low, high = condition
+        mask = np.ones(data.shape, dtype=bool)
+        if low is not None:
+            mask &= data >= low
+        if high is not None:
+            mask &= data <= high
+    else:
+        mask = np.in1d(data, np.atleast_1d(condition))
+    idx = np.flatnonzero(mask)
+    if len(idx) and idx[-1] - idx[0] + 1 == len(idx):
+        return slice(int(idx[0]), int(idx[-1]) + 1)
+    return idx
+
 
+def read_selection(dataset, index):
+    u"""Read *dataset*[*index*], where *index* has a slice or increasing
+       index array per axis, with a single hyperslab read. Index arrays
+       are read as the range they span and picked out in memory.
+    """
+    outer = []
+    inner = []
+    for idx in index:
+        if isinstance(idx, slice):
+            outer.append(idx)
+            inner.append(None)
+        elif len(idx) == 0:
+            outer.append(slice(0, 0))
+            inner.append(None)
+        else:
+            outer.append(slice(idx[0], idx[-1] + 1))
+            inner.append(idx - idx[0])
+    data = dataset[tuple(outer)]
+    for ax, idx in enumerate(inner):
+        if idx is not None:
+            data = data.take(idx, axis=ax)
+    return data
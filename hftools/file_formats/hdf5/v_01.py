@@ -18,6 +18,7 @@ import numpy as np
 from hftools.dataset import DimRep, hfarray, DataBlock
 from hftools.dataset.dim import DimBase
 from hftools.file_formats.common import Comments
+from hftools.file_formats.hdf5.helper import where_selection, read_selection
 
 from hftools.py3compat import string_types, cast_unicode, cast_bytes
 
@@ -81,7 +82,7 @@ def save_hdf5(db, h5file, name="datablock", mode="w", compression="gzip", **kw):
 dims_dict = dict((name, dim) for name, dim in hftools.dataset.__dict__.items() if isinstance(dim, type) and issubclass(dim, DimBase))
 #print dims
 
-def read_hdf5(h5file, name="datablock", **kw):
+def read_hdf5(h5file, name="datablock", variables=None, where=None, **kw):
     if isinstance(h5file, string_types):
         fil = h5py.File(h5file, "r")
     else:
@@ -110,14 +111,30 @@ def read_hdf5(h5file, name="datablock", **kw):
         vdata = np.array(np.array(v), dtype=datadtype)
         dim = dimcls(k, vdata, unit=unit)
         db[k] = dim
-    for k in vardata:
+    selections = {}
+    for k, condition in (where or {}).items():
+        if k not in db.ivardata:
+            raise KeyError("Dimension %r not in file" % k)
+        selections[k] = where_selection(db.ivardata[k], condition)
+        db[k] = db.ivardata[k][selections[k]]
+    if variables is None:
+        variables = list(vardata)
+    for k in variables:
+        if k not in vardata:
+            raise KeyError("Variable %r not in file" % k)
         v = vardata[k]
         datadtype = v.attrs[r"data\dtype"] or None
-        dims = tuple(db.ivardata[cast_unicode(dimname)] for dimname in v.attrs[r"info\name"])
+        dimnames = [cast_unicode(x) for x in v.attrs[r"info\name"]]
+        dims = tuple(db.ivardata[dimname] for dimname in dimnames)
         unit = cast_unicode(v.attrs.get(r"data\unit", "none"))
         if unit.lower() == "none":
             unit = None
-        db[k] = hfarray(np.array(v), dtype=datadtype, dims=dims, unit=unit)
+        if any(x in selections for x in dimnames):
+            data = read_selection(v, [selections.get(x, slice(None))
+                                      for x in dimnames])
+        else:
+            data = np.array(v)
+        db[k] = hfarray(data, dtype=datadtype, dims=dims, unit=unit)
     if isinstance(h5file, string_types):
         fil.close()
 
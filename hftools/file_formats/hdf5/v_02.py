@@ -13,19 +13,26 @@ except ImportError:  # pragma: no cover
     import_failed = True
     h5py = None
 
+import math
+import time
+
 import numpy as np
 from hftools.dataset import DimRep, DimSweep, hfarray, DataBlock,\
-    DimMatrix_i, DimMatrix_j, DimPartial
+    DimMatrix_i, DimMatrix_j, DimPartial, LinearDim
+from hftools.dataset.dim import _DimMatrix
+from hftools.dataset.dim import LinearGrid
+from hftools.dataset.lazy import LazyArray
 from hftools.py3compat import PY3
 from hftools.dataset.comments import Comments
 #from hftools.file_formats.hdf5.hdf5 import hdf5context
-from .helper import hdf5context
+from .helper import hdf5context, where_selection, read_selection
 
 dimrep = {"DimRep": DimRep,
           "DimSweep": DimSweep,
           "DimMatrix_i": DimMatrix_i,
           "DimMatrix_j": DimMatrix_j,
           "DimPartial": DimPartial,
+          "LinearDim": LinearDim,
           }
 
 
@@ -37,26 +44,115 @@ def unescape_varname(x):
     return x.replace("\\", "/")
 
 
+CHUNK_BYTES = 256 * 1024
+GROWTH = 1.5
+
+
 def expand_dataset(dataset, expansion, axis):
     dataset.resize(dataset.shape[axis] + expansion, axis=axis)
 
 
-def getvar(db, key):
+def default_chunks(data, expandaxis=None):
+    u"""Chunk shape for hfarray *data* of at most about CHUNK_BYTES.
+
+       Matrix dimensions are kept whole. The other axes are halved,
+       largest first, until the chunk is small enough. The *expandaxis*
+       gets the room that is left, so repeated appends share chunks.
+    """
+    dims = getattr(data, "dims", (None,) * data.ndim)
+    chunks = list(data.shape)
+    if expandaxis is not None:
+        chunks[expandaxis] = 1
+    chunks = [max(x, 1) for x in chunks]
+    free = [i for i, dim in enumerate(dims)
+            if not isinstance(dim, _DimMatrix) and i != expandaxis]
+    itemsize = max(data.dtype.itemsize, 1)
+    while True:
+        nbytes = itemsize * int(np.multiply.reduce(chunks))
+        candidates = [i for i in free if chunks[i] > 1]
+        if nbytes <= CHUNK_BYTES or not candidates:
+            break
+        i = max(candidates, key=lambda i: chunks[i])
+        chunks[i] = (chunks[i] + 1) // 2
+    if expandaxis is not None:
+        chunks[expandaxis] = max(1, CHUNK_BYTES // nbytes)
+    return tuple(chunks)
+
+
+def getdim(dataset):
+    dimcls = dimrep[dataset.attrs.get("dimtype", "DimSweep")]
+    if "grid" in dataset.attrs:
+        if dimcls is DimSweep:
+            dimcls = LinearDim
+        start, stop = dataset.attrs["grid"]
+        num, offset, stride, count = dataset.attrs["grid_index"]
+        data = LinearGrid(start, stop, num, log=dataset.attrs["grid_log"],
+                          offset=offset, stride=stride, count=count)
+    elif "filled" in dataset.attrs:
+        data = dataset[:dataset.attrs["filled"]]
+    else:
+        data = dataset[...]
+    return dimcls(dataset.name.strip("/"), data,
+                  unit=dataset.attrs.get("unit", None))
+
+
+def mmap_dataset(X):
+    u"""Return read-only np.memmap of the h5py Dataset *X*. Returns None
+       if *X* is chunked, compressed, not yet written, not in a plain
+       file or has variable length elements.
+    """
+    if X.chunks is not None or X.ndim == 0 or X.dtype.kind == "O":
+        return None
+    if X.file.driver not in ("sec2", "stdio"):
+        return None
+    offset = X.id.get_offset()
+    if offset is None:
+        return None
+    return np.memmap(X.file.filename, dtype=X.dtype, mode="r",
+                     offset=offset, shape=X.shape)
+
+
+def getvar(db, key, lazy=False, dimcache=None, mmap=False, selections=None):
+    u"""Read variable *key* of *db*. *dimcache* maps dimension scale names
+       to dimensions and *selections* maps dimension scale names to the
+       index, from *where_selection*, to read along that dimension.
+    """
     X = db[key]
 
+    if dimcache is None:
+        dimcache = {}
+    if selections is None:
+        selections = {}
     dims = []
+    scales = []
     for x in X.dims:
         if len(x):
-            dimcls = dimrep[x[0].attrs.get("dimtype", "DimSweep")]
-            dim = dimcls(x[0].name.strip("/"),
-                         x[0][...],
-                         unit=x[0].attrs.get("unit", None))
-            dims.append(dim)
+            scale = x[0]
+            if scale.name not in dimcache:
+                dimcache[scale.name] = getdim(scale)
+            dims.append(dimcache[scale.name])
+            scales.append(scale.name)
 
     unit = X.attrs.get("unit", None)
     outputformat = X.attrs.get("outputformat", None)
     dtype = X.attrs.get("dtype", None)
     if len(dims) == len(X.dims):
+        selected = [name for name in scales if name in selections]
+        if selected or tuple(x.fullsize() for x in dims) != X.shape:
+            # selection by where, or over-allocated by append_hdf5 and
+            # not yet trimmed
+            index = tuple(selections.get(name, slice(x.fullsize()))
+                          for name, x in zip(scales, dims))
+            return hfarray(read_selection(X, index), dims=dims, unit=unit,
+                           dtype=dtype, outputformat=outputformat)
+        if mmap and (dtype is None or np.dtype(dtype) == X.dtype):
+            data = mmap_dataset(X)
+            if data is not None:
+                return hfarray(data, dims=dims, unit=unit,
+                               outputformat=outputformat, copy=False)
+        if lazy:
+            return LazyArray(X, dims, unit=unit, outputformat=outputformat,
+                             dtype=dtype)
         return hfarray(X.value, dims=dims, unit=unit,
                        dtype=dtype, outputformat=outputformat)
     else:
@@ -80,40 +176,115 @@ def cast_arrays_to_hdf5(data):
     return data
 
 
-def create_dataset(db, key, data, expandable=False):
+def create_dataset(db, key, data, expandable=False, chunks=None,
+                   compression=None, compression_opts=None, shuffle=False):
+    u"""Create dataset *key* in *db* from *data*.
+
+       *chunks* is a chunk shape or True for *default_chunks*. Expandable
+       or compressed datasets are always chunked. *compression*,
+       *compression_opts* and *shuffle* are passed to h5py, e.g.
+       compression="gzip" or "lzf".
+    """
     if "/" in key:
         raise Exception("/ illegal character for variable name in hdf5 file")
     data_dtype = data.dtype
+    expandaxis = None
+    if expandable:
+        expandaxis = 0 if data.ndim in (0, 1) else 1
+    if data.ndim == 0 or data.size == 0:
+        chunks = True if expandable and data.ndim else None
+        compression = compression_opts = None
+        shuffle = False
+    elif chunks is True or (chunks is None and (expandable or compression or
+                                                shuffle)):
+        chunks = default_chunks(data, expandaxis)
     data = cast_arrays_to_hdf5(data)
     if expandable:
-        if data.ndim in (0, 1):
-            maxshape = (None, )
-        else:
-            maxshape = list(data.shape)
-            maxshape[1] = None
-            maxshape = tuple(maxshape)
+        maxshape = list(data.shape)
+        maxshape[expandaxis] = None
+        maxshape = tuple(maxshape)
     else:
         maxshape = None
-    db.create_dataset(key, data=data, maxshape=maxshape)
+    db.create_dataset(key, data=data, maxshape=maxshape, chunks=chunks,
+                      compression=compression,
+                      compression_opts=compression_opts,
+                      shuffle=shuffle or None)
     db[key].attrs["dtype"] = data_dtype.str
 
 
-def read_hdf5_handle(filehandle, **kw):
+def create_grid_dataset(db, key, grid):
+    """Store LinearGrid *grid* with its values, so other readers get the
+    values, and its parameters as attributes, which *getdim* uses instead
+    of reading the values. The dimtype is saved as DimSweep, which older
+    readers know, and *getdim* makes a LinearDim from the attributes.
+    """
+    db.create_dataset(key, data=np.asarray(grid))
+    db[key].attrs["dtype"] = grid.dtype.str
+    db[key].attrs["grid"] = np.array([grid.start, grid.stop])
+    db[key].attrs["grid_index"] = np.array([grid.num, grid.offset,
+                                            grid.stride, grid.count])
+    db[key].attrs["grid_log"] = grid.log
+
+
+def read_hdf5_handle(filehandle, lazy=False, mmap=False, variables=None,
+                     where=None, **kw):
+    u"""Read DataBlock from open h5py File *filehandle*.
+
+       Only the variables named in *variables* are read, default all.
+       *where* maps dimension names to conditions, see *where_selection*,
+       e.g. where={"freq": (1e9, 5e9)}. The dimensions are read first and
+       only the matching part of the variables is read from the file.
+
+       If *lazy* is True dimensions are read, but variables become
+       *LazyArray* proxies that read from the file when used, so the file
+       must be kept open.
+
+       If *mmap* is True variables stored contiguously without conversion
+       are memory mapped read-only instead, other variables are read as
+       given by *lazy*.
+    """
     if isinstance(filehandle, h5py.File):
         db = DataBlock()
-        for k in filehandle:
-            uk = unescape_varname(k)
-            if "dimtype" not in filehandle[k].attrs:
-                db[uk] = getvar(filehandle, k)
+        dimcache = {}
+        selections = {}
+        for name, condition in (where or {}).items():
+            k = escape_varname(name)
+            if k not in filehandle:
+                raise KeyError("Dimension %r not in file" % name)
+            dataset = filehandle[k]
+            dim = getdim(dataset)
+            index = where_selection(dim, condition)
+            dimcache[dataset.name] = dim[index]
+            selections[dataset.name] = index
+        if variables is None:
+            keys = [k for k in filehandle
+                    if "dimtype" not in filehandle[k].attrs]
+        else:
+            keys = [escape_varname(x) for x in variables]
+            for k in keys:
+                if k not in filehandle:
+                    msg = "Variable %r not in file" % unescape_varname(k)
+                    raise KeyError(msg)
+        for k in keys:
+            db[unescape_varname(k)] = getvar(filehandle, k, lazy=lazy,
+                                             dimcache=dimcache, mmap=mmap,
+                                             selections=selections)
         db.comments = Comments()
         return db
     else:
         raise IOError("filehandle should be a h5py File, is: %r" % filehandle)
 
 
-def read_hdf5(h5file, name="datablock", **kw):
+def read_hdf5(h5file, name="datablock", lazy=False, **kw):
+    u"""Read DataBlock from *h5file*, see *read_hdf5_handle*. With *lazy*
+       a file given by name is kept open, close it with
+       *hftools.dataset.lazy.close_files* when done.
+    """
+    if lazy and not isinstance(h5file, h5py.File):
+        return read_hdf5_handle(h5py.File(h5file, mode="r"), name=name,
+                                lazy=lazy, **kw)
     with hdf5context(h5file) as fil:
-        d = read_hdf5_handle(fil, name=name, **kw)
+        d = read_hdf5_handle(fil, name=name, lazy=lazy, **kw)
     return d
 
 
@@ -123,14 +294,31 @@ else:  # if PY2
     h5py_string_dtype = h5py.special_dtype(vlen=unicode)
 
 
-def save_hdf5_handle(db, filehandle, expandable=False, expanddim=None, **kw):
+def save_hdf5_handle(db, filehandle, expandable=False, expanddim=None,
+                     chunks=None, compression=None, compression_opts=None,
+                     shuffle=False, **kw):
+    u"""Save DataBlock *db* in open h5py File *filehandle*.
+
+       If *expandable* is True variables get the extra dimension
+       *expanddim*, default DimRep("INDEX", 1), which *append_hdf5* can
+       grow.
+
+       *chunks* is True for *default_chunks*, a chunk shape, or a dict
+       with a chunk shape, or True, per variable name. *compression*,
+       *compression_opts* and *shuffle* are used for all variables, e.g.
+       compression="gzip", compression_opts=4, shuffle=True.
+    """
     if expanddim is None:
         expanddim = DimRep("INDEX", 1)
     filehandle.attrs["hftools file version"] = "0.2"
     for k, v in db.ivardata.items():
         ek = escape_varname(k)
-        create_dataset(filehandle, ek, v.data)
-        filehandle[ek].attrs["dimtype"] = v.__class__.__name__
+        if getattr(v, "grid", None) is not None:
+            create_grid_dataset(filehandle, ek, v.grid)
+            filehandle[ek].attrs["dimtype"] = "DimSweep"
+        else:
+            create_dataset(filehandle, ek, v.data)
+            filehandle[ek].attrs["dimtype"] = v.__class__.__name__
         if v.unit:
             filehandle[ek].attrs["unit"] = v.unit
         if v.outputformat:
@@ -140,6 +328,7 @@ def save_hdf5_handle(db, filehandle, expandable=False, expanddim=None, **kw):
         data = np.array(expanddim.data)
         filehandle.create_dataset(expanddim.name, data=data, maxshape=(None,))
         filehandle[expanddim.name].attrs["dtype"] = data.dtype.str
+        filehandle[expanddim.name].attrs["filled"] = len(data)
         expanddim_class = expanddim.__class__.__name__
         filehandle[expanddim.name].attrs["dimtype"] = expanddim_class
         if expanddim.unit:
@@ -156,7 +345,13 @@ def save_hdf5_handle(db, filehandle, expandable=False, expanddim=None, **kw):
             v = v.add_dim(expanddim, 1)
         else:
             pass
-        create_dataset(filehandle, ek, v, expandable=expandable)
+        if isinstance(chunks, dict):
+            varchunks = chunks.get(k, None)
+        else:
+            varchunks = chunks
+        create_dataset(filehandle, ek, v, expandable=expandable,
+                       chunks=varchunks, compression=compression,
+                       compression_opts=compression_opts, shuffle=shuffle)
         for idx, dv in enumerate(v.dims):
             filehandle[ek].dims.create_scale(filehandle[dv.name])
             filehandle[ek].dims[idx].attach_scale(filehandle[dv.name])
@@ -177,24 +372,151 @@ def save_hdf5(db, h5file, expandable=False, expanddim=None, **kw):
     return d
 
 
-def append_hdf5(db, filehandle, expanddim=None, **kw):
+def append_hdf5(db, filehandle, expanddim=None, growth=1, **kw):
+    u"""Append DataBlock *db*, or a list of DataBlocks, to file
+       *filehandle* saved with expandable=True.
+
+       All blocks are written with one resize and one write per variable.
+       By default the datasets are resized to exactly fit the entries.
+       With *growth* > 1 full datasets are instead resized to *growth*
+       times the number of entries, so a long series of appends only
+       resizes a few times. The number of valid entries is stored in the
+       "filled" attribute of *expanddim*. hftools readers ignore the
+       unused part, but other readers see it until the file is trimmed
+       with *trim_hdf5*. *hdf5context* does that when it closes a file
+       it opened, and so does *HDF5Appender.close*, otherwise call
+       *trim_hdf5* before closing the file.
+
+       Use *HDF5Appender* to collect many small blocks before writing.
+    """
     key = "hftools file version"
     if key not in filehandle.attrs or filehandle.attrs[key] != "0.2":
         raise Exception("Can only append to hftools version 0.2")
     if expanddim is None:
         expanddim = DimRep("INDEX", 1)
-    idx = filehandle[expanddim.name][-1] + 1
-    expand_dataset(filehandle[expanddim.name], 1, 0)
-    filehandle[expanddim.name].value[-1] = idx
-
-    for k, v in filehandle.items():
+    if isinstance(db, DataBlock):
+        blocks = [db]
+    else:
+        blocks = list(db)
+    if not blocks:
+        return
+    variables = []
+    for k in filehandle:
         uk = unescape_varname(k)
-        if uk in db.ivardata or uk == expanddim.name:
+        if uk in blocks[0].ivardata or uk == expanddim.name:
             continue
-        if uk not in db.vardata:
-            raise ValueError("Variable %r missing in db, can not append" % uk)
+        for block in blocks:
+            if uk not in block.vardata:
+                msg = "Variable %r missing in db, can not append" % uk
+                raise ValueError(msg)
+        variables.append((k, uk))
+
+    index = filehandle[expanddim.name]
+    n = int(index.attrs.get("filled", index.shape[0]))
+    count = len(blocks)
+    size = index.shape[0]
+    if n + count > size:
+        size = max(n + count, int(math.ceil(n * growth)))
+        index.resize(size, axis=0)
+    index[n:n + count] = index[n - 1] + 1 + np.arange(count)
+
+    for k, uk in variables:
         diskdata = filehandle[k]
         ax = diskdata.maxshape.index(None)
-        expand_dataset(diskdata, 1, ax)
-        s = (slice(None),) * ax + (diskdata.shape[ax] - 1,)
-        diskdata[s] = cast_arrays_to_hdf5(db[uk])
+        if diskdata.shape[ax] < size:
+            diskdata.resize(size, axis=ax)
+        data = [np.expand_dims(cast_arrays_to_hdf5(np.asarray(block[uk])),
+                               ax)
+                for block in blocks]
+        s = (slice(None),) * ax + (slice(n, n + count),)
+        diskdata[s] = np.concatenate(data, axis=ax)
+    filehandle.flush()
+    index.attrs["filled"] = n + count
+    filehandle.flush()
+
+
+class HDF5Appender(object):
+    u"""Collect DataBlocks and append them to the expandable hdf5 file
+       *filehandle* with *append_hdf5*, *buffersize* blocks at a time.
+
+       *append* also writes the blocks if the oldest one has waited more
+       than *flushinterval* seconds. This is only checked when *append*
+       is called, there is no timer, so call *flush* to write blocks
+       during a pause in the appends. The "filled" count of the file is updated
+       only after all data of a flush is written, so a file left by a
+       process that dies between flushes holds the blocks of the previous
+       flush. The datasets grow by *growth*, see *append_hdf5*, and are
+       trimmed by *close*. *filehandle* can also be a file name, the file
+       is then opened for appending and closed by *close*::
+
+           with HDF5Appender("log.hdf5", buffersize=500) as log:
+               for db in measurements():
+                   log.append(db)
+    """
+    def __init__(self, filehandle, expanddim=None, buffersize=100,
+                 flushinterval=None, growth=GROWTH):
+        if isinstance(filehandle, h5py.File):
+            self.filehandle = filehandle
+            self.owner = False
+        else:
+            self.filehandle = h5py.File(filehandle, mode="a")
+            self.owner = True
+        self.expanddim = expanddim
+        self.buffersize = buffersize
+        self.flushinterval = flushinterval
+        self.growth = growth
+        self.buffer = []
+        self.buffertime = None
+
+    def append(self, db):
+        u"""Add DataBlock *db*, flush if the buffer is full or old."""
+        if not self.buffer:
+            self.buffertime = time.time()
+        self.buffer.append(db)
+        if len(self.buffer) >= self.buffersize:
+            self.flush()
+        elif (self.flushinterval is not None and
+              time.time() - self.buffertime >= self.flushinterval):
+            self.flush()
+
+    def flush(self):
+        u"""Write all collected blocks to the file. If writing fails the
+           blocks stay in the buffer.
+        """
+        if self.buffer:
+            append_hdf5(self.buffer, self.filehandle,
+                        expanddim=self.expanddim, growth=self.growth)
+            self.buffer = []
+
+    def close(self):
+        u"""Flush and trim the file, and close it if it was opened here."""
+        self.flush()
+        trim_hdf5(self.filehandle)
+        if self.owner:
+            self.filehandle.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def trim_hdf5(filehandle):
+    u"""Shrink datasets over-allocated by *append_hdf5* to the number of
+       appended entries.
+    """
+    filled = {}
+    for k, v in filehandle.items():
+        if "filled" in v.attrs and v.shape[0] > v.attrs["filled"]:
+            filled[v.name] = int(v.attrs["filled"])
+    if not filled:
+        return
+    for k, v in filehandle.items():
+        if v.name in filled:
+            continue
+        for ax, x in enumerate(v.dims):
+            if len(x) and x[0].name in filled:
+                v.resize(filled[x[0].name], axis=ax)
+    for name, n in filled.items():
+        filehandle[name].resize(n, axis=0)
@@ -28,7 +28,7 @@ from hftools.dataset import DataBlock, DataDict, hfarray, DimSweep,\
 
 from hftools.utils import glob
 from hftools.file_formats.common import Comments,\
-    format_complex_header, format_elem
+    format_complex_header, format_elem, parse_numbers, find_end
 from hftools.file_formats.readbase import ManyOptional,\
     One, Token, ReadFileFormat, FileFormatError
 
@@ -47,6 +47,10 @@ reg = re.compile("(.+)[(](integer|real|string|complex)[)]")
 
 
 class GetData(object):
+    u"""Parser for the data of blocks with *header*. For numeric data the
+       column layout of the header is computed once, and each block is
+       parsed in one step with parse_text.
+    """
     def __init__(self, header):
         self.header = header
         self.parse_stream = []
@@ -54,10 +58,77 @@ class GetData(object):
             self.parse_stream.append([])
             for head in headline:
                 self.parse_stream[-1].append(self.parse_header(head))
+        self.make_layout()
 
     def sweep_name(self):
         return self.parse_stream[0][0][1]
 
+    def make_layout(self):
+        u"""Compute *ncols*, number of values in a record, and *variables*,
+           list of (name, offsets, complex mask, integer flag, shape) with
+           matrices and vectors in place of their first element.
+        """
+        heads = sum(self.header, [])
+        types = [reg.match(head).group(2) for head in heads]
+        widths = [2 if vtype == "complex" else 1 for vtype in types]
+        offsets = np.cumsum([0] + widths[:-1])
+        self.numeric = "string" not in types
+        self.ncols = sum(widths)
+        matrices, vectors, _ = match_matrix_names(heads)
+        groups = {}
+        for name, value in matrices.items():
+            elems = sorted((i, j, offset) for offset, i, j, _ in value)
+            I, J = set(x[0] for x in elems), set(x[1] for x in elems)
+            groups[elems[0][2]] = (name, [x[2] for x in elems],
+                                   (len(I), len(J)))
+        for name, value in vectors.items():
+            elems = sorted((i, offset) for offset, i, _ in value)
+            groups[elems[0][1]] = (name, [x[1] for x in elems],
+                                   (len(elems),))
+        grouped = set()
+        for name, offs, shape in groups.values():
+            grouped.update(offs)
+        self.variables = []
+        for (_, varname), offset in zip(sum(self.parse_stream, [])[1:],
+                                        offsets[1:]):
+            if offset in groups:
+                name, offs, shape = groups[offset]
+            elif offset in grouped:
+                continue
+            else:
+                name, offs, shape = varname, [offset], ()
+            idx = [list(offsets).index(x) for x in offs]
+            cplx = np.array([types[x] == "complex" for x in idx])
+            integer = all(types[x] == "integer" for x in idx)
+            self.variables.append((name, np.array(offs), cplx, integer,
+                                   shape))
+
+    def parse_text(self, text):
+        u"""Return DataDict with sweep values and variables, matrices as
+           arrays with the matrix indices last, from the data lines in
+           *text*. Returns None if the data can not be parsed in bulk.
+        """
+        if not self.numeric:
+            return None
+        try:
+            values = parse_numbers(text)
+        except ValueError:
+            return None
+        if not len(values) or len(values) % self.ncols:
+            return None
+        values = values.reshape(-1, self.ncols)
+        vardata = DataDict()
+        vardata[self.sweep_name()] = values[:, 0]
+        for name, offs, cplx, integer, shape in self.variables:
+            x = values[:, offs]
+            if cplx.any():
+                x = x.astype(np.complex128)
+                x[:, cplx] += 1j * values[:, offs[cplx] + 1]
+            elif integer:
+                x = x.astype(int)
+            vardata[name] = x.reshape(x.shape[:1] + shape)
+        return vardata
+
     def parse_data(self, datastream):
         vardata = DataDict()
         while True:
@@ -111,6 +182,7 @@ class ReadMDIFFileFormat(ReadFileFormat):
         """
         """
         ReadFileFormat.__init__(self, *k, **kw)
+        self.layouts = {}
 
     @classmethod
     def read_file(cls, filename, make_complex=True, property_to_vars=True,
@@ -171,12 +243,19 @@ class ReadMDIFFileFormat(ReadFileFormat):
                     (tag, line) where tag is one of
                     "Comment", "Header", and "Data"
         """
-        for idx, line in enumerate(stream):
-            lineno = idx + 1
+        text = stream.read()
+        pos = 0
+        lineno = 0
+        while pos < len(text):
+            end = text.find("\n", pos)
+            if end < 0:
+                end = len(text)
+            line = text[pos:end].lstrip()
+            lineno += 1
             if self.verbose:
                 print("\r               \r", lineno, end="")
-            line = line.lstrip()
             if not line:
+                pos = end + 1
                 continue
             elif line[:1] == "!":
                 yield Token("COMMENT", lineno, line[1:].strip())
@@ -190,8 +269,13 @@ class ReadMDIFFileFormat(ReadFileFormat):
                 yield Token("END", lineno, line[4:])
             elif line.startswith("VAR"):
                 yield Token("VAR", lineno, line[4:])
-            else:
-                yield Token("DATA", lineno, line)
+            else:  # all lines up to END are data
+                end = find_end(text, pos, "END")
+                yield Token("DATA", lineno, text[pos:end])
+                lineno += text.count("\n", pos, end) - 1
+                pos = end
+                continue
+            pos = end + 1
 
     def group_blocks(self, stream):
         """Bunch tagged stream into sub blocks. Each sub block
@@ -206,21 +290,29 @@ class ReadMDIFFileFormat(ReadFileFormat):
             blockname = One("BEGIN", "Must have Begin after VARs")(stream)
             attribs = ManyOptional("ATTRIB", split_eq)(stream)
             header = ManyOptional("HEADER", lambda rad: rad.split())(stream)
-            data = ManyOptional("DATA")(stream)
-            out = (comments, var, blockname, header, attribs, data)
+            token = next(stream)
+            stream.push(token)
+            data = "".join(ManyOptional("DATA")(stream))
+            out = (comments, var, blockname, header, attribs, data,
+                   token.lineno)
             One("END", "Must have END after DATA")(stream)
             yield out
 
     def parse_blocks(self, stream):
-        for comments, vars, blockname, header, attribs, data in stream:
+        for comments, vars, blockname, header, attribs, data, lineno in stream:
             db = DataBlock()
             db.blockname = blockname = blockname[0]
             #self.header = header = header[0]
             db.comments = Comments(comments)
             #data = numpy.array(data)
-            dd = self.proc_data(header, data[:])
+            dd, matrices = self.proc_data(header, data, lineno)
             for vname in dd:
-                db[vname] = dd[vname]
+                if dd[vname].ndim > 1:  # as make_matrices, only the sweep
+                    fi = dd[vname].dims[0]
+                    db[fi.name] = fi
+                    db.vardata[vname] = dd[vname]
+                else:
+                    db[vname] = dd[vname]
             for var in vars:
                 vi = self.proc_var(var)
                 db[vi.name] = vi
@@ -228,7 +320,8 @@ class ReadMDIFFileFormat(ReadFileFormat):
                 name, value = self.proc_attrib(var)
                 db[name] = value
 
-            self.make_matrices(db, sum(header, []))
+            if not matrices:
+                self.make_matrices(db, sum(header, []))
             yield db
 
     def proc_attrib(self, var):
@@ -256,9 +349,34 @@ class ReadMDIFFileFormat(ReadFileFormat):
         i = DimPartial(varname, np.array([value]))
         return i
 
-    def proc_data(self, header, data):
-        processor = GetData(header)
-        vardata = processor.parse_data(data)
+    def get_data_parser(self, header):
+        u"""Return GetData for *header*, shared by all blocks with the same
+           header.
+        """
+        key = tuple(tuple(x) for x in header)
+        if key not in self.layouts:
+            self.layouts[key] = GetData(header)
+        return self.layouts[key]
+
+    def proc_data(self, header, data, lineno=1):
+        u"""Return DataDict of the variables in *data*, the text of the data
+           lines of a block starting at line *lineno*, and True if matrices
+           and vectors are already combined.
+        """
+        processor = self.get_data_parser(header)
+        vardata = processor.parse_text(data)
+        matrices = vardata is not None
+        if not matrices:
+            numbered = [(idx, x.lstrip())
+                        for idx, x in enumerate(data.splitlines())
+                        if x.strip()]
+            lines = [x for idx, x in numbered]
+            try:
+                vardata = processor.parse_data(lines)
+            except (ValueError, IndexError) as exc:
+                idx, line = numbered[max(len(numbered) - len(lines) - 1, 0)]
+                msg = "Invalid data on line %d, %r: %s"
+                raise MDIFError(msg % (lineno + idx, line, exc))
 
         oldsweepname = processor.sweep_name()
         sweepname = processor.sweep_name()
@@ -268,8 +386,14 @@ class ReadMDIFFileFormat(ReadFileFormat):
         fi = DimSweep(sweepname, vardata[oldsweepname])
         del vardata[oldsweepname]
         for vname in vardata:
-            vardata[vname] = hfarray(vardata[vname], (fi,))
-        return vardata
+            ndim = np.ndim(vardata[vname])
+            if ndim == 3:
+                vardata[vname] = make_matrix(vardata[vname], (fi,))
+            elif ndim == 2:
+                vardata[vname] = make_vector(vardata[vname], (fi,))
+            else:
+                vardata[vname] = hfarray(vardata[vname], (fi,))
+        return vardata, matrices
 
     def make_matrices(self, db, header):
         matrices, vectors, scalars = match_matrix_names(header)
@@ -325,16 +449,30 @@ class ReadMDIFFileFormat(ReadFileFormat):
 
 
 def simple_merge_blocks(blocks):
+    u"""Merge *blocks* along a new INDEX dimension, placed after the first
+       dimension of each variable. Each variable is written into one
+       preallocated array.
+    """
     if len(blocks) == 1:
         return blocks[0]
     ri = DimRep("INDEX", len(blocks))
     out = DataBlock()
-    #import pdb;pdb.set_trace()
+    out[ri.name] = ri
     for k in blocks[0].vardata:
-        out[k] = hfarray([b[k] for b in blocks],
-                         dims=(ri,) + blocks[0][k].dims)
-        if blocks[0][k].dims:
-            out[k] = out[k].reorder_dimensions(blocks[0][k].dims[0])
+        first = blocks[0][k]
+        dtype = first.dtype
+        for b in blocks[1:]:
+            dtype = np.promote_types(dtype, b[k].dtype)
+        data = np.empty(first.shape[:1] + (len(blocks),) + first.shape[1:],
+                        dtype=dtype)
+        if first.dims:
+            dest = np.rollaxis(data, 1)
+        else:
+            dest = data
+        for idx, b in enumerate(blocks):
+            dest[idx] = b[k]
+        out[k] = hfarray(data, dims=first.dims[:1] + (ri,) + first.dims[1:],
+                         copy=False)
     for k in blocks[0].ivardata:
         if isinstance(blocks[0].ivardata[k], DimPartial):
             out[k] = hfarray([b.ivardata[k].data[0] for b in blocks],
@@ -0,0 +1,158 @@
+# -*- coding: ISO-8859-1 -*-
+#-----------------------------------------------------------------------------
+# Copyright (c) 2014, HFTools Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+u"""
+npy directory format
+====================
+
+A DataBlock stored as a directory with one .npy file per variable and
+dimension, and a JSON sidecar, datablock.json, with names, dimensions,
+units and comments. Variables can be opened memory mapped, so opening is
+instant and the data is shared through the page cache between processes
+reading the same files.
+
+    .. autofunction:: read_npydir
+    .. autofunction:: save_npydir
+"""
+import json
+import os
+
+import numpy as np
+
+from hftools.dataset import DataBlock, DimRep, DimSweep, DimMatrix_i,\
+    DimMatrix_j, DimPartial, LinearDim, hfarray
+from hftools.dataset.dim import LinearGrid
+from hftools.core.exceptions import HFToolsIOError
+from hftools.file_formats.common import Comments
+
+version = "0.1"
+sidecar_name = "datablock.json"
+
+dimrep = {"DimRep": DimRep,
+          "DimSweep": DimSweep,
+          "DimMatrix_i": DimMatrix_i,
+          "DimMatrix_j": DimMatrix_j,
+          "DimPartial": DimPartial,
+          "LinearDim": LinearDim,
+          }
+
+
+def is_npydir(filename, rad=None):
+    u"""Return True if *filename* is a directory in npy directory format.
+    """
+    return os.path.isfile(os.path.join(filename, sidecar_name))
+
+
+def _save_array(dirname, item, data):
+    np.save(os.path.join(dirname, item["file"]), data)
+    if data.dtype.hasobject:
+        item["pickled"] = True
+
+
+def _load_array(dirname, item, mmap_mode, allow_pickle):
+    filename = os.path.join(dirname, item["file"])
+    if not item.get("pickled"):
+        return np.load(filename, mmap_mode=mmap_mode)
+    if not allow_pickle:
+        msg = ("%r holds Python objects, reading it needs allow_pickle=True"
+               % filename)
+        raise HFToolsIOError(msg)
+    try:
+        return np.load(filename, allow_pickle=True)
+    except TypeError:  # numpy < 1.10 has no allow_pickle and allows pickles
+        return np.load(filename)
+
+
+def _read_sidecar(dirname):
+    with open(os.path.join(dirname, sidecar_name)) as fil:
+        return json.load(fil)
+
+
+def save_npydir(db, dirname):
+    u"""Save DataBlock *db* in directory *dirname*, created if missing.
+       Files of an earlier DataBlock saved in *dirname* that are not
+       overwritten are removed.
+    """
+    if not os.path.isdir(dirname):
+        os.makedirs(dirname)
+    oldfiles = set()
+    if is_npydir(dirname):
+        old = _read_sidecar(dirname)
+        oldfiles = set(item["file"] for item in old["dims"] + old["vars"]
+                       if "file" in item)
+    meta = {"hftools npydir version": version,
+            "blockname": db.blockname,
+            "comments": db.comments.fullcomments if db.comments else [],
+            "dims": [],
+            "vars": []}
+    for idx, dim in enumerate(db.ivardata.values()):
+        item = dict(name=dim.name, dimtype=dim.__class__.__name__,
+                    unit=dim.unit, outputformat=dim._outputformat)
+        grid = getattr(dim, "grid", None)
+        if grid is not None:
+            item["grid"] = [grid.start, grid.stop, grid.num, grid.log,
+                            grid.offset, grid.stride, grid.count]
+        else:
+            item["file"] = "dim_%d.npy" % idx
+            _save_array(dirname, item, dim.data)
+        meta["dims"].append(item)
+    for idx, (name, v) in enumerate(db.vardata.items()):
+        item = dict(name=name, file="var_%d.npy" % idx,
+                    dims=[dim.name for dim in v.dims],
+                    unit=v.unit, outputformat=v.__dict__.get("_outputformat"))
+        _save_array(dirname, item, np.asarray(v))
+        meta["vars"].append(item)
+    with open(os.path.join(dirname, sidecar_name), "w") as fil:
+        json.dump(meta, fil, indent=1)
+    newfiles = set(item["file"] for item in meta["dims"] + meta["vars"]
+                   if "file" in item)
+    for name in oldfiles - newfiles:
+        filename = os.path.join(dirname, name)
+        if os.path.isfile(filename):
+            os.remove(filename)
+
+
+def read_npydir(dirname, mmap_mode="r", allow_pickle=False, verbose=False):
+    u"""Read DataBlock from directory *dirname*. Variables are opened with
+       np.load using *mmap_mode*, the default "r" maps them read-only,
+       None reads them into memory.
+
+       Arrays of Python objects are stored pickled. They are read into
+       memory, and only if *allow_pickle* is True, since unpickling can
+       run arbitrary code. *verbose* is accepted, like for the other
+       readers, but not used.
+    """
+    if not is_npydir(dirname):
+        msg = "%r is not a DataBlock in npy directory format" % dirname
+        raise HFToolsIOError(msg)
+    meta = _read_sidecar(dirname)
+    dims = {}
+    for item in meta["dims"]:
+        if "grid" in item:
+            start, stop, num, log, offset, stride, count = item["grid"]
+            data = LinearGrid(start, stop, num, log=log, offset=offset,
+                              stride=stride, count=count)
+        else:
+            data = _load_array(dirname, item, None, allow_pickle)
+        dims[item["name"]] = dimrep[item["dimtype"]](
+            item["name"], data, unit=item["unit"],
+            outputformat=item["outputformat"])
+    db = DataBlock()
+    db.blockname = meta["blockname"]
+    db.comments = Comments(meta["comments"])
+    for item in meta["vars"]:
+        data = _load_array(dirname, item, mmap_mode, allow_pickle)
+        db[item["name"]] = hfarray(data,
+                                   dims=[dims[x] for x in item["dims"]],
+                                   unit=item["unit"],
+                                   outputformat=item["outputformat"],
+                                   copy=False)
+    for name, dim in dims.items():
+        if name not in db.ivardata:
+            db[name] = dim
+    return db
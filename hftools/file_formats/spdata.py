@@ -24,11 +24,11 @@ from hftools.dataset import DataDict, DataBlock,  DimSweep, DimRep,\
     DimPartial, hfarray
 from hftools.core.exceptions import HFToolsIOError
 from hftools.file_formats.common import Comments, db_iterator,\
-    make_col_from_matrix, format_complex_header, format_elem
+    make_col_from_matrix, format_complex_header, format_elem, parse_numbers
 from hftools.file_formats.readbase import ReadFileFormat
 from hftools.file_formats.readbase import Token
 from hftools.utils import to_numeric
-from hftools.py3compat import string_types
+from hftools.py3compat import string_types, integer_types
 
 class SPDataIOError(HFToolsIOError):
     pass
@@ -50,6 +50,45 @@ def match_numunit(x):
 reg_header = re.compile("^[A-Za-z_]")
 
 
+def parse_columns(lines, ncols):
+    u"""Return list of the *ncols* tab separated columns of the data
+       *lines*. Numeric data is parsed in one step to a float array, only
+       columns with other values, e.g. dates, are parsed element by element
+       with to_numeric. Columns with integers on the first line are
+       returned as integer arrays if all values are integers.
+    """
+    text = u"\n".join(lines)
+    try:
+        values = parse_numbers(text)
+    except ValueError:
+        values = None
+    if (values is not None and len(values) == len(lines) * ncols and
+            all([x.count(u"\t") == ncols - 1 for x in lines])):
+        values = values.reshape(len(lines), ncols)
+        columns = [values[:, idx] for idx in range(ncols)]
+    else:
+        rows = [x.split("\t") for x in lines]
+        if any(len(x) != ncols for x in rows):
+            msg = "Different number of header variables from data columns"
+            raise SPDataIOError(msg)
+        columns = []
+        for column in zip(*rows):
+            try:
+                values = parse_numbers(u" ".join(column))
+            except ValueError:
+                values = None
+            if values is None or len(values) != len(column):
+                values = np.array([to_numeric(x, False) for x in column])
+            columns.append(values)
+    for idx, field in enumerate(lines[0].split("\t")):
+        column = columns[idx]
+        if (column.dtype == np.float64 and
+                isinstance(to_numeric(field, False), integer_types) and
+                (column == np.round(column)).all()):
+            columns[idx] = column.astype(int)
+    return columns
+
+
 class ReadSPFileFormat(ReadFileFormat):
     def tokenize(self, stream):
         """Split stream of lines in sp-data format into
@@ -104,7 +143,7 @@ class ReadSPFileFormat(ReadFileFormat):
             else:
                 raise SPDataIOError("Missing header")
             while running and (token == "Data"):
-                data.append([to_numeric(x, False) for x in rad.split("\t")])
+                data.append(rad)
                 try:
                     token, lineno, rad = next(stream)
                 except StopIteration:
@@ -117,13 +156,12 @@ class ReadSPFileFormat(ReadFileFormat):
             db.comments = Comments(comments)
             header = [x.strip() for x in header[0].strip().split("\t")]
             Nhead = len(header)
-            #data = np.array(data)
-            if Nhead != len(data[0]):
+            if Nhead != len(data[0].split("\t")):
                 msg = "Different number of header variables "\
                       "from data columns"
                 raise SPDataIOError(msg)
             output = DataDict()
-            for varname, column in zip(header, zip(*data)):
+            for varname, column in zip(header, parse_columns(data, Nhead)):
                 output.setdefault(varname.strip(), []).append(column)
             for varname in output:
                 data = output[varname]
@@ -5,8 +5,11 @@
 #
 # The full license is in the file COPYING.txt, distributed with this software.
 #-----------------------------------------------------------------------------
+import numpy as np
+
 import hftools.file_formats
 import hftools.file_formats.tests.base_test as base_test
+from hftools.dataset import DimSweep, LinearDim
 from hftools.file_formats.common import Comments
 from hftools import path
 from hftools.testing import TestCase
@@ -96,6 +99,18 @@ class TestCiti_Save(TestCase):
         self.assertAllclose(abs(d.Gamma), e.mGamma)
         fname.unlink()
 
+    def test_save_seg(self):
+        d = hftools.file_formats.read_citi(testpath /
+                                           "testdata/citi/seg_sweep.citi")
+        fname = testpath / "testdata/citi/savetest/seg_sweep.citi"
+        hftools.file_formats.save_citi(d, fname)
+        with open(fname) as fil:
+            self.assertIn("SEG_LIST_BEGIN\n", fil.read())
+        e = hftools.file_formats.read_citi(fname)
+        self.assertEqual(d.ivardata["FREQ"], e.ivardata["FREQ"])
+        self.assertAllclose(d["S[2,2]"], e["S[2,2]"])
+        fname.unlink()
+
 
 class TestCiti_Comment_2(base_test.Test_Comment_2):
     readfun = [hftools.file_formats.read_citi]
@@ -116,12 +131,47 @@ class TestCiti_bad(TestCase):
                           hftools.file_formats.read_citi, filename)
 
 
+class TestCiti_handle_data(TestCase):
+    def test_ri(self):
+        handle_data = hftools.file_formats.citi.handle_data
+        res = handle_data("1,2\n  -3e-1,4\n\n5, 6\n", "RI")
+        self.assertAllclose(res, [1 + 2j, -0.3 + 4j, 5 + 6j])
+
+    def test_magangle(self):
+        handle_data = hftools.file_formats.citi.handle_data
+        res = handle_data("1,0\n2,90\n1,180\n", "MAGANGLE")
+        self.assertAllclose(res, [1, 2j, -1])
+
+    def test_mag(self):
+        handle_data = hftools.file_formats.citi.handle_data
+        self.assertAllclose(handle_data("1\n2.5\n", "MAG"), [1, 2.5])
+        self.assertEqual(handle_data(None, "MAG").shape, (0,))
+
+    def test_errors(self):
+        handle_data = hftools.file_formats.citi.handle_data
+        CITIFileError = hftools.file_formats.CITIFileError
+        self.assertRaises(CITIFileError, handle_data, "1,2\n", "DB")
+        self.assertRaises(CITIFileError, handle_data, "1,2\n", "MAG")
+        self.assertRaises(CITIFileError, handle_data, "1,2,3\n", "RI")
+        self.assertRaises(CITIFileError, handle_data, "1,2\n3\n", "RI")
+        self.assertRaises(CITIFileError, handle_data, "1,x\n", "RI")
+
+
 class TestCiti_seg(TestCase):
     def test1(self):
         filename = testpath / "testdata/citi/dd_test_seg.citi"
         d = hftools.file_formats.read_citi(filename)
         self.assertEqual(d.S.ndim, 3)
 
+    def test_lineardim(self):
+        filename = testpath / "testdata/citi/seg_sweep.citi"
+        d = hftools.file_formats.read_citi(filename)
+        freq = d.ivardata["FREQ"]
+        self.assertIsInstance(freq, LinearDim)
+        self.assertIsNotNone(freq.grid)
+        self.assertEqual(freq, DimSweep("FREQ", np.linspace(1e9, 21e9, 101),
+                                        unit="Hz"))
+
 
 """
 class TestCiti_2(TestCiti_1):
@@ -7,6 +7,8 @@
 #-----------------------------------------------------------------------------
 import h5py
 
+import numpy as np
+
 import hftools
 import hftools.file_formats.hdf5 as hdf5
 from hftools import path
@@ -64,6 +66,34 @@ class Test_hdf5_specific(TestCase):
         fname.unlink()
 
 
+class Test_hdf5_where(TestCase):
+    def setUp(self):
+        self.fi = DimSweep("freq", [1e9, 2e9, 3e9, 4e9], unit="Hz")
+        self.gi = DimSweep("g", 2)
+        db = DataBlock()
+        db.a = hfarray(np.arange(8.).reshape(4, 2), dims=(self.fi, self.gi))
+        db.b = hfarray([1, 2, 3, 4], dims=(self.fi,))
+        self.fname = testpath / "testdata/hdf5/v01/slask_where.hdf5"
+        savefun(db, self.fname)
+
+    def tearDown(self):
+        self.fname.unlink()
+
+    def test_where(self):
+        db = readfun(self.fname, where={"freq": (2e9, 3e9)})
+        self.assertAllclose(db.a, [[2, 3], [4, 5]])
+        self.assertEqual(db.a.dims, (self.fi[1:3], self.gi))
+
+    def test_variables(self):
+        db = readfun(self.fname, variables=["b"], where={"freq": [1e9, 4e9]})
+        self.assertEqual(list(db.vardata), ["b"])
+        self.assertAllclose(db.b, [1, 4])
+
+    def test_missing(self):
+        self.assertRaises(KeyError, readfun, self.fname, variables=["x"])
+        self.assertRaises(KeyError, readfun, self.fname, where={"x": 1})
+
+
 # There is no point to make tests based on Test_2 and Test_3 as they are
 # dB/arg, mag/arg
 
@@ -15,12 +15,15 @@ import hftools.file_formats.hdf5 as hdf5
 from hftools import path
 from hftools.testing import TestCase
 import hftools.file_formats.tests.base_test as base_test
-from hftools.dataset import DataBlock, hfarray, DimSweep, DimRep
+from hftools.dataset import DataBlock, hfarray, DimSweep, DimRep, LinearDim,\
+    LazyArray, DimMatrix_i, DimMatrix_j
+from hftools.dataset.lazy import close_files
 from hftools.file_formats.common import Comments
 
 from hftools.file_formats.hdf5.v_01 import save_hdf5 as save_hdf5_v01
 from hftools.file_formats.hdf5.v_02 import append_hdf5
 from hftools.file_formats.hdf5.helper import hdf5context
+import hftools.file_formats.hdf5.helper as helper
 testpath = path(__file__).dirname()
 
 
@@ -53,6 +56,177 @@ class Test_hdf5_main_data_1b(Test_hdf5_data_1b):
     readfun = [hdf5.read_hdf5]
 
 
+class Test_hdf5_lazy_data_1(Test_hdf5_data_1):
+    readpars = dict(verbose=False, lazy=True)
+
+
+class Test_hdf5_main_lazy_data_1(Test_hdf5_lazy_data_1):
+    readfun = [hdf5.read_hdf5]
+
+
+class Test_hdf5_lazy(TestCase):
+    def setUp(self):
+        self.fi = DimSweep("freq", [1e9, 2e9, 3e9], unit="Hz")
+        self.gi = DimRep("g", 2)
+        self.fname = testpath / "testdata/hdf5/v02/slask_lazy.hdf5"
+        db = DataBlock()
+        db.a = hfarray(np.arange(6.).reshape(3, 2), dims=(self.fi, self.gi),
+                       unit="V")
+        db.b = hfarray([1, 2, 3], dims=(self.fi,))
+        savefun(db, self.fname)
+        self.db = readfun(self.fname, lazy=True)
+
+    def tearDown(self):
+        close_files(self.db)
+        del self.db
+        self.fname.unlink()
+
+    def test_proxy(self):
+        self.assertIsInstance(self.db.a, LazyArray)
+        self.assertEqual(self.db.a.shape, (3, 2))
+        self.assertEqual(self.db.a.unit, "V")
+        self.assertEqual(self.db.ivardata["freq"], self.fi)
+
+    def test_slice(self):
+        x = self.db.a[1:, 0]
+        self.assertIsInstance(x, hfarray)
+        self.assertAllclose(x, [2, 4])
+        self.assertEqual(x.dims, (self.fi[1:],))
+        self.assertEqual(self.db.a[2, 1], 5)
+        self.assertFalse(self.db.a.materialized)
+
+    def test_arithmetic(self):
+        x = self.db.b * 2
+        self.assertAllclose(x, [2, 4, 6])
+        self.assertEqual(x.dims, (self.fi,))
+        self.assertTrue(self.db.b.materialized)
+        self.assertFalse(self.db.a.materialized)
+
+    def test_rename(self):
+        self.db.rename("freq", "f")
+        self.assertEqual(self.db.a.dims[0].name, "f")
+        self.assertEqual(self.db.a[:1].dims[0].name, "f")
+
+    def test_report(self):
+        self.assertIn("<3x2>", repr(self.db))
+        self.assertFalse(self.db.a.materialized)
+
+    def test_lazy_operands(self):
+        x = self.db.b + self.db.b
+        self.assertIsInstance(x, hfarray)
+        self.assertAllclose(x, [2, 4, 6])
+        self.assertEqual(x.dims, (self.fi,))
+
+    def test_ufunc(self):
+        x = np.exp(self.db.a)
+        self.assertIsInstance(x, hfarray)
+        self.assertAllclose(x, np.exp(np.arange(6.).reshape(3, 2)))
+        self.assertEqual(x.dims, (self.fi, self.gi))
+
+    def test_filter(self):
+        res = self.db.filter(hfarray(self.fi) >= 2e9)
+        self.assertIsInstance(res.a, hfarray)
+        self.assertAllclose(res.a, [[2, 3], [4, 5]])
+        self.assertEqual(res.a.dims, (self.fi[1:], self.gi))
+        self.assertFalse(self.db.a.materialized)
+        res = self.db.filter(hfarray(self.fi) != 2e9)
+        self.assertAllclose(res.b, [1, 3])
+
+    def test_sort(self):
+        res = self.db.sort(hfarray([3, 1, 2], dims=(self.fi,)))
+        self.assertAllclose(res.b, [2, 3, 1])
+        self.assertAllclose(res.a, [[2, 3], [4, 5], [0, 1]])
+
+    def test_remove_rep(self):
+        res = self.db.remove_rep()
+        self.assertAllclose(res.a, np.arange(6.).reshape(3, 2))
+        self.assertEqual(res.a.dims[1].name, "AllReps")
+
+    def test_close(self):
+        self.db.b.materialize()
+        close_files(self.db)
+        self.assertAllclose(self.db.b, [1, 2, 3])
+        self.assertRaises(Exception, self.db.a.materialize)
+
+
+class Test_hdf5_mmap(TestCase):
+    def setUp(self):
+        self.fi = DimSweep("freq", [1e9, 2e9, 3e9], unit="Hz")
+        self.fname = testpath / "testdata/hdf5/v02/slask_mmap.hdf5"
+        db = DataBlock()
+        db.a = hfarray([1., 2., 3.], dims=(self.fi,), unit="V")
+        db.date = hfarray(["2012-08-13 08:03:01"] * 3, dims=(self.fi,),
+                          dtype="datetime64[us]")
+        savefun(db, self.fname)
+        self.date = db.date
+        self.db = readfun(self.fname, mmap=True)
+
+    def tearDown(self):
+        del self.db
+        self.fname.unlink()
+
+    def test_mapped(self):
+        self.assertAllclose(self.db.a, [1, 2, 3])
+        self.assertEqual(self.db.a.unit, "V")
+        self.assertEqual(self.db.a.dims, (self.fi,))
+        self.assertFalse(self.db.a.flags.writeable)
+
+    def test_fallback(self):
+        self.assertEqual(self.db.date.dtype, np.dtype("datetime64[us]"))
+        self.assertEqual(str(self.db.date), str(self.date))
+
+
+class Test_hdf5_where(TestCase):
+    def setUp(self):
+        self.fi = DimSweep("freq", [1e9, 2e9, 3e9, 4e9], unit="Hz")
+        self.gi = DimRep("g", 3)
+        self.fname = testpath / "testdata/hdf5/v02/slask_where.hdf5"
+        db = DataBlock()
+        db.a = hfarray(np.arange(12.).reshape(4, 3), dims=(self.fi, self.gi))
+        db.b = hfarray([1, 2, 3, 4], dims=(self.fi,))
+        db.c = hfarray(5)
+        savefun(db, self.fname)
+
+    def tearDown(self):
+        self.fname.unlink()
+
+    def test_range(self):
+        db = readfun(self.fname, where={"freq": (2e9, None)})
+        self.assertAllclose(db.a, [[3, 4, 5], [6, 7, 8], [9, 10, 11]])
+        self.assertEqual(db.a.dims, (self.fi[1:], self.gi))
+        self.assertAllclose(db.b, [2, 3, 4])
+        self.assertEqual(db.c, 5)
+
+    def test_values(self):
+        db = readfun(self.fname, where={"freq": [1e9, 3e9], "g": 2})
+        self.assertAllclose(db.a, [[2], [8]])
+        self.assertAllclose(db.ivardata["freq"].data, [1e9, 3e9])
+        self.assertEqual(db.ivardata["freq"].unit, "Hz")
+
+    def test_callable(self):
+        db = readfun(self.fname, where={"freq": lambda x: x > 3.5e9})
+        self.assertAllclose(db.b, [4])
+
+    def test_empty(self):
+        db = readfun(self.fname, where={"freq": (5e9, 6e9)})
+        self.assertEqual(db.a.shape, (0, 3))
+
+    def test_variables(self):
+        db = hdf5.read_hdf5(self.fname, variables=["b"],
+                            where={"freq": (1.5e9, 2.5e9)})
+        self.assertEqual(list(db.vardata), ["b"])
+        self.assertAllclose(db.b, [2])
+
+    def test_missing(self):
+        self.assertRaises(KeyError, readfun, self.fname, variables=["x"])
+        self.assertRaises(KeyError, readfun, self.fname, where={"x": 1})
+
+    def test_selection(self):
+        dim = DimSweep("freq", [1., 2., 3., 4.])
+        self.assertEqual(helper.where_selection(dim, (2, 3)), slice(1, 3))
+        self.assertAllclose(helper.where_selection(dim, [1, 4]), [0, 3])
+
+
 class Test_hdf5_specific(TestCase):
     def test_both(self):
         d1 = readfun(testpath / "testdata/hdf5/v02/test1.hdf5")
@@ -243,6 +417,25 @@ class Test_hdf5_data_save(TestCase):
         self.assertEqual(d2.c, u"kalle")
         fname.unlink()
 
+    def test_lineardim(self):
+        fi = LinearDim("freq", start=1e9, stop=2e9, count=1001, unit="Hz")
+        d = DataBlock()
+        d.b = hfarray(np.arange(1001.), dims=(fi,))
+        d.c = hfarray(np.arange(500.), dims=(fi[100:600],))
+        fname = testpath / "testdata/hdf5/v02/savetest/res_12.hdf5"
+        self.savefun[0](d, fname)
+        with h5py.File(fname, "r") as fil:
+            self.assertAllclose(fil["freq"][...], fi.data)
+            self.assertEqual(fil["freq"].attrs["dimtype"], "DimSweep")
+        d2 = readfun(fname)
+        self.assertIsInstance(d2.ivardata["freq"], LinearDim)
+        self.assertIsNotNone(d2.ivardata["freq"].grid)
+        self.assertEqual(d2.ivardata["freq"], fi)
+        self.assertEqual(d2.ivardata["freq"].unit, "Hz")
+        self.assertAllclose(d2.b, d.b)
+        self.assertAllclose(d2.c, d.c)
+        fname.unlink()
+
 
 class Test_hdf5_main_data_save(Test_hdf5_data_save):
     savefun = [lambda d, x: hdf5.save_hdf5(d, x, version="0.2")]
@@ -317,6 +510,169 @@ class Test_hdf5_data_expandable(TestCase):
             self.assertRaises(ValueError, append_hdf5, d2, fil)
         fname.unlink()
 
+    def test_growth(self):
+        fi = DimSweep("freq", 3)
+        d1 = DataBlock()
+        d1.b = hfarray([1, 2, 3], dims=(fi,))
+        fname = testpath / "testdata/hdf5/v02/savetest/res_1.hdf5"
+        with hdf5context(fname, mode="w") as fil:
+            savefun(d1, fil, expandable=True)
+            for i in range(9):
+                d2 = DataBlock()
+                d2.b = d1.b * (i + 2)
+                append_hdf5(d2, fil, growth=2)
+            self.assertEqual(fil["b"].shape, (3, 16))
+            self.assertEqual(fil["INDEX"].attrs["filled"], 10)
+            d = readfun(fil)
+            self.assertEqual(d.b.shape, (3, 10))
+            self.assertAllclose(d.ivardata["INDEX"].data, range(10))
+            self.assertAllclose(d.b[:, 9], [10, 20, 30])
+        with h5py.File(fname, "r") as fil:
+            self.assertEqual(fil["b"].shape, (3, 10))
+            self.assertEqual(fil["INDEX"].shape, (10,))
+        fname.unlink()
+
+    def test_trim(self):
+        d1 = DataBlock()
+        d1.c = hfarray(3)
+        fname = testpath / "testdata/hdf5/v02/savetest/res_1.hdf5"
+        with h5py.File(fname, mode="w") as fil:
+            savefun(d1, fil, expandable=True)
+            append_hdf5(d1, fil, growth=4)
+            self.assertEqual(fil["c"].shape, (4,))
+            hdf5.trim_hdf5(fil)
+            self.assertEqual(fil["c"].shape, (2,))
+            self.assertEqual(fil["INDEX"].shape, (2,))
+        fname.unlink()
+
+    def test_caller_file(self):
+        d1 = DataBlock()
+        d1.c = hfarray(3)
+        fname = testpath / "testdata/hdf5/v02/savetest/res_1.hdf5"
+        with h5py.File(fname, mode="w") as fil:
+            savefun(d1, fil, expandable=True)
+            for i in range(3):
+                append_hdf5(d1, fil)
+            appender = hdf5.HDF5Appender(fil, buffersize=2)
+            for i in range(3):
+                appender.append(d1)
+            appender.close()
+        with h5py.File(fname, "r") as fil:
+            self.assertEqual(fil["c"].shape, (7,))
+            self.assertEqual(fil["INDEX"].shape, (7,))
+            self.assertAllclose(fil["c"][...], 3)
+        fname.unlink()
+
+    def test_append_list(self):
+        fi = DimSweep("freq", 3)
+        blocks = []
+        for i in range(4):
+            db = DataBlock()
+            db.b = hfarray([1, 2, 3], dims=(fi,)) * (i + 1)
+            db.c = hfarray(i)
+            blocks.append(db)
+        fname = testpath / "testdata/hdf5/v02/savetest/res_1.hdf5"
+        with hdf5context(fname, mode="w") as fil:
+            savefun(blocks[0], fil, expandable=True)
+            append_hdf5(blocks[1:], fil)
+        d = readfun(fname)
+        self.assertAllclose(d.b[2], [3, 6, 9, 12])
+        self.assertAllclose(d.c, [0, 1, 2, 3])
+        self.assertAllclose(d.ivardata["INDEX"].data, [0, 1, 2, 3])
+        fname.unlink()
+
+    def test_append_list_missing(self):
+        d1 = DataBlock()
+        d1.c = hfarray(3)
+        d2 = DataBlock()
+        d2.b = hfarray(3)
+        fname = testpath / "testdata/hdf5/v02/savetest/res_1.hdf5"
+        with hdf5context(fname, mode="w") as fil:
+            savefun(d1, fil, expandable=True)
+            self.assertRaises(ValueError, append_hdf5, [d1, d2], fil)
+            self.assertEqual(fil["c"].shape, (1,))
+        fname.unlink()
+
+    def test_appender(self):
+        d1 = DataBlock()
+        d1.c = hfarray(0)
+        fname = testpath / "testdata/hdf5/v02/savetest/res_1.hdf5"
+        savefun(d1, fname, expandable=True)
+        with hdf5.HDF5Appender(fname, buffersize=4) as appender:
+            for i in range(1, 10):
+                db = DataBlock()
+                db.c = hfarray(i)
+                appender.append(db)
+            self.assertEqual(len(appender.buffer), 1)
+            fil = appender.filehandle
+            self.assertEqual(fil["INDEX"].attrs["filled"], 9)
+            self.assertAllclose(readfun(fil).c, range(9))
+        d = readfun(fname)
+        self.assertAllclose(d.c, range(10))
+        with h5py.File(fname, "r") as fil:
+            self.assertEqual(fil["c"].shape, (10,))
+        fname.unlink()
+
+    def test_appender_interval(self):
+        d1 = DataBlock()
+        d1.c = hfarray(0)
+        fname = testpath / "testdata/hdf5/v02/savetest/res_1.hdf5"
+        with hdf5context(fname, mode="w") as fil:
+            savefun(d1, fil, expandable=True)
+            appender = hdf5.HDF5Appender(fil, buffersize=100,
+                                         flushinterval=0)
+            appender.append(d1)
+            self.assertEqual(appender.buffer, [])
+            appender.close()
+            self.assertTrue(fil)
+        fname.unlink()
+
+    def test_appender_error(self):
+        d1 = DataBlock()
+        d1.c = hfarray(0)
+        d2 = DataBlock()
+        d2.b = hfarray(1)
+        fname = testpath / "testdata/hdf5/v02/savetest/res_1.hdf5"
+        with hdf5context(fname, mode="w") as fil:
+            savefun(d1, fil, expandable=True)
+            appender = hdf5.HDF5Appender(fil, buffersize=100)
+            appender.append(d1)
+            appender.append(d2)
+            self.assertRaises(ValueError, appender.flush)
+            self.assertEqual(appender.buffer, [d1, d2])
+            appender.buffer.remove(d2)
+            appender.close()
+            self.assertEqual(fil["c"].shape, (2,))
+        fname.unlink()
+
+    def test_chunks(self):
+        fi = DimSweep("freq", 100000)
+        i = DimMatrix_i("i", 2)
+        j = DimMatrix_j("j", 2)
+        d1 = DataBlock()
+        d1.S = hfarray(np.zeros((100000, 2, 2)), dims=(fi, i, j))
+        d1.c = hfarray(np.zeros((10, )), dims=(DimSweep("p", 10),))
+        fname = testpath / "testdata/hdf5/v02/savetest/res_1.hdf5"
+        with hdf5context(fname, mode="w") as fil:
+            savefun(d1, fil, chunks={"c": (5,)}, compression="gzip",
+                    shuffle=True)
+            self.assertEqual(fil["S"].chunks, (6250, 2, 2))
+            self.assertEqual(fil["S"].compression, "gzip")
+            self.assertTrue(fil["S"].shuffle)
+            self.assertEqual(fil["c"].chunks, (5,))
+        d = readfun(fname)
+        self.assertAllclose(d.S, d1.S)
+        fname.unlink()
+
+    def test_default_chunks(self):
+        fi = DimSweep("freq", 1000)
+        i = DimMatrix_i("i", 2)
+        j = DimMatrix_j("j", 2)
+        x = hfarray(np.zeros((1000, 2, 2)), dims=(fi, i, j))
+        self.assertEqual(v_02.default_chunks(x), (1000, 2, 2))
+        x = x.add_dim(DimRep("INDEX", 1), 1)
+        self.assertEqual(v_02.default_chunks(x, 1), (1000, 8, 2, 2))
+
 
 
 
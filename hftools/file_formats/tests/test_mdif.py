@@ -5,11 +5,13 @@
 #
 # The full license is in the file COPYING.txt, distributed with this software.
 #-----------------------------------------------------------------------------
+import numpy as np
+
 import hftools.file_formats
 from hftools import path
 from hftools.testing import TestCase
 import hftools.file_formats.tests.base_test as base_test
-from hftools.dataset import DataBlock, hfarray, DimSweep
+from hftools.dataset import DataBlock, hfarray, DimSweep, DimPartial
 from hftools.file_formats.common import Comments
 from hftools.file_formats import read_mdif, save_mdif
 import hftools.file_formats.mdif as mdif
@@ -28,6 +30,56 @@ class Test_parse_header(TestCase):
         self.assertRaises(Exception, D.parse_header, "X(unknown)")
 
 
+class Test_layout(TestCase):
+    header = [["freq(real)", "S[1,1](complex)", "S[1,2](complex)"],
+              ["S[2,1](complex)", "S[2,2](complex)", "N(integer)",
+               "V[1](real)", "V[2](real)"]]
+
+    def test_layout(self):
+        D = mdif.GetData(self.header)
+        self.assertEqual(D.ncols, 12)
+        self.assertTrue(D.numeric)
+        names = [x[0] for x in D.variables]
+        self.assertEqual(names, ["S", "N", "V"])
+        self.assertEqual(D.variables[0][1].tolist(), [1, 3, 5, 7])
+        self.assertEqual(D.variables[0][4], (2, 2))
+
+    def test_parse_text(self):
+        D = mdif.GetData(self.header)
+        res = D.parse_text("1 1 2 3 4\n5 6 7 8 9 10 11\n"
+                           "2 1 0 0 0\n0 0 1 0 3 -1 -2\n")
+        self.assertAllclose(res["freq"], [1, 2])
+        self.assertAllclose(res["S"][0], [[1 + 2j, 3 + 4j], [5 + 6j, 7 + 8j]])
+        self.assertAllclose(res["S"][1], np.eye(2))
+        self.assertEqual(res["N"].tolist(), [9, 3])
+        self.assertAllclose(res["V"], [[10, 11], [-1, -2]])
+
+    def test_parse_text_fallback(self):
+        D = mdif.GetData(self.header)
+        self.assertIsNone(D.parse_text("1 2 3\n"))
+        self.assertIsNone(D.parse_text('1 "2" 3 4 5 6 7 8 9 10 11 12\n'))
+        D = mdif.GetData([["TEMP(string)", "TNOM(string)"]])
+        self.assertFalse(D.numeric)
+        self.assertIsNone(D.parse_text('"27" "27"\n'))
+
+
+class Test_simple_merge_blocks(TestCase):
+    def test_1(self):
+        blocks = []
+        fi = DimSweep("freq", [1, 2, 3])
+        for idx in range(4):
+            db = DataBlock()
+            db.x = hfarray(np.arange(3) + 10 * idx, dims=(fi,))
+            db.y = hfarray(idx)
+            db["vg"] = DimPartial("vg", [idx / 2.])
+            blocks.append(db)
+        res = mdif.simple_merge_blocks(blocks)
+        self.assertEqual([x.name for x in res.x.dims], ["freq", "INDEX"])
+        self.assertAllclose(res.x[:, 2], [20, 21, 22])
+        self.assertEqual(res.y.tolist(), [0, 1, 2, 3])
+        self.assertAllclose(res.vg, [0, 0.5, 1, 1.5])
+
+
 class TestMDIFdata_1(base_test.Test_1):
     readfun = [hftools.file_formats.read_mdif]
     basepath = testpath
@@ -69,6 +121,39 @@ class TestMDIF_readfile(TestCase):
         self.assertTrue("Power" in mdif)
 
 
+class TestMDIF_multiline(TestCase):
+    def setUp(self):
+        self.filename = testpath / "temp_multiline.mdif"
+        with open(self.filename, "w") as fil:
+            for vg in [0, 1]:
+                fil.write("VAR vg(real) = %d\nBEGIN Spar\n# P(real) = 1\n"
+                          "%% freq(real) S[1,1](complex) S[1,2](complex)\n"
+                          "%% S[2,1](complex) S[2,2](complex)\n" % vg)
+                for f in range(3):
+                    fil.write("%d %d 0 0 0\n0 0 %d 0\n" % (f, vg, f))
+                fil.write("END\n")
+
+    def tearDown(self):
+        self.filename.unlink()
+
+    def test_1(self):
+        res = read_mdif(self.filename, verbose=False, blockname="Spar")
+        self.assertEqual(res.S.shape, (3, 2, 2, 2))
+        self.assertAllclose(res.S[:, 1, 0, 0], [1, 1, 1])
+        self.assertAllclose(res.S[:, 0, 1, 1], [0, 1, 2])
+        self.assertAllclose(res.vg, [0, 1])
+
+    def test_comment_in_data(self):
+        with open(self.filename) as fil:
+            lines = fil.readlines()
+        lines.insert(7, "! comment\n")
+        with open(self.filename, "w") as fil:
+            fil.writelines(lines)
+        with self.assertRaises(mdif.MDIFError) as cm:
+            read_mdif(self.filename, verbose=False)
+        self.assertIn("line 8", str(cm.exception))
+
+
 class TestMDIF_savefile(TestCase):
     def test_1(self):
         mdif = read_mdif(testpath / "testdata/mdif/small.mdif", verbose=False)
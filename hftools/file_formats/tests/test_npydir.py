@@ -0,0 +1,93 @@
+#-----------------------------------------------------------------------------
+# Copyright (c) 2014, HFTools Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+import numpy as np
+
+from hftools import path
+from hftools.testing import TestCase
+from hftools.core.exceptions import HFToolsIOError
+from hftools.dataset import DataBlock, hfarray, DimSweep, DimMatrix_i,\
+    DimMatrix_j, LinearDim
+from hftools.file_formats import read_data
+from hftools.file_formats.common import Comments
+from hftools.file_formats.npydir import read_npydir, save_npydir, is_npydir
+testpath = path(__file__).dirname()
+
+
+class Test_npydir(TestCase):
+    def setUp(self):
+        self.fi = LinearDim("freq", start=1e9, stop=2e9, count=3, unit="Hz")
+        self.i = DimMatrix_i("i", 2)
+        self.j = DimMatrix_j("j", 2)
+        self.db = DataBlock()
+        self.db.blockname = "Kalle"
+        self.db.comments = Comments(["!Hej: 10"])
+        self.db.S = hfarray(np.arange(12.).reshape(3, 2, 2),
+                            dims=(self.fi, self.i, self.j), unit="V",
+                            outputformat="%.2f")
+        self.db.T = DimSweep("T", [20, 30], unit="degC")
+        self.dirname = testpath / "testdata/npydir/slask"
+        save_npydir(self.db, self.dirname)
+
+    def tearDown(self):
+        self.dirname.rmtree()
+        (testpath / "testdata/npydir").removedirs()
+
+    def test_is_npydir(self):
+        self.assertTrue(is_npydir(self.dirname))
+        self.assertFalse(is_npydir(testpath))
+
+    def test_roundtrip(self):
+        db = read_npydir(self.dirname)
+        self.assertAllclose(db.S, self.db.S)
+        self.assertEqual(db.S.dims, self.db.S.dims)
+        self.assertEqual(db.S.unit, "V")
+        self.assertEqual(db.S.outputformat, "%.2f")
+        self.assertEqual(db.ivardata["T"], self.db.ivardata["T"])
+        self.assertEqual(db.ivardata["T"].unit, "degC")
+        self.assertEqual(db.blockname, "Kalle")
+        self.assertEqual(db.comments.property["Hej"], 10)
+
+    def test_lineardim(self):
+        db = read_npydir(self.dirname)
+        self.assertIsInstance(db.ivardata["freq"], LinearDim)
+        self.assertIsNotNone(db.ivardata["freq"].grid)
+        self.assertFalse((self.dirname / "dim_0.npy").exists())
+
+    def test_mmap(self):
+        db = read_npydir(self.dirname)
+        self.assertFalse(db.S.flags.writeable)
+        db = read_npydir(self.dirname, mmap_mode=None)
+        self.assertTrue(db.S.flags.writeable)
+
+    def test_read_data(self):
+        db = read_data(self.dirname)
+        self.assertAllclose(db.S, self.db.S)
+
+    def test_not_npydir(self):
+        self.assertRaises(HFToolsIOError, read_npydir, testpath)
+
+    def test_unknown_keyword(self):
+        self.assertRaises(TypeError, read_npydir, self.dirname, mmap=True)
+
+    def test_object_array(self):
+        self.db.o = hfarray(np.array([1, "a", None], dtype=object),
+                            dims=(self.fi,))
+        save_npydir(self.db, self.dirname)
+        self.assertRaises(HFToolsIOError, read_npydir, self.dirname)
+        db = read_npydir(self.dirname, allow_pickle=True)
+        self.assertEqual(db.o.tolist(), [1, "a", None])
+        self.assertAllclose(db.S, self.db.S)
+
+    def test_stale_files(self):
+        db = DataBlock()
+        db.S = self.db.S
+        save_npydir(db, self.dirname)
+        self.assertFalse((self.dirname / "dim_3.npy").exists())
+        self.assertEqual(sorted(x.name for x in self.dirname.files()),
+                         ["datablock.json", "dim_1.npy", "dim_2.npy",
+                          "var_0.npy"])
@@ -201,6 +201,40 @@ class TestSPdata_save(TestCase):
                     self.assertEqual(rad1, rad2, msg=msg % args)
 
 
+class Test_parse_columns(TestCase):
+    def test_numeric(self):
+        parse = hftools.file_formats.spdata.parse_columns
+        res = parse([u"1\t1.5\t 2e3", u"2\t-2\tnan"], 3)
+        self.assertEqual(res[0].dtype, int)
+        self.assertEqual(res[1].dtype, float)
+        self.assertAllclose(res[0], [1, 2])
+        self.assertAllclose(res[1], [1.5, -2])
+        self.assertAllclose(res[2][:1], [2000])
+
+    def test_int_to_float(self):
+        parse = hftools.file_formats.spdata.parse_columns
+        res = parse([u"1\t2", u"1.5\t3"], 2)
+        self.assertEqual(res[0].dtype, float)
+        self.assertEqual(res[1].dtype, int)
+
+    def test_mixed(self):
+        parse = hftools.file_formats.spdata.parse_columns
+        res = parse([u"2012-05-31 09:28\t1\tA", u"2012-05-31 09:29\t2\tB"],
+                    3)
+        self.assertEqual(res[0].dtype.kind, "M")
+        self.assertEqual(res[1].tolist(), [1, 2])
+        self.assertEqual(res[2].tolist(), ["A", "B"])
+
+    def test_spaces_in_field(self):
+        parse = hftools.file_formats.spdata.parse_columns
+        res = parse([u"1 2\t3", u"4\t5 6"], 2)
+        self.assertEqual(res[0].tolist(), ["1 2", "4"])
+
+    def test_error(self):
+        parse = hftools.file_formats.spdata.parse_columns
+        self.assertRaises(HFToolsIOError, parse, [u"1\t2", u"3\t4\t5"], 2)
+
+
 if __name__ == '__main__':
     d = DataBlock()
     d.comments = Comments(["Hej=10", "Svejs=11"])
@@ -176,6 +176,207 @@ class TestTouchstone_errors_1(TestCase):
                           testpath / "testdata/touchstone/test-error_7.s2p")
 
 
+class TestTouchstone_ports(TestCase):
+    def setUp(self):
+        self.filenames = []
+
+    def tearDown(self):
+        for fname in self.filenames:
+            fname.unlink()
+
+    def write(self, name, text):
+        fname = testpath / "testdata/touchstone/savetest" / name
+        with open(fname, "w") as fil:
+            fil.write(text)
+        self.filenames.append(fname)
+        return fname
+
+    def test_ports_from_filename(self):
+        ports = hftools.file_formats.touchstone.ports_from_filename
+        self.assertEqual(ports("a/b.s2p"), 2)
+        self.assertEqual(ports("MIXER.S1P"), 1)
+        self.assertEqual(ports("x.s16p"), 16)
+        self.assertIsNone(ports("x.txt"))
+        self.assertIsNone(ports(None))
+
+    def test_search(self):
+        with open(testpath / "testdata/touchstone/test1.s2p") as fil:
+            fname = self.write("res_search.txt", fil.read())
+        d1 = hftools.file_formats.read_touchstone(fname)
+        d2 = hftools.file_formats.read_touchstone(testpath /
+                                                  "testdata/touchstone/"
+                                                  "test1.s2p")
+        self.assertAllclose(d1.S, d2.S)
+
+    def test_keyword(self):
+        fname = self.write("res_keyword.txt",
+                           "# GHz S RI R 50\n[Number of Ports] 1\n"
+                           "1 1 0\n2 3 0\n")
+        d = hftools.file_formats.read_touchstone(fname)
+        self.assertEqual(d.S.shape, (2, 1, 1))
+        self.assertAllclose(d.freq, [1e9, 2e9])
+
+    def test_invalid_number(self):
+        fname = self.write("res_invalid.s1p",
+                           "# GHz S RI R 50\n1 1 0\n2 3 0x\n")
+        self.assertRaises(TouchstoneError,
+                          hftools.file_formats.read_touchstone, fname)
+
+    def test_incomplete(self):
+        fname = self.write("res_incomplete.s1p",
+                           "# GHz S RI R 50\n1 1 0\n2 3\n")
+        self.assertRaises(TouchstoneError,
+                          hftools.file_formats.read_touchstone, fname)
+
+
+class TestTouchstone_v2(TestTouchstone_ports):
+    header = "[Version] 2.0\n# GHz S RI R 50\n[Number of Ports] 3\n"
+    upper = ("[Network Data]\n"
+             "1 11 0 12 0 13 0\n   22 0 23 0\n     33 0\n"
+             "2 11 1 12 1 13 1\n   22 1 23 1\n     33 1\n")
+    lower = ("[Network Data]\n"
+             "1 11 0\n12 0 22 0\n13 0 23 0 33 0\n"
+             "2 11 1\n12 1 22 1\n13 1 23 1 33 1\n")
+    facit = np.array([[11, 12, 13], [12, 22, 23], [13, 23, 33]])
+
+    def read(self, name, text):
+        fname = self.write(name, text)
+        return hftools.file_formats.read_touchstone(fname)
+
+    def test_upper(self):
+        d = self.read("res_upper.s3p", self.header +
+                      "[Matrix Format] Upper\n" + self.upper)
+        self.assertAllclose(d.freq, [1e9, 2e9])
+        self.assertAllclose(d.S, [self.facit, self.facit + 1j])
+
+    def test_lower(self):
+        d = self.read("res_lower.s3p", self.header +
+                      "[Matrix Format] Lower\n" + self.lower)
+        self.assertAllclose(d.S, [self.facit, self.facit + 1j])
+
+    def test_two_port_order(self):
+        text = ("[Version] 2.0\n# Hz S RI R 50\n[Number of Ports] 2\n"
+                "[Two-Port Data Order] %s\n[Number of Frequencies] 1\n"
+                "[Network Data]\n1 11 0 12 0 21 0 22 0\n[End]\n")
+        d = self.read("res_12_21.s2p", text % "12_21")
+        self.assertAllclose(d.S, [[[11, 12], [21, 22]]])
+        d = self.read("res_21_12.s2p", text % "21_12")
+        self.assertAllclose(d.S, [[[11, 21], [12, 22]]])
+        self.assertRaises(TouchstoneError, self.read, "res_order.s2p",
+                          text.replace("[Two-Port Data Order] %s\n", ""))
+
+    def test_reference(self):
+        d = self.read("res_reference.s3p", self.header +
+                      "[Reference] 50 75\n 100\n[Matrix Format] Upper\n" +
+                      self.upper)
+        self.assertAllclose(d.Z0, [50., 75., 100.])
+        self.assertAllclose(d.S.Z0, [50., 75., 100.])
+        self.assertEqual(d.Z0.dims, d.S.dims[1:2])
+
+    def test_information(self):
+        d = self.read("res_info.s3p", self.header +
+                      "[Begin Information]\n[Reference] 1 2 3\n"
+                      "[End Information]\n[Matrix Format] Upper\n" +
+                      self.upper + "[End]\n")
+        self.assertEqual(d.S.Z0, 50)
+        self.assertAllclose(d.S[0], self.facit)
+
+    def test_noise(self):
+        d = self.read("res_noise.s2p",
+                      "[Version] 2.0\n# GHz S RI R 50\n"
+                      "[Number of Ports] 2\n[Two-Port Data Order] 12_21\n"
+                      "[Number of Noise Frequencies] 2\n[Network Data]\n"
+                      "1 1 0 0 0 0 0 1 0\n[Noise Data]\n"
+                      "1 1 0.5 0 0.2\n2 2 0.5 0 0.3\n[End]\n")
+        self.assertAllclose(d.Rn, [10., 15.])
+        self.assertAllclose(d.Fmin, 10 ** np.array([0.1, 0.2]))
+
+    def test_errors(self):
+        bad = [self.header + "[Matrix Format] Diagonal\n" + self.upper,
+               self.header + "[Matrix Format] Upper\n"
+               "[Number of Frequencies] 3\n" + self.upper,
+               self.header + "[Reference] 50 75\n[Matrix Format] Upper\n" +
+               self.upper,
+               self.header + "[Mixed-Mode Order] D2,3 D3,2 C2,3\n" +
+               self.upper,
+               self.header + "[Matrix Format] Upper\n" + self.upper +
+               "[End]\n1 2 3\n",
+               self.header + "[Number of Frequencies] two\n" + self.upper]
+        for idx, text in enumerate(bad):
+            self.assertRaises(TouchstoneError, self.read,
+                              "res_error_%d.s3p" % idx, text)
+        text = self.header.replace("[Number of Ports] 3\n", "")
+        self.assertRaises(TouchstoneError, self.read, "res_noports.txt",
+                          text + "[Matrix Format] Upper\n" + self.upper)
+
+
+class TestTouchstone_save_v2(TestCase):
+    def setUp(self):
+        fi = DimSweep("freq", [1e9, 2e9])
+        self.data = np.random.randn(2, 3, 3) + 1j * np.random.randn(2, 3, 3)
+        self.dims = (fi, DimMatrix_i("i", 3), DimMatrix_j("j", 3),)
+        self.filename = testpath / "testdata/touchstone/savetest/res_v2.s3p"
+
+    def tearDown(self):
+        if self.filename.exists():
+            self.filename.unlink()
+
+    def roundtrip(self, data, matrix_format="full"):
+        d = DataBlock()
+        d.comments = Comments(["Vg=10"])
+        d.S = hfarray(data, dims=self.dims)
+        hftools.file_formats.save_touchstone(d, self.filename, version=2,
+                                             matrix_format=matrix_format)
+        return hftools.file_formats.read_touchstone(self.filename)
+
+    def test_full(self):
+        res = self.roundtrip(self.data)
+        self.assertAllclose(res.S, self.data)
+        self.assertEqual(res.comments.property["Vg"], 10)
+
+    def test_triangle(self):
+        data = self.data + self.data.transpose(0, 2, 1)
+        for matrix_format in ["upper", "lower"]:
+            res = self.roundtrip(data, matrix_format)
+            self.assertAllclose(res.S, data)
+        self.assertRaises(ValueError, self.roundtrip, self.data, "upper")
+
+    def test_reference(self):
+        d = DataBlock()
+        d.S = hfarray(self.data, dims=self.dims)
+        d.Z0 = hfarray([50., 75., 100.], dims=self.dims[1:2])
+        hftools.file_formats.save_touchstone(d, self.filename, version=2)
+        res = hftools.file_formats.read_touchstone(self.filename)
+        self.assertAllclose(res.S.Z0, [50., 75., 100.])
+        self.assertAllclose(res.S, self.data)
+
+    def test_frequency_format(self):
+        fi = DimSweep("freq", [1.000000001e9, 2.000000001e9])
+        self.dims = (fi,) + self.dims[1:]
+        d = DataBlock()
+        d.S = hfarray(self.data, dims=self.dims, outputformat="%.3e")
+        hftools.file_formats.save_touchstone(d, self.filename, version=2)
+        res = hftools.file_formats.read_touchstone(self.filename)
+        self.assertAllclose(res.freq, fi.data, rtol=1e-15)
+        self.assertAllclose(res.S, self.data, rtol=1e-3)
+
+    def test_two_port(self):
+        self.dims = (self.dims[0], DimMatrix_i("i", 2), DimMatrix_j("j", 2))
+        self.filename = testpath / "testdata/touchstone/savetest/res_v2.s2p"
+        res = self.roundtrip(self.data[:, :2, :2])
+        self.assertAllclose(res.S, self.data[:, :2, :2])
+
+    def test_errors(self):
+        d = DataBlock()
+        d.S = hfarray(self.data, dims=self.dims)
+        save = hftools.file_formats.save_touchstone
+        self.assertRaises(ValueError, save, d, self.filename, version=3)
+        self.assertRaises(ValueError, save, d, self.filename,
+                          matrix_format="upper")
+        self.assertRaises(ValueError, save, d, self.filename, version=2,
+                          matrix_format="diagonal")
+
+
 class TestTouchstone_save(TestCase):
     def test_1(self):
         d = DataBlock()
@@ -11,6 +11,13 @@ u"""
 Touchstone
 ==========
 
+Version 1.x and 2.0 files are read. Version 2.0 keyword sections are
+handled for [Number of Ports], [Two-Port Data Order], [Number of
+Frequencies], [Number of Noise Frequencies], [Reference], [Matrix
+Format], [Network Data], [Noise Data] and [End]. The [Begin Information]
+section is skipped. Upper and Lower matrix formats are expanded to the
+full symmetric matrix. Per port reference impedances are stored in the
+Z0 attribute of the parameter array, and as Z0 of the DataBlock.
 
     .. autofunction:: read_touchstone
     .. autofunction:: save_touchstone
@@ -25,24 +32,95 @@ from hftools.math import dB_angle_to_complex, mag_angle_to_complex,\
 from hftools.dataset import DataBlock, DimSweep, hfarray,\
     make_matrix, DimMatrix_i, DimMatrix_j
 from hftools.file_formats.common import Comments, db_iterator,\
-    make_col_from_matrix
+    make_col_from_matrix, parse_numbers
 from hftools.file_formats.readbase import Token
 from hftools.file_formats.readbase import ReadFileFormat
+from hftools.networks.multiports import SArray, ZArray, YArray, HArray,\
+    GArray
 
 
 class TouchstoneError(Exception):
     pass
 
 
+reg_ports = re.compile(r".*[.]s([0-9]+)p$", re.I)
+reg_keyword = re.compile(r"\[([^]]+)\]\s*(.*)")
+reg_nonspace = re.compile(r"\S")
+
+matrix_formats = ("full", "upper", "lower")
+multiport_classes = dict(S=SArray, Z=ZArray, Y=YArray, H=HArray, G=GArray)
+
+
+def find_chars(text, chars):
+    u"""Yield, in order, the positions in *text* of any of *chars*."""
+    found = {}
+    for char in chars:
+        idx = text.find(char)
+        if idx >= 0:
+            found[char] = idx
+    while found:
+        char = min(found, key=found.get)
+        idx = found[char]
+        yield idx
+        nxt = text.find(char, idx + 1)
+        if nxt >= 0:
+            found[char] = nxt
+        else:
+            del found[char]
+
+
+def ports_from_filename(filename):
+    u"""Number of ports given by the .sNp extension of *filename*, None for
+       other extensions.
+    """
+    res = reg_ports.match(filename or "")
+    if res:
+        return int(res.group(1))
+    return None
+
+
 class ReadTouchstoneFileFormat(ReadFileFormat):
 
+    def do_file(self, stream):
+        self.nports = ports_from_filename(getattr(stream, "name", None))
+        return ReadFileFormat.do_file(self, stream)
+
     def tokenize(self, stream):
-        for idx, rad in enumerate(stream):
-            lineno = idx + 1
-            rad = rad.strip()
-            if not rad:  # skip empty lines
+        # Only lines with !, # or [ are handled one by one. The remaining
+        # data text is parsed in one step by proc_data.
+        # Data is yielded before each keyword, so version 2.0 sections
+        # can be told apart.
+        text = stream.read()
+        chunks = []
+        pos = 0
+        counted = 0
+        lineno = 1
+        datalineno = 1
+        for idx in find_chars(text, "!#["):
+            if idx < pos:  # in a line already removed
                 continue
-            elif rad.startswith("!"):  # Comment line with information
+            start = text.rfind("\n", 0, idx) + 1
+            end = text.find("\n", idx)
+            if end < 0:
+                end = len(text)
+            if text[start:idx].strip():
+                if text[idx] == "!":  # comment after data
+                    chunks.append(text[pos:idx])
+                    pos = end
+                continue
+            chunks.append(text[pos:start])
+            pos = end
+            lineno += text.count("\n", counted, start)
+            counted = start
+            rad = text[idx:end].strip()
+            if rad.startswith("["):
+                data = "".join(chunks)
+                res = reg_nonspace.search(data)
+                if res:
+                    yield Token("Data", datalineno, data)
+                chunks = []
+                datalineno = lineno + 1
+            if rad.startswith("!"):  # Comment line with information
                 yield Token("Comments", lineno, rad[1:].strip())
             elif rad.startswith("#"):
                 if is_touchstone(None, rad):
@@ -51,12 +129,22 @@ class ReadTouchstoneFileFormat(ReadFileFormat):
                     msg = "# format is invalid on line: %s" % lineno
                     raise TouchstoneError(msg)
             else:
-                yield Token("Data", lineno, rad.split("!", 1)[0].strip())
+                yield Token("Keyword", lineno, rad.split("!", 1)[0].strip())
+        chunks.append(text[pos:])
+        data = "".join(chunks)
+        res = reg_nonspace.search(data)
+        if res:
+            yield Token("Data", datalineno, data)
 
     def parse_blocks(self, stream):
         comments = []
         info = None
-        datalist = []
+        nports = getattr(self, "nports", None)
+        version = None
+        keywords = {}
+        sections = {"network data": [], "noise data": [], "reference": []}
+        section = "network data"
+        skip = False
         for token, lineno, rad in stream:
             if token == "Comments":
                 comments.append(rad)
@@ -66,19 +154,68 @@ class ReadTouchstoneFileFormat(ReadFileFormat):
                 else:
                     msg = "Second # info at lineno: %d" % lineno
                     raise TouchstoneError(msg)
+            elif token == "Keyword":
+                res = reg_keyword.match(rad)
+                if res is None:
+                    msg = "Invalid keyword on line: %d" % lineno
+                    raise TouchstoneError(msg)
+                keyword = res.group(1).strip().lower()
+                value = res.group(2).strip()
+                if keyword == "end information":
+                    skip = False
+                elif skip:
+                    continue
+                elif keyword == "begin information":
+                    skip = True
+                elif keyword == "version":
+                    version = value
+                elif keyword == "number of ports":
+                    nports = keyword_int(keyword, value, lineno)
+                elif keyword in sections:
+                    section = keyword
+                    sections[section].append(value)
+                elif keyword == "end":
+                    section = None
+                else:
+                    keywords[keyword] = value
+                    if section == "reference":
+                        section = "network data"
+            elif skip:
+                continue
+            elif section is None:
+                msg = "Data after [End] on line: %d" % lineno
+                raise TouchstoneError(msg)
             else:
-                datalist.append(list(map(float, rad.split())))
+                sections[section].append(rad)
         if info is None:
             raise TouchstoneError("No # info line in file")
         comments = Comments(comments)
-        f, data, fn, noisedata = proc_data(datalist)
-        out = proc_info(info, f, data, fn, noisedata)
+        data = "\n".join(sections["network data"])
+        if version is None:
+            f, data, fn, noisedata = proc_data(data, nports=nports)
+            out = proc_info(info, f, data, fn, noisedata)
+        else:
+            noise = "\n".join(sections["noise data"])
+            f, data, fn, noisedata = proc_data_v2(data, noise, nports,
+                                                  keywords)
+            out = proc_info(info, f, data, fn, noisedata)
+            proc_reference(out, " ".join(sections["reference"]), nports)
         #HZ S RI R 50
         #comments.add_from_comment("!INFO:#%s"%(" ".join(info)))
         out.comments = comments
         yield out
 
 
+def keyword_int(keyword, value, lineno=None):
+    try:
+        return int(value)
+    except ValueError:
+        msg = "Invalid value for [%s]: %r" % (keyword, value)
+        if lineno is not None:
+            msg += " on line: %d" % lineno
+        raise TouchstoneError(msg)
+
+
 def process_data(data):
     max_N = int(sqrt(sum(map(len, data)) - 1) / 2 + 1)
     n = 1  # number of ports
@@ -120,12 +257,49 @@ def _process_data(data, N):
     return output, noise
 
 
-def proc_data(data, cplxtype=None):
-    output, noise = process_data(data)
+def proc_data_bulk(data, nports):
+    u"""Parse the data lines, in the string *data*, of a file with *nports*
+       ports in one step. Two-port noise parameters start where the
+       frequency decreases.
+    """
+    try:
+        values = parse_numbers(data)
+    except ValueError as exc:
+        raise TouchstoneError("Invalid data in Touchstone File: %s" % exc)
+    N = 2 * nports ** 2 + 1
+    reset = np.flatnonzero(np.diff(values[::N]) <= 0)
+    if len(reset):
+        nfreq = reset[0] + 1
+    else:
+        nfreq = len(values) // N
+    if not nfreq:
+        raise TouchstoneError("File is not a valid Touchstone File")
+    output = values[:nfreq * N].reshape(nfreq, N)
+    noise = values[nfreq * N:]
+    if len(noise):
+        if nports != 2 or len(noise) % 5:
+            raise TouchstoneError("File is not a valid Touchstone File")
+        noise = noise.reshape(-1, 5)
+        if (np.diff(noise[:, 0]) <= 0).any():
+            raise TouchstoneError("File is not a valid Touchstone File")
+    return output, noise
+
+
+def proc_data(data, cplxtype=None, nports=None):
+    u"""Return frequency, data, noise frequency and noise data for the data
+       lines in the string *data*. With *nports* None the number of ports is
+       found by trying all possible port counts.
+    """
+    if nports is None:
+        data = [list(map(float, rad.split())) for rad in data.splitlines()
+                if rad.strip()]
+        output, noise = process_data(data)
+    else:
+        output, noise = proc_data_bulk(data, nports)
     data = np.array(output)
     f = np.array(data[:, 0])
     s = data[:, 1:]
-    if noise:
+    if len(noise):
         data = np.array(noise)
         fn = data[:, 0]
         noisedata = np.array(data[:, 1:], dtype=np.float64)
@@ -134,6 +308,105 @@ def proc_data(data, cplxtype=None):
         return f, s, None, None
 
 
+def expand_triangle(data, nports, matrix_format):
+    u"""Expand *data*, with real and imaginary parts of the upper or lower
+       triangle, row by row, for each frequency, to the full symmetric
+       matrix in row major order.
+    """
+    if matrix_format == "upper":
+        i, j = np.triu_indices(nports)
+    else:
+        i, j = np.tril_indices(nports)
+    pairs = data.reshape(data.shape[0], len(i), 2)
+    out = np.empty((data.shape[0], nports, nports, 2), dtype=data.dtype)
+    out[:, i, j] = pairs
+    out[:, j, i] = pairs
+    return out.reshape(data.shape[0], -1)
+
+
+def proc_data_v2(data, noise, nports, keywords):
+    u"""Return frequency, data, noise frequency and noise data of a version
+       2.0 file from the [Network Data] text *data* and the [Noise Data]
+       text *noise*. The data is returned in the same layout as for version
+       1 files.
+    """
+    if nports is None:
+        raise TouchstoneError("[Number of Ports] missing in version 2.0 file")
+    if "mixed-mode order" in keywords:
+        raise TouchstoneError("[Mixed-Mode Order] is not supported")
+    matrix_format = keywords.get("matrix format", "full").lower()
+    if matrix_format not in matrix_formats:
+        msg = "Invalid [Matrix Format]: %r" % keywords["matrix format"]
+        raise TouchstoneError(msg)
+    if matrix_format == "full":
+        nelem = nports ** 2
+    else:
+        nelem = nports * (nports + 1) // 2
+    try:
+        values = parse_numbers(data)
+        noise = parse_numbers(noise)
+    except ValueError as exc:
+        raise TouchstoneError("Invalid data in Touchstone File: %s" % exc)
+    N = 2 * nelem + 1
+    if not len(values) or len(values) % N:
+        raise TouchstoneError("File is not a valid Touchstone File")
+    values = values.reshape(-1, N)
+    if "number of frequencies" in keywords:
+        nfreq = keyword_int("number of frequencies",
+                            keywords["number of frequencies"])
+        if nfreq != len(values):
+            msg = "[Number of Frequencies] is %d, found %d frequencies"
+            raise TouchstoneError(msg % (nfreq, len(values)))
+    f = values[:, 0]
+    s = values[:, 1:]
+    if matrix_format != "full":
+        s = expand_triangle(s, nports, matrix_format)
+    elif nports == 2:
+        order = keywords.get("two-port data order")
+        if order is None:
+            msg = "[Two-Port Data Order] missing in two-port file"
+            raise TouchstoneError(msg)
+        if order == "12_21":  # to the 11 21 12 22 order of version 1
+            s = s[:, [0, 1, 4, 5, 2, 3, 6, 7]]
+        elif order != "21_12":
+            raise TouchstoneError("Invalid [Two-Port Data Order]: %r" % order)
+    if not len(noise):
+        return f, s, None, None
+    if nports != 2 or len(noise) % 5:
+        raise TouchstoneError("Invalid [Noise Data] in Touchstone File")
+    noise = noise.reshape(-1, 5)
+    if "number of noise frequencies" in keywords:
+        nfreq = keyword_int("number of noise frequencies",
+                            keywords["number of noise frequencies"])
+        if nfreq != len(noise):
+            msg = "[Number of Noise Frequencies] is %d, found %d frequencies"
+            raise TouchstoneError(msg % (nfreq, len(noise)))
+    return f, s, noise[:, 0], noise[:, 1:]
+
+
+def proc_reference(db, reference, nports):
+    u"""Set reference impedance of the parameter in *db* to the version 2.0
+       [Reference] values in the string *reference*, or to the Z0 of the
+       option line if there are none.
+    """
+    name = [x for x in db.vardata if x in multiport_classes][0]
+    if reference.strip():
+        try:
+            z0 = parse_numbers(reference)
+        except ValueError as exc:
+            raise TouchstoneError("Invalid [Reference]: %s" % exc)
+        if len(z0) != nports:
+            msg = "[Reference] should have %d values, found %d"
+            raise TouchstoneError(msg % (nports, len(z0)))
+        db.Z0 = hfarray(z0, dims=db[name].dims[-2:-1], unit="Ohm")
+    Z0 = np.asarray(db.Z0)
+    if Z0.ndim == 0:
+        Z0 = float(Z0)
+    param = multiport_classes[name](db[name], copy=False)
+    param.Z0 = Z0
+    db[name] = param
+
+
 reg_touch = re.compile(r"\s*#\s*[kmgtp]?hz\s+[szygh]\s+" +
                        r"([a-z][a-z])(\s+r\s+[0-9]+)?", re.I)
 
@@ -223,9 +496,93 @@ def format_touchstone_block(sweepvars, header, fmts,
         yield out
 
 
-def save_touchstone(db, filename):
+def get_reference(db, param):
+    u"""Return reference impedance of *param*, in *db*, as a float or an
+       array with one value per port.
+    """
+    Z0 = getattr(param, "Z0", None)
+    if Z0 is None:
+        Z0 = db.vardata.get("Z0", 50.)
+    Z0 = np.asarray(Z0, dtype=float)
+    if Z0.ndim == 0 or (Z0 == Z0.flat[0]).all():
+        return float(Z0.flat[0])
+    if Z0.shape != param.shape[-1:]:
+        raise ValueError("Z0 should have one value per port")
+    return Z0
+
+
+def format_touchstone2(db, matrix_format="full"):
+    u"""Yield lines of version 2.0 Touchstone file for the first S, Z, Y, H
+       or G matrix in *db*.
+    """
+    if matrix_format not in matrix_formats:
+        raise ValueError("matrix_format must be one of %r" % (matrix_formats,))
+    names = [x for x in db.vardata if x in multiport_classes]
+    if not names:
+        raise ValueError("No S, Z, Y, H or G matrix to save")
+    name = names[0]
+    param = db[name]
+    nfreq, nports = param.shape[0], param.shape[-1]
+    data = np.asarray(param).reshape(nfreq, nports, nports)
+    if matrix_format == "full":
+        i, j = np.indices((nports, nports)).reshape(2, -1)
+    else:
+        if not np.allclose(data, data.transpose(0, 2, 1)):
+            msg = "%s matrix must be symmetric for matrix_format %r"
+            raise ValueError(msg % (name, matrix_format))
+        if matrix_format == "upper":
+            i, j = np.triu_indices(nports)
+        else:
+            i, j = np.tril_indices(nports)
+    Z0 = get_reference(db, param)
+    if db.comments:
+        for comment in db.comments.fullcomments:
+            yield "!" + comment
+    yield "[Version] 2.0"
+    yield "# HZ %s RI R %s" % (name, Z0 if np.ndim(Z0) == 0 else 50)
+    yield "[Number of Ports] %d" % nports
+    if nports == 2:
+        yield "[Two-Port Data Order] 12_21"
+    yield "[Number of Frequencies] %d" % nfreq
+    if np.ndim(Z0):
+        yield "[Reference] " + " ".join("%s" % x for x in Z0)
+    if nports > 1:
+        yield "[Matrix Format] %s" % matrix_format.capitalize()
+    yield "[Network Data]"
+    fmt = getattr(param, "outputformat", "%.16e")
+    ffmt = getattr(param.dims[0], "outputformat", None) or "%.16e"
+    # One line per matrix row, a row ends where i changes
+    rows = np.flatnonzero(np.diff(i)) + 1
+    elems = [" ".join([fmt] * (2 * len(x))) for x in np.split(i, rows)]
+    template = ffmt + " " + "\n".join(elems)
+    values = np.empty((nfreq, 1 + 2 * len(i)))
+    f = param.dims[0].data
+    values[:, 0] = f
+    values[:, 1::2] = data[:, i, j].real
+    values[:, 2::2] = data[:, i, j].imag
+    for row in values:
+        yield template % tuple(row)
+    yield "[End]"
+
+
+def save_touchstone(db, filename, version=1, matrix_format="full"):
     """Write a Datablock to a touchstone-format file with name filename.
+
+       *version* 2 writes a version 2.0 file, where *matrix_format*
+       "upper" or "lower" saves only that triangle of symmetric matrices.
+       Noise parameters are not saved in version 2 files.
     """
+    if version == 2:
+        lines = list(format_touchstone2(db, matrix_format))
+        with open(filename, "w") as fil:
+            for rad in lines:
+                fil.write(rad)
+                fil.write("\n")
+        return
+    elif version != 1:
+        raise ValueError("version must be 1 or 2")
+    if matrix_format != "full":
+        raise ValueError("matrix_format requires version 2")
     with open(filename, "w") as fil:
         for rad in db_iterator(db, format_touchstone_block):
             fil.write("\t".join(rad))
@@ -374,7 +374,7 @@ class broadcast_matrices(object):
 def inv(A):
     inv = linalg.inv
     result = inv(A)
-    result = hfarray(result, dims=A.dims)
+    result = hfarray._wrap(result, A.dims)
     return result
 
 
@@ -398,7 +398,7 @@ def matrix_multiply(a, b):
     """
     A, B = make_same_dims(a, b)
     res = np.einsum("...ij,...jk->...ik", A, B)
-    return hfarray(res, dims=A.dims)
+    return hfarray._wrap(res, A.dims)
 
 
 def flatten_non_matrix(A):
@@ -418,7 +418,7 @@ def det(A):
 def solve_Ab(A, b, squeeze=True):
     AA, bb = make_same_dims(A, b)
     x = np.linalg.solve(AA, bb)
-    result = hfarray(x, dims=bb.dims)
+    result = hfarray._wrap(x, bb.dims)
     if squeeze:
         result = result.squeeze()
     return result
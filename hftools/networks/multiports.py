@@ -33,6 +33,7 @@ Twoports
 """
 
 import numpy as np
+from numpy.lib.stride_tricks import as_strided
 from numpy import array, identity, \
     zeros_like, bmat, diag, sqrt
 
@@ -98,8 +99,8 @@ class _MultiPortArray(_hfarray):
                         accessor = make_accessor(i, j)
                         self._attrfuns[label] = accessor
 
-        if isinstance(data, self.__class__) and self.Z0 == data.Z0:
-            pass
+        if isinstance(data, self.__class__):
+            self.Z0 = data.Z0 if Z0 is None else Z0
         elif isinstance(data, _MultiPortArray):
             if Z0 is None:
                 self.Z0 = getattr(data, "Z0", None)
@@ -114,6 +115,8 @@ class _MultiPortArray(_hfarray):
                        "elements of a %s matrix")
                 msg = fmt % (data.__class__.__name__, self.__class__.__name__)
                 raise ValueError(msg)
+        elif Z0 is not None:
+            self.Z0 = Z0
 
     @property
     def Z0(self):
@@ -152,6 +155,13 @@ class _MultiPortArray(_hfarray):
         _hfarray.__array_finalize__(self, obj)
         self.Z0 = getattr(obj, "Z0", 50.)
 
+    @classmethod
+    def _wrap(cls, data, dims, unit=None, outputformat=None):
+        out = cls(data, dims=dims, copy=False, unit=unit)
+        if outputformat is not None:
+            out.outputformat = outputformat
+        return out
+
     def view(self, dtype=None, type=None):
         if type is None:
             x = np.ndarray.view(self, dtype=self.dtype)
@@ -210,10 +220,36 @@ class _MultiPortArray(_hfarray):
     def __getitem__(self, idx):
         data = self.view(dtype=self.dtype, type=hfarray).__getitem__(idx)
         if ismatrix(data):
-            return self.__class__(data, copy=False)
+            out = self.__class__(data, copy=False)
+            Z0 = self._index_Z0(idx)
+            if Z0 is not None:
+                out.Z0 = Z0
+            return out
         else:
             return data
 
+    def _index_Z0(self, idx):
+        u"""Return Z0 of the ports kept by *self[idx]*. A Z0 with one value
+           per port is indexed like the ports, and None is returned if rows
+           and columns keep different ports.
+        """
+        Z0 = self.Z0
+        if np.ndim(Z0) != 1 or len(Z0) != self.shape[-1]:
+            return Z0
+        ports = []
+        for axis in (-2, -1):
+            idxarray = np.arange(self.shape[axis])
+            strides = [0] * self.ndim
+            strides[axis] = idxarray.strides[0]
+            marker = as_strided(idxarray, shape=self.shape, strides=strides)
+            sel = np.asarray(hfarray(marker, dims=self.dims,
+                                     copy=False)[idx])
+            sel = sel.reshape((-1,) + sel.shape[-2:])[0]
+            ports.append(sel[:, 0] if axis == -2 else sel[0])
+        if not np.array_equal(ports[0], ports[1]):
+            return None
+        return Z0[ports[0]]
+
 
 class _TwoPortArray(_MultiPortArray):
     """Basklass som ej skall anvandas direkt
@@ -329,7 +365,9 @@ This model may be of any dimension.
 """
     shortname = "S"
 
-    def __init__(self, data, dims=None, copy=True, Z0=50., info=None, unit=None):
+    def __init__(self, data, dims=None, copy=True, Z0=None, info=None, unit=None):
+        if Z0 is None and not isinstance(data, SArray):
+            Z0 = 50.
         _MultiPortArray.__init__(self, data, dims, copy=copy, Z0=Z0, info=info, unit=unit)
 
     @property
@@ -342,9 +380,9 @@ This model may be of any dimension.
 
     @property
     def P(self):
-        Z0 = self.Z0
-        v = diag([sqrt(1. / Z0) / 2.] * self.shape[-1])
-        i = diag([sqrt(Z0) / 2.] * self.shape[-1])
+        Z0 = self.Z0 * np.ones(self.shape[-1])  # scalar or one per port
+        v = diag(sqrt(1. / Z0) / 2.)
+        i = diag(sqrt(Z0) / 2.)
         P = make_matrix(bmat([[v, -i], [v, i]]))
         return P
 
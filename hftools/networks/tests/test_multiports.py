@@ -332,3 +332,43 @@ class TestConversions(TestCase):
     def testH(self):
         self._conversion(mp.HArray)
 
+
+class Test_SArray_Z0(TestCase):
+    def test_init(self):
+        s = mp.SArray(aobj.hfarray(np.zeros((2, 2))), Z0=75.)
+        self.assertEqual(s.Z0, 75.)
+
+    def test_slice(self):
+        s = mp.SArray(np.zeros((3, 2, 2)))
+        s.Z0 = np.array([50., 75.])
+        self.assertAllclose(s[:1].Z0, [50., 75.])
+        self.assertAllclose(s.view().Z0, [50., 75.])
+
+    def test_slice_ports(self):
+        s = mp.SArray(np.zeros((3, 3, 3)))
+        s.Z0 = np.array([50., 75., 100.])
+        self.assertAllclose(s[:, :1, :1].Z0, [50.])
+        self.assertAllclose(s[..., 1:, 1:].Z0, [75., 100.])
+        self.assertAllclose(s[0, ::-2, ::-2].Z0, [100., 50.])
+        self.assertEqual(s[:, :1, 1:2].Z0, 50.)
+
+    def test_copy(self):
+        s = mp.SArray(np.zeros((1, 2, 2)))
+        s.Z0 = np.array([50., 75.])
+        res = s.copy()
+        self.assertAllclose(res.Z0, [50., 75.])
+        self.assertAllclose(res, s)
+
+    def test_explicit_Z0(self):
+        s = mp.SArray(np.zeros((1, 2, 2)), Z0=75.)
+        self.assertEqual(mp.SArray(s).Z0, 75.)
+        res = mp.SArray(s, Z0=np.array([50., 75.]))
+        self.assertAllclose(res.Z0, [50., 75.])
+        self.assertEqual(s.Z0, 75.)
+
+    def test_per_port(self):
+        s = mp.SArray(np.zeros((1, 2, 2)))
+        s.Z0 = np.array([50., 75.])
+        self.assertAllclose(mp.ZArray(s), [[[50., 0], [0, 75.]]])
+        res = mp.SArray(mp.ZArray(s), Z0=np.array([50., 75.]))
+        self.assertAllclose(res, s)